@@ -0,0 +1,88 @@
+'''
+Measures the cold start of the CLI: the import time reported by
+`python -X importtime` and the wall time of a fresh interpreter, for each
+entry point. Results can be saved as a baseline and compared later.
+
+    python -m benchmarks.bench_cold_start --save-baseline benchmarks/cold_start.json
+    python -m benchmarks.bench_cold_start --compare benchmarks/cold_start.json
+'''
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (name, interpreter arguments)
+ENTRY_POINTS: List[Tuple[str, List[str]]] = [
+    ('import main', ['-c', 'import main']),
+    ('main.py --help', ['main.py', '--help']),
+    ('main.py check', ['main.py', 'check']),
+    ('import utils.etl.common_utils', ['-c', 'import utils.etl.common_utils']),
+    ('import functions', ['-c', 'import functions']),
+]
+
+
+def parse_importtime(stderr: str) -> float:
+    '''
+    Returns the total import time in seconds (sum of the cumulative time of
+    the top level imports) from the output of `python -X importtime`.
+    '''
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if cumulative.strip().isdigit() and not name.startswith('  '):
+            total += int(cumulative)
+    return total / 1e6
+
+
+def measure(args: List[str], repeat: int) -> Dict[str, float]:
+    best_import, best_wall = float('inf'), float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', *args],
+            cwd=ROOT, capture_output=True, text=True)
+        best_wall = min(best_wall, time.perf_counter() - start)
+        best_import = min(best_import, parse_importtime(result.stderr))
+    return {'import_seconds': best_import, 'wall_seconds': best_wall}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="CLI cold start benchmark")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--save-baseline', metavar='PATH')
+    parser.add_argument('--compare', metavar='PATH')
+    parser.add_argument('--tolerance', type=float, default=0.5)
+    args = parser.parse_args(argv)
+
+    results = {name: measure(cmd, args.repeat) for name, cmd in ENTRY_POINTS}
+    print(f"{'entry point':<32} {'import (ms)':>11} {'wall (ms)':>10}")
+    for name, metrics in results.items():
+        print(f"{name:<32} {metrics['import_seconds'] * 1000:>11.1f} {metrics['wall_seconds'] * 1000:>10.1f}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = [
+            f"{name}: {baseline[name]['wall_seconds'] * 1000:.1f} ms -> {metrics['wall_seconds'] * 1000:.1f} ms"
+            for name, metrics in results.items()
+            if name in baseline and metrics['wall_seconds'] > baseline[name]['wall_seconds'] * (1 + args.tolerance)
+        ]
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,62 @@
+'''
+Compares the serial preparation (parse and clean) of month tabs with the
+process pool of `utils.parallel` on synthetic workbooks of 12 to 60 tabs.
+The speedup is bounded by the number of CPUs available.
+
+    python -m benchmarks.bench_parallel_prepare
+    python -m benchmarks.bench_parallel_prepare --workers 2 4 8 --start-method forkserver
+'''
+import os
+import time
+import argparse
+from typing import Dict, List
+
+import pandas as pd
+
+from benchmarks.synthetic import make_workbook
+from utils.create_clean_data import read_sheets_streaming, clean_raw_data
+from utils.parallel import prepare_sheets_parallel
+
+CASES = [12, 36, 60]
+
+
+def prepare_serial(content: bytes, sheet_names: List[str]) -> Dict[str, pd.DataFrame]:
+    dfs = read_sheets_streaming(content, sheet_names)
+    return {sheet_name: clean_raw_data(df)[0] for sheet_name, df in dfs.items()}
+
+
+def best_time(func, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4])
+    parser.add_argument('--start-method', choices=['fork', 'spawn', 'forkserver'])
+    parser.add_argument('--blocks', type=int, default=100, help="Teacher blocks per tab")
+    parser.add_argument('--rows-per-block', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=2)
+    args = parser.parse_args(argv)
+
+    print(f"{os.cpu_count()} CPUs, {args.blocks * args.rows_per_block} student rows per tab")
+    print(f"{'tabs':>5} {'path':>10} {'time (s)':>9} {'speedup':>8}")
+    for n_tabs in CASES:
+        sheet_names = [f'Sheet{i}' for i in range(n_tabs)]
+        content = make_workbook(sheet_names, args.blocks, args.rows_per_block)
+
+        serial = best_time(lambda: prepare_serial(content, sheet_names), args.repeat)
+        print(f"{n_tabs:>5} {'serial':>10} {serial:>9.3f} {1:>8.2f}")
+        for workers in args.workers:
+            seconds = best_time(
+                lambda: prepare_sheets_parallel(content, sheet_names, workers, start_method=args.start_method),
+                args.repeat)
+            print(f"{n_tabs:>5} {f'{workers} procs':>10} {seconds:>9.3f} {serial / seconds:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+'''
+Times every pipeline stage on synthetic raw sheets and reports wall time and
+peak traced memory. Results can be saved as a baseline and later runs compared
+against it.
+
+    python -m benchmarks.bench_pipeline --save-baseline benchmarks/baseline.json
+    python -m benchmarks.bench_pipeline --compare benchmarks/baseline.json
+    python -m benchmarks.bench_pipeline --full   # adds the 1M rows case
+'''
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+from benchmarks.synthetic import make_raw_sheet_df, make_recap_history
+from utils.create_clean_data import (
+    remove_unnecessary_rows, transform_raw_data, clean_transformed_data, extract_keterangan_columns,
+    apply_cleaned_schema)
+from utils.etl.student import calculate_student_aggregate
+from utils.etl.fee import calculate_fee_aggregate
+from utils.etl.recap_tables import calculate_recap_aggregates
+from utils.etl.common_utils import update_by_month
+
+# (name, n_rows, n_blocks)
+CASES: List[Tuple[str, int, int]] = [
+    ('1k_rows_10_blocks', 1_000, 10),
+    ('10k_rows_100_blocks', 10_000, 100),
+    ('100k_rows_1000_blocks', 100_000, 1000),
+]
+FULL_CASES = CASES + [('1m_rows_1000_blocks', 1_000_000, 1000)]
+
+
+def measure(func: Callable, arg, repeat: int) -> Tuple[object, float, float]:
+    '''
+    Returns the result of `func(arg)`, its best wall time over `repeat` runs
+    and its peak traced memory (measured on a separate run).
+    '''
+    best = float('inf')
+    for _ in range(repeat):
+        arg_copy = arg.copy() if hasattr(arg, 'copy') else arg
+        start = time.perf_counter()
+        result = func(arg_copy)
+        best = min(best, time.perf_counter() - start)
+
+    arg_copy = arg.copy() if hasattr(arg, 'copy') else arg
+    tracemalloc.start()
+    func(arg_copy)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, best, peak
+
+
+def run_case(n_rows: int, n_blocks: int, repeat: int = 3) -> Dict[str, Dict[str, float]]:
+    '''
+    Runs every stage in pipeline order, each one on the output of the previous one.
+    '''
+    raw = make_raw_sheet_df(n_rows, n_blocks)
+    recap = make_recap_history(n_years=max(1, n_blocks // 100))
+    stages = [
+        ('remove_unnecessary_rows', remove_unnecessary_rows),
+        ('transform_raw_data', transform_raw_data),
+        ('clean_transformed_data', clean_transformed_data),
+        ('extract_keterangan_columns', extract_keterangan_columns),
+        ('apply_cleaned_schema', apply_cleaned_schema),
+    ]
+
+    results = {}
+    df = raw
+    for name, func in stages:
+        df, seconds, peak = measure(func, df, repeat)
+        results[name] = {'seconds': seconds, 'peak_mib': peak / 2**20}
+
+    cleaned_df = df
+    res_murid, seconds, peak = measure(lambda d: calculate_student_aggregate(d, 'Januari', 1), cleaned_df, repeat)
+    results['calculate_student_aggregate'] = {'seconds': seconds, 'peak_mib': peak / 2**20}
+
+    res_biaya, seconds, peak = measure(lambda d: calculate_fee_aggregate(d, 'Januari', 1), cleaned_df, repeat)
+    results['calculate_fee_aggregate'] = {'seconds': seconds, 'peak_mib': peak / 2**20}
+
+    _, seconds, peak = measure(lambda d: calculate_recap_aggregates(d, 'Januari', 1), cleaned_df, repeat)
+    results['calculate_recap_aggregates'] = {'seconds': seconds, 'peak_mib': peak / 2**20}
+
+    _, seconds, peak = measure(lambda d: update_by_month(d, res_biaya, 1), recap, repeat)
+    results['update_by_month'] = {'seconds': seconds, 'peak_mib': peak / 2**20}
+
+    return results
+
+
+def run_benchmarks(cases: List[Tuple[str, int, int]], repeat: int = 3) -> Dict[str, Dict[str, Dict[str, float]]]:
+    return {name: run_case(n_rows, n_blocks, repeat) for name, n_rows, n_blocks in cases}
+
+
+def find_regressions(
+        results: Dict[str, Dict[str, Dict[str, float]]],
+        baseline: Dict[str, Dict[str, Dict[str, float]]],
+        tolerance: float = 0.25,
+        min_seconds: float = 0.005
+    ) -> List[str]:
+    '''
+    Lists the stages that got slower (or hungrier) than the baseline by more
+    than `tolerance`. Stages faster than `min_seconds` are too noisy to compare.
+    '''
+    regressions = []
+    for case, stages in results.items():
+        for stage, metrics in stages.items():
+            base = baseline.get(case, {}).get(stage)
+            if base is None:
+                continue
+            if metrics['seconds'] > min_seconds and metrics['seconds'] > base['seconds'] * (1 + tolerance):
+                regressions.append(f"{case}/{stage}: {base['seconds']:.4f}s -> {metrics['seconds']:.4f}s")
+            if metrics['peak_mib'] > base['peak_mib'] * (1 + tolerance) + 0.1:
+                regressions.append(f"{case}/{stage}: {base['peak_mib']:.1f} MiB -> {metrics['peak_mib']:.1f} MiB")
+    return regressions
+
+
+def print_results(results: Dict[str, Dict[str, Dict[str, float]]]) -> None:
+    print(f"{'case':<24} {'stage':<30} {'time (s)':>10} {'peak (MiB)':>11}")
+    for case, stages in results.items():
+        for stage, metrics in stages.items():
+            print(f"{case:<24} {stage:<30} {metrics['seconds']:>10.4f} {metrics['peak_mib']:>11.1f}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Pipeline stage benchmarks on synthetic data")
+    parser.add_argument('--full', action='store_true', help="Include the 1M rows case")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--save-baseline', metavar='PATH')
+    parser.add_argument('--compare', metavar='PATH')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(FULL_CASES if args.full else CASES, args.repeat)
+    print_results(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
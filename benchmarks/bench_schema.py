@@ -0,0 +1,43 @@
+'''
+Compares the memory of `cleaned_df` and the speed of the aggregations
+with and without the compact schema (`apply_cleaned_schema`).
+
+    python -m benchmarks.bench_schema
+'''
+import time
+
+from benchmarks.synthetic import make_raw_sheet_df
+from utils.create_clean_data import (
+    remove_unnecessary_rows, transform_raw_data, clean_transformed_data,
+    extract_keterangan_columns, apply_cleaned_schema)
+from utils.etl.student import calculate_student_aggregate
+from utils.etl.fee import calculate_fee_aggregate
+
+CASES = [(10_000, 100), (100_000, 1000), (1_000_000, 1000)]
+
+
+def best_time(func, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print(f"{'rows':>9} {'blocks':>6} {'schema':<8} {'memory (MiB)':>12} {'student (s)':>11} {'fee (s)':>8}")
+    for n_rows, n_blocks in CASES:
+        df = remove_unnecessary_rows(make_raw_sheet_df(n_rows, n_blocks))
+        untyped = extract_keterangan_columns(clean_transformed_data(transform_raw_data(df)))
+        typed = apply_cleaned_schema(untyped.copy())
+
+        for name, cleaned_df in [('untyped', untyped), ('typed', typed)]:
+            memory = cleaned_df.memory_usage(deep=True).sum() / 2**20
+            student = best_time(lambda: calculate_student_aggregate(cleaned_df, 'Januari', 1))
+            fee = best_time(lambda: calculate_fee_aggregate(cleaned_df, 'Januari', 1))
+            print(f"{len(cleaned_df):>9} {n_blocks:>6} {name:<8} {memory:>12.1f} {student:>11.4f} {fee:>8.4f}")
+
+
+if __name__ == '__main__':
+    main()
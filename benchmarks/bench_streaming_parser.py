@@ -0,0 +1,49 @@
+'''
+Compares the streaming read-only parser with the `pd.read_excel` path
+on synthetic workbooks with a growing number of tabs.
+
+    python -m benchmarks.bench_streaming_parser
+'''
+import time
+import tracemalloc
+from io import BytesIO
+
+import pandas as pd
+
+from benchmarks.synthetic import make_workbook
+from utils.create_clean_data import read_sheets_streaming, remove_unnecessary_rows
+
+
+def read_excel_path(content: bytes, sheet_name: str) -> pd.DataFrame:
+    df = pd.read_excel(BytesIO(content), engine='openpyxl', sheet_name=sheet_name, header=None)
+    return remove_unnecessary_rows(df)
+
+
+def streaming_path(content: bytes, sheet_name: str) -> pd.DataFrame:
+    return read_sheets_streaming(content, [sheet_name])[sheet_name]
+
+
+def measure(func, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main() -> None:
+    n_blocks, rows_per_block = 100, 50
+    print(f"{'tabs':>5} {'path':>10} {'time (s)':>10} {'peak (MiB)':>11}")
+    for n_tabs in [1, 6, 12]:
+        sheet_names = [f'Sheet{i}' for i in range(n_tabs)]
+        content = make_workbook(sheet_names, n_blocks, rows_per_block)
+        target = sheet_names[-1]
+        for name, func in [('read_excel', read_excel_path), ('streaming', streaming_path)]:
+            elapsed, peak = measure(func, content, target)
+            print(f"{n_tabs:>5} {name:>10} {elapsed:>10.3f} {peak / 2**20:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
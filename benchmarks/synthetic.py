@@ -0,0 +1,82 @@
+import random
+import pandas as pd
+from io import BytesIO
+from typing import List, Optional
+
+from openpyxl import Workbook
+
+HEADER = ['No', 'Nama', 'Jadwal', 'Harga', 'Biaya Pendaftaran', 'Keterangan', 'Keterangan Tambahan']
+INSTRUMENTS = ['Piano', 'Gitar', 'Biola', 'Drum', 'Vokal', 'Bass', 'Cello', 'Saxophone']
+KETERANGAN = [
+    '', '', '', 'Lunas', 'lunas', 'LUNAS via transfer', 'Baru, lunas', 'baru - belum bayar',
+    'Trial', 'trial gratis', 'Keluar', 'keluar akhir bulan', 'Cuti', 'cuti bulan ini, lunas',
+    'Baru', 'pindah jadwal', 'Lunas 2 bulan']
+DAYS = ['Senin', 'Selasa', 'Rabu', 'Kamis', 'Jumat', 'Sabtu']
+
+
+def make_raw_rows(n_blocks: int, rows_per_block: int, seed: int = 0) -> List[list]:
+    '''
+    Generates the rows of a raw month sheet with `n_blocks` teacher blocks
+    of `rows_per_block` students each, followed by their 'total per bulan'
+    row and a blank separator row.
+    '''
+    rng = random.Random(seed)
+    rows = []
+    for b in range(n_blocks):
+        rows.append(['Teacher', f'Teacher {b}'])
+        rows.append(['Instrument', INSTRUMENTS[b % len(INSTRUMENTS)]])
+        rows.append(HEADER)
+        total = 0
+        for i in range(1, rows_per_block + 1):
+            harga = rng.choice([150000, 200000, 250000, 300000])
+            regis = rng.choice([None, None, None, 100000])
+            total += harga
+            rows.append([
+                i, f'Student {b}-{i}', rng.choice(DAYS), harga, regis,
+                rng.choice(KETERANGAN) or None, None])
+        rows.append([None, None, None, 'Total per bulan', total])
+        rows.append([])
+    return rows
+
+
+def make_raw_sheet_df(n_rows: int, n_blocks: int, seed: int = 0) -> pd.DataFrame:
+    '''
+    Generates a raw month sheet of about `n_rows` student rows spread over
+    `n_blocks` teacher blocks, as read with `pd.read_excel(header=None)`.
+    '''
+    rows = make_raw_rows(n_blocks, max(1, n_rows // n_blocks), seed=seed)
+    width = len(HEADER)
+    return pd.DataFrame([row + [None] * (width - len(row)) for row in rows], dtype=object)
+
+
+def make_recap_history(n_years: int, n_instruments: int = len(INSTRUMENTS)) -> pd.DataFrame:
+    '''
+    Generates a fee Recap table holding `n_years` of monthly rows.
+    '''
+    rng = random.Random(0)
+    rows = [
+        [month_num, f'Month {month_num}', f'Instrument {i}', rng.randint(1, 50) * 50000, rng.randint(0, 5) * 100000]
+        for _ in range(n_years) for month_num in range(1, 13) for i in range(n_instruments)
+    ]
+    return pd.DataFrame(rows, columns=['month_num', 'month', 'instrument', 'biaya_spp', 'biaya_regis'])
+
+
+def make_workbook(
+        sheet_names: List[str],
+        n_blocks: int,
+        rows_per_block: int,
+        seed: Optional[int] = 0
+    ) -> bytes:
+    '''
+    Builds an xlsx workbook (as exported by Google Sheets) with one raw
+    month sheet per name and returns its bytes.
+    '''
+    wb = Workbook(write_only=True)
+    for i, sheet_name in enumerate(sheet_names):
+        ws = wb.create_sheet(sheet_name)
+        for row in make_raw_rows(n_blocks, rows_per_block, seed=seed + i):
+            ws.append(row)
+
+    buffer = BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
@@ -0,0 +1,9 @@
+# Where the raw monthly sheets are read from: 'gsheet', 'xlsx' (local workbook)
+# or 'csv' (a directory with one `<month>.csv` per month tab)
+source: str = 'gsheet'
+source_path: str = ''
+
+# Where the Recap tables are written to: 'gsheet', 'memory', 'csv' or 'parquet'
+# (a directory with one file per Recap table)
+sink: str = 'gsheet'
+sink_path: str = ''
@@ -0,0 +1,4 @@
+cache_dir: str = '.cache/workbooks'
+max_size_bytes: int = 200 * 1024 * 1024
+max_age_seconds: int = 30 * 24 * 60 * 60
+incremental_dir: str = '.cache/incremental'
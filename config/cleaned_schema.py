@@ -0,0 +1,7 @@
+from typing import List
+
+# Dtypes of the cleaned DataFrame, applied by `apply_cleaned_schema`
+category_cols: List[str] = ['teacher', 'instrument', 'jadwal', 'keterangan']
+fee_cols: List[str] = ['biaya_spp', 'biaya_regis']
+fee_dtype: str = 'int64'
+flag_dtype: str = 'int8'
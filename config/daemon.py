@@ -0,0 +1,7 @@
+# `python main.py watch` polls the source for a new version every
+# `poll_seconds`. An ETL runs once no new version was seen for
+# `debounce_seconds` (a burst of edits gives a single run), or at the latest
+# `max_wait_seconds` after the first unprocessed edit.
+poll_seconds: int = 60
+debounce_seconds: int = 120
+max_wait_seconds: int = 900
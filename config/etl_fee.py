@@ -1,6 +0,0 @@
-from typing import List
-
-start_cell: str = 'A2'
-end_col: str = 'E'
-null_check_max_row: int = 1000
-int_cols: List[str] = ['month_num', 'biaya_spp', 'biaya_regis']
\ No newline at end of file
@@ -1,6 +0,0 @@
-from typing import List
-
-start_cell: str = 'G2'
-end_col: str = 'S'
-null_check_max_row: int = 1000
-int_cols: List[str] = ['month_num', 'total', 'is_baru', 'is_keluar', 'is_cuti', 'not_lunas']
\ No newline at end of file
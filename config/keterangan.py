@@ -0,0 +1,10 @@
+from typing import Dict, Tuple
+
+# Flag column -> (keyword searched in the lowercased 'keterangan', inverted)
+keyword_flags: Dict[str, Tuple[str, bool]] = {
+    'is_trial': ('trial', False),
+    'is_baru': ('baru', False),
+    'is_keluar': ('keluar', False),
+    'is_cuti': ('cuti', False),
+    'not_lunas': ('lunas', True),
+}
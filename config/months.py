@@ -0,0 +1,6 @@
+from typing import List
+
+months: List[str] = [
+    "Januari", "Februari", "Maret", "April", "Mei", "Juni",
+    "Juli", "Agustus", "September", "Oktober", "November",
+    "Desember"]
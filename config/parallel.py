@@ -0,0 +1,10 @@
+from typing import Optional
+
+# Processes preparing (parsing and cleaning) the month tabs of a workbook when
+# several tabs are needed, e.g. backfills. 1 prepares them one after the other.
+prepare_workers: int = 1
+
+# multiprocessing start method of the workers ('fork', 'spawn', 'forkserver').
+# None uses 'forkserver' where available (the workers are started while other
+# threads run), the platform default otherwise
+start_method: Optional[str] = None
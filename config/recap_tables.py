@@ -0,0 +1,35 @@
+from typing import Dict
+
+# Recap tables, keyed by name. Each table declares its range in the Recap
+# worksheet (from `start_cell` to `end_col`), its integer columns and its
+# aggregation per instrument: output column -> (cleaned_df column, function),
+# with the functions 'size', 'sum' and 'names' (the names of the students
+# whose column is 1, ' ' if there are none). The tables are computed from a
+# single grouping of the cleaned data, and read and written in one request each.
+recap_tables: Dict[str, dict] = {
+    'student': {
+        'start_cell': 'G2',
+        'end_col': 'S',
+        'int_cols': ['month_num', 'total', 'is_baru', 'is_keluar', 'is_cuti', 'not_lunas'],
+        'aggregations': {
+            'total': ('instrument', 'size'),
+            'is_baru': ('is_baru', 'sum'),
+            'is_keluar': ('is_keluar', 'sum'),
+            'is_cuti': ('is_cuti', 'sum'),
+            'not_lunas': ('not_lunas', 'sum'),
+            'nama_is_baru': ('is_baru', 'names'),
+            'nama_is_keluar': ('is_keluar', 'names'),
+            'nama_is_cuti': ('is_cuti', 'names'),
+            'nama_not_lunas': ('not_lunas', 'names'),
+        },
+    },
+    'fee': {
+        'start_cell': 'A2',
+        'end_col': 'E',
+        'int_cols': ['month_num', 'biaya_spp', 'biaya_regis'],
+        'aggregations': {
+            'biaya_spp': ('biaya_spp', 'sum'),
+            'biaya_regis': ('biaya_regis', 'sum'),
+        },
+    },
+}
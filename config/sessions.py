@@ -0,0 +1,8 @@
+from typing import List
+
+scopes: List[str] = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive.readonly",
+]
+refresh_margin_seconds: int = 300
+pool_maxsize: int = 16
@@ -0,0 +1,7 @@
+# Sheets API quota: 60 read and 60 write requests per minute per user
+requests_per_minute: int = 60
+burst: int = 10
+max_retries: int = 5
+backoff_base_seconds: float = 1.0
+backoff_max_seconds: float = 64.0
+request_budget: int = 300
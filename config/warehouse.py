@@ -0,0 +1,6 @@
+# Every run persists its cleaned monthly data as Parquet, partitioned by
+# spreadsheet, year and month: <warehouse_dir>/<sheet_id>/year=<year>/month_num=<month_num>/
+# Only the columns used by the Recap tables (see `config.recap_tables`) are
+# read back to rebuild them.
+enabled: bool = True
+warehouse_dir: str = 'warehouse'
@@ -1,15 +1,34 @@
 import pandas as pd
 import gspread
-from google.oauth2.service_account import Credentials
+import requests
 
 import os
+import json
 from datetime import datetime
-from typing import Tuple
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Tuple, List, Dict, Optional, Union
 
-from utils.create_clean_data import read_gsheet, remove_unnecessary_rows, transform_raw_data, clean_transformed_data, extract_keterangan_columns
-from utils.etl.student import calculate_student_aggregate, get_student_config
-from utils.etl.fee import calculate_fee_aggregate, get_fee_config
-from utils.etl.common_utils import get_spreadsheet_table, fix_int_columns_dtype, update_by_month, update_to_spreadsheet_worksheet
+from config.months import months
+from utils.create_clean_data import (
+    get_sheet_id, get_export_url, download_workbook, read_sheets_streaming, clean_raw_data)
+from utils.cache import (
+    get_cache_config, save_workbook_to_cache, is_month_unchanged, load_cached_cleaned_df,
+    save_cleaned_df_to_cache, mark_month_written, evict_cache)
+from utils.etl.recap_tables import get_recap_table_configs, get_source_cols, calculate_recap_aggregates
+from utils.sessions import get_session
+from utils.backends import (
+    GoogleSheetSource, XlsxFileSource, CsvDirSource, InMemoryWorksheet, FileTablesWorksheet)
+from utils.sheets_client import SheetsClient, RateLimitedWorksheet, get_sheets_client_config
+from utils.metrics import stage, set_run_field
+from utils.dag import run_dag
+from utils.warehouse import get_warehouse_config, write_partition, read_warehouse_months
+from utils.parallel import get_parallel_config, prepare_sheets_parallel
+from utils.etl.incremental import (
+    hash_teacher_blocks, get_changed_instruments, update_partial_aggregates,
+    load_incremental_state, save_incremental_state)
+from utils.etl.upsert import Changes, upsert, count_changes, has_changes
+from utils.etl.common_utils import get_spreadsheet_tables, fix_int_columns_dtype, update_tables_to_spreadsheet_worksheet
 
 def get_month_and_month_num() -> Tuple[str, int]: # belum ada unit testnya
     '''
@@ -17,11 +36,6 @@ def get_month_and_month_num() -> Tuple[str, int]: # belum ada unit testnya
     If an environment variable 'month' is set, it returns that month's name and number.
     Otherwise, it returns the current month name and number based on the current date.
     '''
-    months = [
-        "Januari", "Februari", "Maret", "April", "Mei", "Juni",
-        "Juli", "Agustus", "September", "Oktober", "November",
-        "Desember"]
-    
     month = os.getenv("month")
     if month:
         month_num = months.index(month) + 1
@@ -33,95 +47,726 @@ def get_month_and_month_num() -> Tuple[str, int]: # belum ada unit testnya
     return month, month_num
 
 
-def fetch_and_prepare_data(sheet_url: str, month: str) -> pd.DataFrame:
+def get_year(default_current: bool = True) -> Optional[int]:
+    '''
+    Returns the year of the processed data: the 'year' environment variable
+    if it is set, the current year otherwise (None without `default_current`).
+    '''
+    year = os.getenv("year")
+    if year:
+        return int(year)
+    return datetime.now().year if default_current else None
+
+
+def require_year(year: Optional[int] = None) -> int:
+    '''
+    Returns `year`, or the 'year' environment variable. Month tabs other than
+    the current one may be from a past year, and writing them to the current
+    year's warehouse partitions would overwrite its data, so the current year
+    is never assumed: raises ValueError if the year is not given.
+    '''
+    year = year or get_year(default_current=False)
+    if year is None:
+        raise ValueError("The year of the month tabs is unknown: pass --year or set the 'year' environment variable")
+    return year
+
+
+def parse_months(months_spec: str) -> Optional[List[str]]:
+    '''
+    Parses a month specification into a list of month names.
+    Accepts a range ('Januari..Desember'), a comma separated list
+    ('Januari,Maret') or 'all', which returns None to select every month tab.
+    '''
+    months_spec = months_spec.strip()
+    if months_spec.lower() == 'all':
+        return None
+
+    selected = []
+    for part in months_spec.split(','):
+        part = part.strip()
+        if '..' in part:
+            first, last = [m.strip() for m in part.split('..')]
+            for m in (first, last):
+                if m not in months:
+                    raise ValueError(f"Unknown month: {m}")
+            if months.index(first) > months.index(last):
+                raise ValueError(f"Month range starts after it ends: {part}")
+            selected.extend(months[months.index(first):months.index(last) + 1])
+        elif part in months:
+            selected.append(part)
+        else:
+            raise ValueError(f"Unknown month: {part}")
+
+    # Deduplicate while keeping calendar order
+    return [m for m in months if m in selected]
+
+
+def fetch_and_prepare_data(
+        sheet_url: str,
+        month: str,
+        session: Optional[requests.Session] = None
+    ) -> pd.DataFrame:
     '''
     Reads data from a Google Sheet for the specified month,
     removes unnecessary rows, and performs a series of transformations to clean the data.
     '''
-    # Reading Google Sheet
-    df = read_gsheet(sheet_url, engine='openpyxl', sheet_name=month, header=None)
+    # Reading Google Sheet (streamed, unnecessary rows are dropped while reading)
+    with stage('download') as record:
+        content = download_workbook(get_export_url(sheet_url), session)
+        record['bytes'] = len(content)
+    with stage('parse', months=[month]) as record:
+        df = read_sheets_streaming(content, [month])[month]
+        record['rows_out'] = len(df)
+
+    return prepare_filtered_data(df, month)
+
+
+def prepare_workbook_months(
+        content: bytes,
+        sheet_names: List[str],
+        missing_ok: bool = False,
+        prepare_workers: Optional[int] = None
+    ) -> Dict[str, pd.DataFrame]:
+    '''
+    Parses and cleans month tabs of a downloaded workbook, returning the
+    cleaned DataFrames keyed by tab name. With several tabs and more than one
+    worker (`prepare_workers`, `config.parallel` by default), the tabs are
+    prepared in parallel processes (see `utils.parallel`). With `missing_ok`,
+    absent tabs are skipped.
+    '''
+    parallel_config = get_parallel_config()
+    workers = min(prepare_workers or parallel_config['prepare_workers'], len(sheet_names))
+
+    if workers > 1:
+        with stage('parse', workers=workers) as record:
+            cleaned_dfs, record['invalid_cells'] = prepare_sheets_parallel(
+                content, sheet_names, workers, missing_ok, parallel_config['start_method'])
+            record['months'] = list(cleaned_dfs)
+            record['rows_out'] = sum(len(df) for df in cleaned_dfs.values())
+        return cleaned_dfs
+
+    with stage('parse') as record:
+        dfs = read_sheets_streaming(content, sheet_names, missing_ok=missing_ok)
+        record['months'] = list(dfs)
+        record['rows_out'] = sum(len(df) for df in dfs.values())
+    return {sheet_name: prepare_filtered_data(df, sheet_name) for sheet_name, df in dfs.items()}
+
+
+def fetch_and_prepare_months(
+        sheet_url: str,
+        selected_months: Optional[List[str]] = None,
+        session: Optional[requests.Session] = None,
+        prepare_workers: Optional[int] = None
+    ) -> Dict[str, pd.DataFrame]:
+    '''
+    Downloads the workbook once and parses every requested month tab in a
+    single pass (or in parallel, see `prepare_workbook_months`). If
+    `selected_months` is None, every tab named after a month is used.
+    Returns the cleaned DataFrames keyed by month, in calendar order.
+    '''
+    # Reading Google Sheet (one download, one streamed pass over the workbook)
+    with stage('download') as record:
+        content = download_workbook(get_export_url(sheet_url), session)
+        record['bytes'] = len(content)
+    cleaned_dfs = prepare_workbook_months(
+        content, selected_months or months, selected_months is None, prepare_workers)
+
+    return {
+        month: cleaned_dfs[month]
+        for month in months if month in cleaned_dfs
+    }
+
+
+def fetch_and_prepare_data_cached(
+        sheet_url: str,
+        selected_months: Optional[List[str]],
+        export_url: Optional[str] = None,
+        session: Optional[requests.Session] = None,
+        prepare_workers: Optional[int] = None,
+        evict: bool = True
+    ) -> Dict[str, pd.DataFrame]:
+    '''
+    Downloads the workbook, fingerprints it and stores it in the local cache.
+    Months already written to the Recap from an identical workbook are left out,
+    so an unchanged workbook returns an empty dictionary before any parsing.
+    The remaining months reuse their cached `cleaned_df` when available and are
+    parsed (in a single pass, or in parallel with `prepare_workers`) otherwise.
+    `export_url` can point to a local file (`file://...`) standing in for the
+    Google Sheets export. With `evict=False` the cache is not evicted, which
+    concurrent runs sharing the cache leave to their caller.
+    '''
+    cache_config = get_cache_config()
+    cache_dir = cache_config['cache_dir']
+    sheet_id = get_sheet_id(sheet_url)
 
-    # Remove unnescessary rows
-    df = remove_unnecessary_rows(df)
+    # Download and fingerprint the workbook
+    with stage('download') as record:
+        content = download_workbook(export_url or get_export_url(sheet_url), session)
+        record['bytes'] = len(content)
+    content_hash = save_workbook_to_cache(cache_dir, sheet_id, content)
+    if evict:
+        evict_cache(**cache_config)
 
+    # Every month tab of the workbook if no month is selected
+    missing_ok = selected_months is None
+    if selected_months is None:
+        selected_months = months
+
+    # Skip the months that are already up to date
+    cleaned_dfs = {}
+    for month in selected_months:
+        if is_month_unchanged(cache_dir, sheet_id, content_hash, month):
+            continue
+        cleaned_dfs[month] = load_cached_cleaned_df(cache_dir, sheet_id, content_hash, month)
+
+    # Parse the months that are not cached yet
+    to_parse = [month for month, cleaned_df in cleaned_dfs.items() if cleaned_df is None]
+    if to_parse:
+        parsed_dfs = prepare_workbook_months(content, to_parse, missing_ok, prepare_workers)
+        for month in to_parse:
+            if month not in parsed_dfs:
+                del cleaned_dfs[month]
+                continue
+            cleaned_dfs[month] = parsed_dfs[month]
+            save_cleaned_df_to_cache(cache_dir, sheet_id, month, cleaned_dfs[month])
+
+    return cleaned_dfs
+
+
+def mark_months_written(sheet_url: str, written_months: List[str]) -> None:
+    '''
+    Records in the local cache that the months were written to the Recap.
+    '''
+    cache_dir = get_cache_config()['cache_dir']
+    sheet_id = get_sheet_id(sheet_url)
+    for month in written_months:
+        mark_month_written(cache_dir, sheet_id, month)
+
+
+def prepare_filtered_data(df: pd.DataFrame, month: Optional[str] = None) -> pd.DataFrame:
+    '''
+    Performs the series of transformations that clean a raw month sheet
+    whose unnecessary rows have already been removed. `month` only names
+    the sheet in the invalid cell warnings.
+    '''
     # Transform raw data
-    cleaned_df = transform_raw_data(df)
-    cleaned_df = clean_transformed_data(cleaned_df)
-    cleaned_df = extract_keterangan_columns(cleaned_df)
+    with stage('transform', rows_in=len(df)) as record:
+        cleaned_df, invalid_cells = clean_raw_data(df, sheet_name=month)
+        record['invalid_cells'] = len(invalid_cells)
+        record['rows_out'] = len(cleaned_df)
     return cleaned_df
 
 
+def persist_to_warehouse(sheet_url: str, cleaned_dfs: Dict[str, pd.DataFrame], year: Optional[int]) -> None:
+    '''
+    Writes the `cleaned_df` of every month to its year/month partition of the
+    local warehouse (see `config.warehouse`), replacing it on re-runs.
+    Refuses to write anything if the `year` of the data is unknown (None).
+    '''
+    warehouse_config = get_warehouse_config()
+    if not warehouse_config['enabled']:
+        return
+    year = require_year(year)
+
+    sheet_id = get_sheet_id(sheet_url)
+    with stage('warehouse', rows_in=sum(len(df) for df in cleaned_dfs.values())):
+        for month, cleaned_df in cleaned_dfs.items():
+            write_partition(warehouse_config['warehouse_dir'], sheet_id, year, months.index(month) + 1, cleaned_df)
+
+
 def get_recap_worksheet(
         sheet_url: str,
         recap_sheet_tile: str,
-        service_account_path: str
-    ) -> gspread.Worksheet:
+        service_account_path: str,
+        sheets_client: Optional[SheetsClient] = None
+    ) -> RateLimitedWorksheet:
     '''
-    Sets up a Google Sheets API client using a service account,
+    Gets the (cached) authorized session of the service account,
     and retrieves the 'Recap' worksheet from the specified Google Sheet.
+    The spreadsheet and worksheet are memoized by the session, so repeated
+    runs skip the auth and lookup requests. Every API call (here and on the
+    returned worksheet) goes through `sheets_client`, which rate limits,
+    retries and counts them.
     '''
+    if sheets_client is None:
+        sheets_client = SheetsClient(**get_sheets_client_config())
+
     # Setting up client
-    scopes = ["https://www.googleapis.com/auth/spreadsheets"]
-    creds = Credentials.from_service_account_file(service_account_path, scopes=scopes)
-    client = gspread.authorize(creds)
+    session = get_session(service_account_path)
 
     # Getting the 'Recap' worksheet
     sheet_id = sheet_url.split('/')[-2]
-    spreadsheet = client.open_by_key(sheet_id)
-    worksheet = spreadsheet.worksheet(recap_sheet_tile)
-    return worksheet
+    worksheet = sheets_client.call(session.worksheet, sheet_id, recap_sheet_tile)
+    return sheets_client.wrap(worksheet)
 
 
-def etl_student_data(
-        cleaned_df: pd.DataFrame,
+def read_recap_tables(worksheet: gspread.Worksheet) -> Dict[str, pd.DataFrame]:
+    '''
+    Reads every Recap table (fee A:E and student G:S) in a single request,
+    keyed by table name, with their integer columns already converted.
+    Tables that do not exist yet are returned as empty DataFrames.
+    '''
+    configs = get_recap_table_configs()
+    with stage('read_recap') as record:
+        dfs = get_spreadsheet_tables(worksheet, list(configs.values()))
+        record['rows_out'] = sum(len(df) for df in dfs)
+    return {
+        name: fix_int_columns_dtype(df, **config) if not df.columns.empty else df
+        for (name, config), df in zip(configs.items(), dfs)
+    }
+
+
+def write_recap_tables(
         worksheet: gspread.Worksheet,
+        updated_dfs: Dict[str, pd.DataFrame],
+        old_dfs: Optional[Dict[str, pd.DataFrame]] = None,
+        changes: Optional[Dict[str, Changes]] = None
+    ) -> None:
+    '''
+    Writes every updated Recap table (keyed by table name) to the worksheet
+    in a single request, so the Recap is either fully updated or left untouched.
+    Only the changed cells of the tables found in `old_dfs` are written, and
+    tables whose `changes` (see `upsert`) are empty are skipped altogether.
+    '''
+    configs = get_recap_table_configs()
+    old_dfs = old_dfs or {}
+    changes = changes or {}
+    unchanged = [
+        name for name in updated_dfs
+        if name in old_dfs and name in changes and not has_changes(changes[name])
+    ]
+    with stage('write_recap', rows_in=sum(len(df) for df in updated_dfs.values())) as record:
+        record['skipped_tables'] = unchanged
+        update_tables_to_spreadsheet_worksheet(worksheet, [
+            (updated_df, old_dfs.get(name), configs[name])
+            for name, updated_df in updated_dfs.items()
+            if name not in unchanged
+        ])
+
+
+def calculate_aggregates_incremental(
+        sheet_url: str,
+        cleaned_df: pd.DataFrame,
         month: str,
         month_num: int
-    ) -> pd.DataFrame:
+    ) -> Dict[str, pd.DataFrame]:
     '''
-    Extracts student data from the cleaned DataFrame, 
-    transforms it based on the current month, and loads the updated data 
-    into a Google Sheet's worksheet.
+    Fingerprints every teacher block of the month and recomputes the student
+    and fee aggregates only for the instruments whose blocks changed since the
+    last incremental run. The block hashes and the resulting aggregates are
+    persisted locally for the next run.
     '''
-    # Get student's ETL configuration
-    student_config = get_student_config()
-    
-    # Get spreadsheet table 'old_df'
-    old_df = get_spreadsheet_table(worksheet, **student_config)
+    incremental_dir = get_cache_config()['incremental_dir']
+    sheet_id = get_sheet_id(sheet_url)
+    state = load_incremental_state(incremental_dir, sheet_id, month)
 
-    # Column dtypes
-    old_df = fix_int_columns_dtype(old_df, **student_config)
+    with stage('aggregate_incremental', rows_in=len(cleaned_df)) as record:
+        # Instruments with added, removed or edited teacher blocks
+        block_hashes = hash_teacher_blocks(cleaned_df)
+        changed_instruments = get_changed_instruments(state['block_hashes'], block_hashes)
+        record['changed_instruments'] = len(changed_instruments)
 
-    # ETL (Get new/updated data)
-    res_murid = calculate_student_aggregate(cleaned_df, month, month_num)
+        # Every Recap table of the changed instruments in a single pass
+        aggregates = update_partial_aggregates(
+            cleaned_df, month, month_num, calculate_recap_aggregates,
+            {name: state['partials'].get(name) for name in get_recap_table_configs()},
+            changed_instruments)
 
-    # Update with old data
-    updated_murid = update_by_month(old_df=old_df, updated_df=res_murid, month_num=month_num)
+    save_incremental_state(
+        incremental_dir, sheet_id, month,
+        {'block_hashes': block_hashes, 'partials': aggregates})
+    return aggregates
 
-    # Update to google spreadsheet's worksheet
-    update_to_spreadsheet_worksheet(worksheet, updated_murid, **student_config)
+
+def calculate_months_aggregates(
+        cleaned_dfs: Dict[str, pd.DataFrame],
+        tables: Optional[Dict[str, dict]] = None
+    ) -> Tuple[Dict[str, pd.DataFrame], List[int]]:
+    '''
+    Computes every Recap table for several months at once (one grouping
+    per month), returning the tables keyed by name and the month numbers.
+    '''
+    tables = get_recap_table_configs() if tables is None else tables
+    month_nums = [months.index(month) + 1 for month in cleaned_dfs]
+    aggregates = [
+        calculate_recap_aggregates(cleaned_df, month, month_num, tables)
+        for (month, cleaned_df), month_num in zip(cleaned_dfs.items(), month_nums)
+    ]
+    res = {
+        name: pd.concat([aggregate[name] for aggregate in aggregates], ignore_index=True)
+        for name in tables
+    }
+    return res, month_nums
+
+
+def upsert_recap_tables(
+        old_dfs: Dict[str, pd.DataFrame],
+        aggregates: Dict[str, pd.DataFrame],
+        month_nums: List[int]
+    ) -> Tuple[Dict[str, pd.DataFrame], Dict[str, Changes]]:
+    '''
+    Upserts the aggregates of `month_nums` into the Recap tables (both keyed
+    by table name), returning the updated tables and their changed keys.
+    '''
+    updated_dfs, changes = {}, {}
+    for name, aggregate in aggregates.items():
+        updated_dfs[name], changes[name] = upsert(old_dfs[name], aggregate, month_nums)
+    return updated_dfs, changes
 
 
-def etl_fee_data(
+def update_recap(
+        worksheet: gspread.Worksheet,
         cleaned_df: pd.DataFrame,
+        month: str,
+        month_num: int,
+        aggregates: Optional[Dict[str, pd.DataFrame]] = None,
+        old_dfs: Optional[Dict[str, pd.DataFrame]] = None
+    ) -> None:
+    '''
+    Reads every Recap table in one request, upserts the month in each of them
+    and writes the changed ones back at once (all-or-nothing). Precomputed
+    `aggregates` (keyed by table name) are used instead of recomputing them,
+    and Recap tables already read (`old_dfs`) are not read again.
+    '''
+    aggregates = dict(aggregates or {})
+
+    # Read every Recap table in one request
+    if old_dfs is None:
+        old_dfs = read_recap_tables(worksheet)
+
+    # Compute the missing Recap tables in a single pass and merge them
+    with stage('aggregate', rows_in=len(cleaned_df)) as record:
+        missing = {name: config for name, config in get_recap_table_configs().items() if aggregates.get(name) is None}
+        if missing:
+            aggregates.update(calculate_recap_aggregates(cleaned_df, month, month_num, missing))
+        updated_dfs, changes = upsert_recap_tables(old_dfs, aggregates, [month_num])
+        record['changed_keys'] = {name: count_changes(c) for name, c in changes.items()}
+
+    # Write every changed Recap table at once (all-or-nothing)
+    write_recap_tables(worksheet, updated_dfs, old_dfs, changes)
+
+
+def update_recap_months(
         worksheet: gspread.Worksheet,
+        cleaned_dfs: Dict[str, pd.DataFrame],
+        old_dfs: Optional[Dict[str, pd.DataFrame]] = None
+    ) -> Dict[str, pd.DataFrame]:
+    '''
+    Same as `update_recap`, for several months at once. Returns the updated
+    Recap tables, keyed by table name.
+    '''
+    # Read every Recap table in one request
+    if old_dfs is None:
+        old_dfs = read_recap_tables(worksheet)
+
+    # Compute every Recap table of every month and merge them
+    with stage('aggregate', rows_in=sum(len(df) for df in cleaned_dfs.values())) as record:
+        aggregates, month_nums = calculate_months_aggregates(cleaned_dfs)
+        updated_dfs, changes = upsert_recap_tables(old_dfs, aggregates, month_nums)
+        record['changed_keys'] = {name: count_changes(c) for name, c in changes.items()}
+
+    # Write every changed Recap table at once (all-or-nothing)
+    write_recap_tables(worksheet, updated_dfs, old_dfs, changes)
+    return updated_dfs
+
+
+def downloads_with_session(export_url: Optional[str]) -> bool:
+    '''
+    Whether the workbook is downloaded through the authorized session
+    (Google Sheets export), as opposed to a local `export_url`.
+    '''
+    return export_url is None or export_url.startswith(('http://', 'https://'))
+
+
+def run_etl(
+        sheet_url: str,
+        recap_sheet_title: str,
+        service_account_path: str,
         month: str,
-        month_num: int
-    ) -> pd.DataFrame:
-    # Get fee's ETL configuration
-    fee_config = get_fee_config()
+        month_num: int,
+        use_cache: bool = True,
+        incremental: bool = False,
+        export_url: Optional[str] = None,
+        sheets_client: Optional[SheetsClient] = None,
+        evict: bool = True
+    ) -> bool:
+    '''
+    Runs the whole ETL of one month for one spreadsheet: fetch and prepare
+    the month tab, aggregate it and write every Recap table at once.
+    The run is a small DAG (see `utils.dag`): the download and parsing of the
+    workbook overlap with opening the Recap worksheet and reading its tables,
+    and every Recap table is aggregated in a single pass as soon as the
+    month is prepared. The task
+    timings and the critical path are added to the run metrics.
+    Returns False if the run was skipped because the workbook is unchanged.
+    `evict` is passed to `fetch_and_prepare_data_cached`. The current year
+    is only assumed for the current month (see `require_year`).
+    '''
+    year = get_year() if month_num == datetime.now().month else require_year()
+
+    # Authorized session shared by the export download and the API calls
+    session = get_session(service_account_path)
+
+    def extract(*_) -> Optional[pd.DataFrame]:
+        # Fetch data and prepare it for processing (None if unchanged)
+        if use_cache:
+            return fetch_and_prepare_data_cached(
+                sheet_url, [month], export_url, session.session, evict=evict).get(month)
+        return fetch_and_prepare_data(sheet_url, month, session.session)
+
+    def warehouse(cleaned_df: Optional[pd.DataFrame]) -> None:
+        # Keep the cleaned data of the month in the local warehouse
+        if cleaned_df is not None:
+            persist_to_warehouse(sheet_url, {month: cleaned_df}, year)
+
+    def aggregate(cleaned_df: Optional[pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+        # Every Recap table from a single grouping of the month
+        if cleaned_df is None:
+            return {}
+        with stage('aggregate_tables', rows_in=len(cleaned_df)):
+            return calculate_recap_aggregates(cleaned_df, month, month_num)
+
+    def aggregate_incremental(cleaned_df: Optional[pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+        # Only recompute the instruments whose teacher blocks changed
+        if cleaned_df is None:
+            return {}
+        return calculate_aggregates_incremental(sheet_url, cleaned_df, month, month_num)
+
+    def write(cleaned_df, worksheet, old_dfs, aggregates) -> bool:
+        # Merge and write every Recap table at once
+        if cleaned_df is None:
+            return False
+        update_recap(worksheet, cleaned_df, month, month_num, aggregates, old_dfs)
+        if use_cache:
+            mark_months_written(sheet_url, [month])
+        return True
+
+    dag = run_dag({
+        'auth': (session.ensure_fresh_token, []),
+        'extract': (extract, ['auth'] if downloads_with_session(export_url) else []),
+        'warehouse': (warehouse, ['extract']),
+        'worksheet': (lambda _: get_recap_worksheet(sheet_url, recap_sheet_title, service_account_path, sheets_client), ['auth']),
+        'read_recap': (read_recap_tables, ['worksheet']),
+        'aggregate': (aggregate_incremental if incremental else aggregate, ['extract']),
+        'write': (write, ['extract', 'worksheet', 'read_recap', 'aggregate']),
+    })
+    set_run_field('dag', dag.report())
+    return dag.results['write']
+
+
+def run_etl_months(
+        sheet_url: str,
+        recap_sheet_title: str,
+        service_account_path: str,
+        selected_months: Optional[List[str]],
+        use_cache: bool = True,
+        export_url: Optional[str] = None,
+        sheets_client: Optional[SheetsClient] = None,
+        prepare_workers: Optional[int] = None,
+        year: Optional[int] = None
+    ) -> List[str]:
+    '''
+    Backfills several months of one spreadsheet: the workbook is fetched and
+    parsed once and every Recap table is read and written once. As in
+    `run_etl`, the download and parsing overlap with the Recap reads. The
+    month tabs are prepared by `prepare_workers` processes (see
+    `prepare_workbook_months`). The `year` of the month tabs is required
+    (see `require_year`). Returns the months that were updated.
+    '''
+    year = require_year(year)
+
+    # Authorized session shared by the export download and the API calls
+    session = get_session(service_account_path)
+
+    def extract(*_) -> Dict[str, pd.DataFrame]:
+        # Fetch the workbook once and prepare every month tab
+        if use_cache:
+            return fetch_and_prepare_data_cached(sheet_url, selected_months, export_url, session.session, prepare_workers)
+        return fetch_and_prepare_months(sheet_url, selected_months, session.session, prepare_workers)
+
+    def warehouse(cleaned_dfs: Dict[str, pd.DataFrame]) -> None:
+        # Keep the cleaned data of every month in the local warehouse
+        if cleaned_dfs:
+            persist_to_warehouse(sheet_url, cleaned_dfs, year)
+
+    def write(cleaned_dfs, worksheet, old_dfs) -> List[str]:
+        # Aggregate and write every Recap table at once
+        if not cleaned_dfs:
+            return []
+        update_recap_months(worksheet, cleaned_dfs, old_dfs)
+        if use_cache:
+            mark_months_written(sheet_url, list(cleaned_dfs))
+        return list(cleaned_dfs)
+
+    dag = run_dag({
+        'auth': (session.ensure_fresh_token, []),
+        'extract': (extract, ['auth'] if downloads_with_session(export_url) else []),
+        'warehouse': (warehouse, ['extract']),
+        'worksheet': (lambda _: get_recap_worksheet(sheet_url, recap_sheet_title, service_account_path, sheets_client), ['auth']),
+        'read_recap': (read_recap_tables, ['worksheet']),
+        'write': (write, ['extract', 'worksheet', 'read_recap']),
+    })
+    set_run_field('dag', dag.report())
+    return dag.results['write']
+
+
+def load_branch_configs(path: str, service_account_path: Optional[str] = None) -> List[dict]:
+    '''
+    Reads the spreadsheet of every branch from a JSON file holding a list of
+    {"name", "sheet_url", "recap_sheet_title", "service_account_path"} objects.
+    `service_account_path` falls back to the given default.
+    '''
+    with open(path) as f:
+        branches = json.load(f)
+
+    for i, branch in enumerate(branches):
+        branch.setdefault('name', branch.get('sheet_url', f'branch {i}'))
+        branch.setdefault('service_account_path', service_account_path)
+        missing = [key for key in ('sheet_url', 'recap_sheet_title', 'service_account_path') if not branch.get(key)]
+        if missing:
+            raise ValueError(f"Branch '{branch['name']}' is missing {', '.join(missing)}")
+    return branches
+
+
+def run_etl_branches(
+        branches: List[dict],
+        month: str,
+        month_num: int,
+        max_workers: int = 8,
+        use_cache: bool = True,
+        incremental: bool = False
+    ) -> Dict[str, Union[bool, Exception]]:
+    '''
+    Runs `run_etl` for every branch spreadsheet concurrently on a thread pool.
+    Branches sharing a service account share one `SheetsClient`, so they stay
+    within that account's quota together. A failing branch does not affect the
+    others: returns, for each branch name, the result of `run_etl` (False if
+    skipped as unchanged) or the exception it raised. The shared workbook
+    cache is evicted once, after every branch is done, so that no branch
+    removes the cache entries of another one while it runs.
+    '''
+    # One client per service account, with a budget for each of its branches
+    client_config = get_sheets_client_config()
+    branch_counts = Counter(branch['service_account_path'] for branch in branches)
+    sheets_clients = {
+        path: SheetsClient(**{**client_config, 'request_budget': client_config['request_budget'] * count})
+        for path, count in branch_counts.items()
+    }
+
+    results: Dict[str, Union[bool, Exception]] = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(
+                run_etl, branch['sheet_url'], branch['recap_sheet_title'], branch['service_account_path'],
+                month, month_num, use_cache, incremental, branch.get('export_url'),
+                sheets_clients[branch['service_account_path']], evict=False): branch['name']
+            for branch in branches
+        }
+        for future in as_completed(futures):
+            exception = future.exception()
+            results[futures[future]] = exception if exception is not None else future.result()
+
+    if use_cache:
+        evict_cache(**get_cache_config())
 
-    # Get spreadsheet table 'old_df'
-    old_df = get_spreadsheet_table(worksheet, **fee_config)
+    return results
 
-    # Column dtypes
-    old_df = fix_int_columns_dtype(old_df, **fee_config)
 
-    # ETL (Get new/updated data)
-    res_murid = calculate_fee_aggregate(cleaned_df, month, month_num)
+def get_source(
+        backends_config: dict,
+        sheet_url: Optional[str] = None,
+        session: Optional[requests.Session] = None
+    ):
+    '''
+    Returns the source backend selected in `config.backends`. Google Sheets
+    downloads (and version polls) go through the (authorized) `session`, if any.
+    '''
+    source = backends_config['source']
+    if source == 'gsheet':
+        return GoogleSheetSource(sheet_url, session)
+    if source == 'xlsx':
+        return XlsxFileSource(backends_config['source_path'])
+    if source == 'csv':
+        return CsvDirSource(backends_config['source_path'])
+    raise ValueError(f"Unknown source backend: {source}")
+
+
+def get_sink(
+        backends_config: dict,
+        sheet_url: Optional[str] = None,
+        recap_sheet_title: Optional[str] = None,
+        service_account_path: Optional[str] = None,
+        sheets_client: Optional[SheetsClient] = None
+    ):
+    '''
+    Returns the (worksheet-compatible) sink backend selected in `config.backends`.
+    '''
+    sink = backends_config['sink']
+    if sink == 'gsheet':
+        return get_recap_worksheet(sheet_url, recap_sheet_title, service_account_path, sheets_client)
+    if sink == 'memory':
+        return InMemoryWorksheet()
+    if sink in ('csv', 'parquet'):
+        return FileTablesWorksheet(backends_config['sink_path'], get_recap_table_configs(), sink)
+    raise ValueError(f"Unknown sink backend: {sink}")
+
+
+def run_etl_backends(source, worksheet, selected_months: Optional[List[str]]) -> List[str]:
+    '''
+    Runs the ETL of the selected months (every month tab if None) from any
+    source backend into any worksheet-compatible sink, e.g. entirely offline.
+    Returns the months that were updated.
+    '''
+    with stage('extract') as record:
+        raw_dfs = source.read_months(selected_months)
+        record['months'] = list(raw_dfs)
+        record['rows_out'] = sum(len(df) for df in raw_dfs.values())
+    cleaned_dfs = {month: prepare_filtered_data(df, month) for month, df in raw_dfs.items()}
+    if cleaned_dfs:
+        update_recap_months(worksheet, cleaned_dfs)
+    return list(cleaned_dfs)
+
+
+def run_etl_raw_months(
+        worksheet,
+        raw_dfs: Dict[str, pd.DataFrame],
+        sheet_url: Optional[str] = None,
+        old_dfs: Optional[Dict[str, pd.DataFrame]] = None,
+        year: Optional[int] = None
+    ) -> Dict[str, pd.DataFrame]:
+    '''
+    Runs the ETL of month sheets already read from a source backend (e.g. by
+    `utils.daemon.ChangeWatcher`): cleans them, keeps them in the warehouse
+    (with a `sheet_url`, as data of `year`) and updates the Recap. Returns the updated Recap
+    tables, which can be passed as `old_dfs` to the next call instead of
+    reading the Recap again.
+    '''
+    cleaned_dfs = {month: prepare_filtered_data(df, month) for month, df in raw_dfs.items()}
+    if sheet_url:
+        persist_to_warehouse(sheet_url, cleaned_dfs, year)
+    return update_recap_months(worksheet, cleaned_dfs, old_dfs)
 
-    # Update with old data
-    updated_murid = update_by_month(old_df=old_df, updated_df=res_murid, month_num=month_num)
 
-    # Update to google spreadsheet's worksheet
-    update_to_spreadsheet_worksheet(worksheet, updated_murid, **fee_config)
\ No newline at end of file
+def rebuild_recap(
+        sheet_url: str,
+        worksheet,
+        year: int,
+        selected_months: Optional[List[str]] = None
+    ) -> List[str]:
+    '''
+    Recomputes the Recap tables of the selected months (every month if None)
+    of a year from the local warehouse only, without downloading or parsing
+    the workbook. Only the columns needed by the aggregations are read.
+    Returns the months that were updated.
+    '''
+    warehouse_config = get_warehouse_config()
+    with stage('extract') as record:
+        cleaned_dfs = read_warehouse_months(
+            warehouse_config['warehouse_dir'], get_sheet_id(sheet_url), year, selected_months,
+            columns=get_source_cols())
+        record['months'] = list(cleaned_dfs)
+        record['rows_out'] = sum(len(df) for df in cleaned_dfs.values())
+
+    if cleaned_dfs:
+        update_recap_months(worksheet, cleaned_dfs)
+    return list(cleaned_dfs)
@@ -1,3 +1,4 @@
+import json
 import logging
 
 def setup_logger(name: str, log_file: str = 'status.log') -> logging.Logger:
@@ -5,6 +6,10 @@ def setup_logger(name: str, log_file: str = 'status.log') -> logging.Logger:
     logger = logging.getLogger(name)
     logger.setLevel(logging.INFO)
 
+    # Don't add a second file handler if the logger is set up again
+    if any(isinstance(handler, logging.FileHandler) for handler in logger.handlers):
+        return logger
+
     # Create formatter
     formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
 
@@ -16,4 +21,8 @@ def setup_logger(name: str, log_file: str = 'status.log') -> logging.Logger:
     # Add file handler to logger
     logger.addHandler(file_handler)
 
-    return logger
\ No newline at end of file
+    return logger
+
+def log_run_metrics(logger: logging.Logger, record: dict) -> None:
+    # One JSON record per run, on a single line so it can be grepped and parsed
+    logger.info(f"Metrics: {json.dumps(record, default=str)}")
@@ -1,8 +1,13 @@
 import os
-from functions import (
-    get_month_and_month_num, fetch_and_prepare_data, get_recap_worksheet,
-    etl_student_data, etl_fee_data)
-from logger_config import setup_logger
+import sys
+import time
+import argparse
+from typing import List, Optional
+from logger_config import setup_logger, log_run_metrics
+from utils.metrics import RunMetrics, set_run_field, profiled
+
+# pandas, gspread and google-auth are imported by the commands that need them
+# (through `functions`), so that `check` and `--help` start instantly.
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -10,33 +15,347 @@ load_dotenv()
 sheet_url = os.getenv("sheet_url")
 service_account_path = os.getenv("service_account_path")
 recap_sheet_title = os.getenv("recap_sheet_title")
+export_url = os.getenv("export_url")
 
 # Setup logger
 logger = setup_logger(__name__)
 
-def main() -> None:
+def main(use_cache: bool = True, incremental: bool = False, trace_memory: bool = False) -> None:
+    from functions import get_month_and_month_num, run_etl, get_source, get_sink, run_etl_backends
+    from utils.backends import get_backends_config
+    from utils.sheets_client import SheetsClient, get_sheets_client_config
+
+    sheets_client = SheetsClient(**get_sheets_client_config())
+    metrics = RunMetrics('main', sheets_client, trace_memory)
+    try:
+        with metrics:
+            # Get the number of month
+            # (and also month name if 'month' is None)
+            month, month_num = get_month_and_month_num()
+            set_run_field('months', [month])
+
+            # Execute the ETL (fetch, aggregate, write every Recap table at once)
+            backends_config = get_backends_config()
+            if backends_config['source'] == 'gsheet' and backends_config['sink'] == 'gsheet':
+                updated = run_etl(
+                    sheet_url, recap_sheet_title, service_account_path, month, month_num,
+                    use_cache, incremental, export_url, sheets_client)
+            else:
+                source = get_source(backends_config, sheet_url)
+                worksheet = get_sink(backends_config, sheet_url, recap_sheet_title, service_account_path, sheets_client)
+                updated = bool(run_etl_backends(source, worksheet, [month]))
+            set_run_field('updated', updated)
+
+        # Log success message
+        if updated:
+            logger.info(f"Status: {month} data is successfully updated")
+        else:
+            logger.info(f"Status: {month} data is unchanged, skipping update")
+    
+    except Exception as e:
+        # Log error message
+        logger.error(f"An error occurred: {e}")
+        logger.error("", exc_info=True)
+
+    finally:
+        if sheets_client.stats['requests']:
+            sheets_client.log_stats(logger)
+        log_run_metrics(logger, metrics.record())
+
+
+def backfill(
+        months_spec: str,
+        use_cache: bool = True,
+        trace_memory: bool = False,
+        prepare_workers: Optional[int] = None,
+        year: Optional[int] = None
+    ) -> None:
+    from functions import parse_months, run_etl_months, get_source, get_sink, run_etl_backends
+    from utils.backends import get_backends_config
+    from utils.sheets_client import SheetsClient, get_sheets_client_config
+
+    sheets_client = SheetsClient(**get_sheets_client_config())
+    metrics = RunMetrics('backfill', sheets_client, trace_memory)
+    try:
+        with metrics:
+            # Parse requested months (None means every month tab)
+            selected_months = parse_months(months_spec)
+
+            # Execute the ETL for every month (one download, one read and one write)
+            backends_config = get_backends_config()
+            if backends_config['source'] == 'gsheet' and backends_config['sink'] == 'gsheet':
+                updated_months = run_etl_months(
+                    sheet_url, recap_sheet_title, service_account_path, selected_months,
+                    use_cache, export_url, sheets_client, prepare_workers, year)
+            else:
+                source = get_source(backends_config, sheet_url)
+                worksheet = get_sink(backends_config, sheet_url, recap_sheet_title, service_account_path, sheets_client)
+                updated_months = run_etl_backends(source, worksheet, selected_months)
+            set_run_field('months', updated_months)
+
+        # Log success message
+        if updated_months:
+            logger.info(f"Status: {', '.join(updated_months)} data is successfully updated")
+        else:
+            logger.info(f"Status: {months_spec} data is unchanged, skipping update")
+
+    except Exception as e:
+        # Log error message
+        logger.error(f"An error occurred: {e}")
+        logger.error("", exc_info=True)
+
+    finally:
+        if sheets_client.stats['requests']:
+            sheets_client.log_stats(logger)
+        log_run_metrics(logger, metrics.record())
+
+
+def rebuild(months_spec: Optional[str], year: Optional[int] = None, trace_memory: bool = False) -> None:
+    from functions import require_year, parse_months, get_sink, rebuild_recap
+    from utils.backends import get_backends_config
+    from utils.sheets_client import SheetsClient, get_sheets_client_config
+
+    sheets_client = SheetsClient(**get_sheets_client_config())
+    metrics = RunMetrics('rebuild', sheets_client, trace_memory)
+    try:
+        with metrics:
+            # Parse requested months (None means every month in the warehouse)
+            selected_months = parse_months(months_spec) if months_spec else None
+            year = require_year(year)
+
+            # Recompute the Recap tables from the local warehouse (no download)
+            worksheet = get_sink(get_backends_config(), sheet_url, recap_sheet_title, service_account_path, sheets_client)
+            updated_months = rebuild_recap(sheet_url, worksheet, year, selected_months)
+            set_run_field('months', updated_months)
+
+        # Log success message
+        if updated_months:
+            logger.info(f"Status: {', '.join(updated_months)} {year} data is rebuilt from the warehouse")
+        else:
+            logger.info(f"Status: no {year} data in the warehouse, nothing to rebuild")
+
+    except Exception as e:
+        # Log error message
+        logger.error(f"An error occurred: {e}")
+        logger.error("", exc_info=True)
+
+    finally:
+        if sheets_client.stats['requests']:
+            sheets_client.log_stats(logger)
+        log_run_metrics(logger, metrics.record())
+
+
+def run_branches(
+        branches_path: str,
+        max_workers: int,
+        use_cache: bool = True,
+        incremental: bool = False
+    ) -> None:
+    from functions import get_month_and_month_num, load_branch_configs, run_etl_branches
+
     try:
         # Get the number of month
         # (and also month name if 'month' is None)
         month, month_num = get_month_and_month_num()
 
-        # Fetch data and prepare it for processing
-        cleaned_df = fetch_and_prepare_data(sheet_url, month)
+        # Execute the ETL of every branch concurrently
+        branches = load_branch_configs(branches_path, service_account_path)
+        results = run_etl_branches(branches, month, month_num, max_workers, use_cache, incremental)
 
-        # Get the worksheet where data will be written
-        worksheet = get_recap_worksheet(sheet_url, recap_sheet_title, service_account_path)
-        
-        # Execute ETL processes for student and fee data
-        etl_student_data(cleaned_df, worksheet, month, month_num)
-        etl_fee_data(cleaned_df, worksheet, month, month_num)
+        # Log the status of every branch, then a summary
+        for name, result in results.items():
+            if isinstance(result, Exception):
+                logger.error(f"Status: [{name}] an error occurred: {result}")
+                logger.error("", exc_info=result)
+            elif result:
+                logger.info(f"Status: [{name}] {month} data is successfully updated")
+            else:
+                logger.info(f"Status: [{name}] {month} data is unchanged, skipping update")
+
+        failed = [name for name, result in results.items() if isinstance(result, Exception)]
+        logger.info(
+            f"Status: {month} done for {len(results) - len(failed)}/{len(results)} branches"
+            + (f", failed: {', '.join(failed)}" if failed else ""))
 
-        # Log success message
-        logger.info(f"Status: {month} data is successfully updated")
-    
     except Exception as e:
         # Log error message
         logger.error(f"An error occurred: {e}")
         logger.error("", exc_info=True)
 
+
+def watch(
+        poll_seconds: Optional[float] = None,
+        debounce_seconds: Optional[float] = None,
+        max_wait_seconds: Optional[float] = None,
+        trace_memory: bool = False,
+        year: Optional[int] = None
+    ) -> None:
+    from functions import require_year, get_source, get_sink, run_etl_raw_months
+    from utils.backends import get_backends_config
+    from utils.daemon import ChangeWatcher, get_daemon_config
+    from utils.sessions import get_session
+    from utils.sheets_client import SheetsClient, get_sheets_client_config
+
+    # Every month tab is watched, their year cannot be assumed
+    year = require_year(year)
+
+    # Clients, worksheet and Recap tables are kept between the runs
+    sheets_client = SheetsClient(**get_sheets_client_config())
+    backends_config = get_backends_config()
+    session = get_session(service_account_path).session if backends_config['source'] == 'gsheet' else None
+    source = get_source(backends_config, sheet_url, session)
+    worksheet = get_sink(backends_config, sheet_url, recap_sheet_title, service_account_path, sheets_client)
+    recap = {'tables': None}
+
+    def on_change(raw_dfs) -> None:
+        # The request budget is per run, not for the lifetime of the daemon
+        sheets_client.begin_run()
+        metrics = RunMetrics('watch', sheets_client, trace_memory)
+        try:
+            with metrics:
+                set_run_field('months', list(raw_dfs))
+                recap['tables'] = run_etl_raw_months(worksheet, raw_dfs, sheet_url, recap['tables'], year)
+            logger.info(f"Status: {', '.join(raw_dfs)} data is successfully updated")
+        except Exception:
+            # Read the Recap again on the next run, it may be partially updated
+            recap['tables'] = None
+            raise
+        finally:
+            log_run_metrics(logger, metrics.record())
+
+    # An explicit 0 is kept, only missing options fall back to the config
+    config = get_daemon_config()
+    watcher = ChangeWatcher(
+        source, on_change,
+        config['poll_seconds'] if poll_seconds is None else poll_seconds,
+        config['debounce_seconds'] if debounce_seconds is None else debounce_seconds,
+        config['max_wait_seconds'] if max_wait_seconds is None else max_wait_seconds)
+    logger.info(f"Status: watching for changes every {watcher.poll_seconds} seconds")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logger.info(f"Status: stopped watching ({dict(watcher.stats)})")
+
+
+def check() -> bool:
+    '''
+    Validates the environment variables and the configuration without
+    importing the ETL dependencies, and prints a report. Returns True if
+    every check passed.
+    '''
+    from utils.check import check_environment
+
+    start = time.perf_counter()
+    env = {name: os.getenv(name) for name in ('sheet_url', 'service_account_path', 'recap_sheet_title', 'month', 'year')}
+    results = check_environment(env)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    for name, problem in results:
+        print(f"{'OK' if problem is None else 'FAIL':<4} {name}" + (f": {problem}" if problem else ""))
+    failed = sum(problem is not None for _, problem in results)
+    print(f"{len(results) - failed}/{len(results)} checks passed in {elapsed_ms:.1f} ms")
+    return not failed
+
+
+COMMANDS = ('run', 'backfill', 'rebuild', 'watch', 'check')
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    # Options shared by the commands that run the ETL
+    metrics_options = argparse.ArgumentParser(add_help=False)
+    metrics_options.add_argument(
+        '--trace-memory', action='store_true',
+        help="Record the peak traced memory of every stage in the run metrics (slower)")
+    metrics_options.add_argument(
+        '--profile', metavar='PATH',
+        help="Profile the run with cProfile and dump the stats to PATH")
+    common = argparse.ArgumentParser(add_help=False, parents=[metrics_options])
+    common.add_argument(
+        '--no-cache', action='store_true',
+        help="Always download and reprocess the workbook, ignoring the local cache")
+
+    # Month tabs other than the current one may be from a past year
+    year_option = argparse.ArgumentParser(add_help=False)
+    year_option.add_argument(
+        '--year', type=int,
+        help="Year of the month tabs (required unless the 'year' environment variable is set)")
+
+    parser = argparse.ArgumentParser(description="Music tutoring spreadsheet ETL")
+    commands = parser.add_subparsers(dest='command', metavar='{run,backfill,rebuild,watch,check}')
+
+    run = commands.add_parser('run', parents=[common], help="Update the Recap with the current month (default)")
+    run.add_argument(
+        '--incremental', action='store_true',
+        help="Only recompute the instruments whose teacher blocks changed since the last incremental run")
+    run.add_argument(
+        '--branches',
+        help="JSON file listing the spreadsheet of every branch, processed concurrently")
+    run.add_argument(
+        '--workers', type=int, default=8,
+        help="Number of branches processed at the same time (with --branches)")
+
+    backfill = commands.add_parser('backfill', parents=[common, year_option], help="Update several months at once")
+    backfill.add_argument(
+        'months',
+        help="Months to backfill, e.g. 'Januari..Desember', 'Januari,Maret' or 'all'")
+    backfill.add_argument(
+        '--prepare-workers', type=int, metavar='N',
+        help="Processes parsing and cleaning the month tabs in parallel (see config/parallel.py)")
+
+    rebuild = commands.add_parser(
+        'rebuild', parents=[common, year_option],
+        help="Recompute the Recap tables from the local warehouse, without downloading the workbook")
+    rebuild.add_argument(
+        '--months',
+        help="Months to rebuild (defaults to every month of the year in the warehouse)")
+
+    watch = commands.add_parser(
+        'watch', parents=[metrics_options, year_option],
+        help="Keep running and update the months that changed whenever the spreadsheet is edited")
+    watch.add_argument(
+        '--poll', type=float, metavar='SECONDS',
+        help="Seconds between two version polls (see config/daemon.py)")
+    watch.add_argument(
+        '--debounce', type=float, metavar='SECONDS',
+        help="Seconds without new edits before the changed months are processed")
+    watch.add_argument(
+        '--max-wait', type=float, metavar='SECONDS',
+        help="Longest delay between an edit and its processing during a burst of edits")
+
+    commands.add_parser('check', help="Validate the environment variables and the configuration")
+
+    # Without a command, run the ETL of the current month
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ('-h', '--help')):
+        argv = ['run', *argv]
+    return parser.parse_args(argv)
+
+
+def cli(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.command == 'check':
+        return 0 if check() else 1
+
+    # Warnings of the utils modules (e.g. invalid cells) go to the same log
+    setup_logger('utils')
+
+    with profiled(args.profile):
+        if args.command == 'watch':
+            watch(args.poll, args.debounce, args.max_wait, trace_memory=args.trace_memory, year=args.year)
+        elif args.command == 'rebuild':
+            rebuild(args.months, args.year, trace_memory=args.trace_memory)
+        elif args.command == 'backfill':
+            backfill(
+                args.months, use_cache=not args.no_cache, trace_memory=args.trace_memory,
+                prepare_workers=args.prepare_workers, year=args.year)
+        elif args.branches:
+            run_branches(args.branches, args.workers, use_cache=not args.no_cache, incremental=args.incremental)
+        else:
+            main(use_cache=not args.no_cache, incremental=args.incremental, trace_memory=args.trace_memory)
+    return 0
+
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    sys.exit(cli())
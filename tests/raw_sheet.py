@@ -0,0 +1,45 @@
+import pandas as pd
+from io import BytesIO
+from typing import Dict, List, Tuple
+
+HEADER = ['No', 'Nama', 'Jadwal', 'Harga', 'Biaya Pendaftaran', 'Keterangan', 'Keterangan Tambahan']
+
+
+def make_raw_sheet(blocks: List[Tuple[str, str, List[list]]]) -> pd.DataFrame:
+    '''
+    Builds a raw month sheet (as read with `header=None`) from a list of
+    (teacher, instrument, rows) blocks, where each row is
+    [nama, jadwal, harga, biaya_pendaftaran, keterangan].
+    '''
+    empty = [None] * len(HEADER)
+    raw = []
+    for teacher, instrument, rows in blocks:
+        raw.append(['Teacher', teacher] + [None] * 5)
+        raw.append(['Instrument', instrument] + [None] * 5)
+        raw.append(HEADER)
+        for i, row in enumerate(rows, start=1):
+            raw.append([i] + row + [None])
+        raw.append([None, None, None, 'Total per bulan', sum(r[2] for r in rows), None, None])
+        raw.append(empty)
+    return pd.DataFrame(raw)
+
+
+def make_cleaned_df(blocks: List[Tuple[str, str, List[list]]]) -> pd.DataFrame:
+    '''
+    Builds the cleaned data of the raw month sheet of `make_raw_sheet`.
+    '''
+    from functions import prepare_filtered_data
+    from utils.create_clean_data import remove_unnecessary_rows
+    return prepare_filtered_data(remove_unnecessary_rows(make_raw_sheet(blocks)))
+
+
+def make_workbook_bytes(sheets: Dict[str, pd.DataFrame]) -> bytes:
+    '''
+    Writes raw sheets into an in-memory xlsx workbook, standing in
+    for the Google Sheets export.
+    '''
+    buffer = BytesIO()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        for sheet_name, df in sheets.items():
+            df.to_excel(writer, sheet_name=sheet_name, header=False, index=False)
+    return buffer.getvalue()
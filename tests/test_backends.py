@@ -0,0 +1,52 @@
+import pytest
+
+from functions import get_source, get_sink, run_etl_backends, read_recap_tables
+from utils.backends import CsvDirSource, FileTablesWorksheet
+from tests.raw_sheet import make_raw_sheet, make_workbook_bytes
+
+JANUARI = make_raw_sheet([
+    ('Budi', 'Piano', [['Alice', 'Senin', 100, 50, 'baru'], ['Bob', 'Selasa', 150, None, 'lunas']]),
+    ('Sari', 'Gitar', [['Charlie', 'Rabu', 200, None, 'cuti']]),
+])
+FEBRUARI = make_raw_sheet([('Budi', 'Piano', [['Alice', 'Senin', 100, None, 'lunas']])])
+
+
+@pytest.mark.parametrize("file_format", ["csv", "parquet"])
+def test_run_etl_backends_offline(tmp_path, file_format):
+    workbook_path = tmp_path / 'export.xlsx'
+    workbook_path.write_bytes(make_workbook_bytes({'Januari': JANUARI, 'Februari': FEBRUARI}))
+    backends_config = {
+        'source': 'xlsx', 'source_path': str(workbook_path),
+        'sink': file_format, 'sink_path': str(tmp_path / 'recap')
+    }
+
+    # First run creates the tables, the second one adds a month to them
+    source = get_source(backends_config)
+    assert run_etl_backends(source, get_sink(backends_config), ['Januari']) == ['Januari']
+    assert run_etl_backends(source, get_sink(backends_config), None) == ['Januari', 'Februari']
+
+    # Tables are read back from the files
+    old_dfs = read_recap_tables(get_sink(backends_config))
+    assert (tmp_path / 'recap' / f'fee.{file_format}').exists()
+    assert old_dfs['fee'][['month_num', 'instrument', 'biaya_spp']].values.tolist() == [
+        [1, 'Gitar', 200], [1, 'Piano', 250], [2, 'Piano', 100]]
+    assert old_dfs['student']['total'].tolist() == [1, 2, 1]
+
+
+def test_csv_dir_source(tmp_path):
+    JANUARI.to_csv(tmp_path / 'Januari.csv', header=False, index=False)
+
+    result = CsvDirSource(str(tmp_path)).read_months()
+
+    assert list(result) == ['Januari']
+    assert result['Januari'].iloc[:, 1].dropna().tolist() == [
+        'Budi', 'Piano', 'Nama', 'Alice', 'Bob', 'Sari', 'Gitar', 'Nama', 'Charlie']
+
+
+def test_unknown_backends():
+    with pytest.raises(ValueError):
+        get_source({'source': 'ftp'})
+    with pytest.raises(ValueError):
+        get_sink({'sink': 'ftp'})
+    with pytest.raises(ValueError):
+        FileTablesWorksheet('recap', {}, 'xml')
@@ -0,0 +1,25 @@
+from benchmarks.bench_pipeline import run_benchmarks, find_regressions
+from benchmarks.synthetic import make_raw_sheet_df
+
+
+def test_make_raw_sheet_df_scales_with_blocks():
+    df = make_raw_sheet_df(n_rows=100, n_blocks=10)
+    assert (df[0] == 'Teacher').sum() == 10
+
+
+def test_run_benchmarks_covers_every_stage():
+    results = run_benchmarks([('tiny', 50, 5)], repeat=1)
+
+    assert list(results['tiny']) == [
+        'remove_unnecessary_rows', 'transform_raw_data', 'clean_transformed_data', 'extract_keterangan_columns',
+        'apply_cleaned_schema', 'calculate_student_aggregate', 'calculate_fee_aggregate', 'calculate_recap_aggregates',
+        'update_by_month']
+
+
+def test_find_regressions():
+    baseline = {'case': {'stage': {'seconds': 0.1, 'peak_mib': 10.0}}}
+    slower = {'case': {'stage': {'seconds': 0.2, 'peak_mib': 10.0}}}
+    same = {'case': {'stage': {'seconds': 0.11, 'peak_mib': 10.5}}}
+
+    assert len(find_regressions(slower, baseline)) == 1
+    assert find_regressions(same, baseline) == []
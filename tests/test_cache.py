@@ -0,0 +1,83 @@
+import os
+import json
+import time
+import shutil
+import unittest.mock as mock
+
+from functions import fetch_and_prepare_data_cached, mark_months_written, prepare_filtered_data
+from utils.cache import (
+    save_workbook_to_cache, load_cache_meta, evict_cache, fingerprint, is_month_unchanged,
+    load_cached_cleaned_df, save_cleaned_df_to_cache, mark_month_written)
+from tests.raw_sheet import make_raw_sheet
+
+SHEET_URL = "https://docs.google.com/spreadsheets/d/sheet_id/edit?usp=sharing"
+
+
+def write_workbook(path, nama):
+    raw = make_raw_sheet([('Budi', 'Piano', [[nama, 'Senin', 100, 50, 'baru']])])
+    raw.to_excel(path, sheet_name='Januari', header=False, index=False)
+
+
+def test_fetch_and_prepare_data_cached(tmp_path):
+    cache_config = {'cache_dir': str(tmp_path / 'cache'), 'max_size_bytes': 10**9, 'max_age_seconds': 3600}
+    workbook_path = tmp_path / 'export.xlsx'
+    export_url = workbook_path.as_uri()
+    write_workbook(workbook_path, 'Alice')
+
+    with mock.patch('functions.get_cache_config', return_value=cache_config), \
+            mock.patch('functions.prepare_filtered_data', wraps=prepare_filtered_data) as mock_prepare:
+        # First run parses the month
+        result = fetch_and_prepare_data_cached(SHEET_URL, ['Januari'], export_url)
+        assert result['Januari']['nama'].tolist() == ['Alice']
+        assert mock_prepare.call_count == 1
+
+        # Not written yet, the cached cleaned_df is reused without parsing
+        result = fetch_and_prepare_data_cached(SHEET_URL, ['Januari'], export_url)
+        assert result['Januari']['nama'].tolist() == ['Alice']
+        assert mock_prepare.call_count == 1
+
+        # Written and unchanged, the run is skipped
+        mark_months_written(SHEET_URL, ['Januari'])
+        assert fetch_and_prepare_data_cached(SHEET_URL, None, export_url) == {}
+
+        # Edited workbook is parsed again
+        write_workbook(workbook_path, 'Bob')
+        result = fetch_and_prepare_data_cached(SHEET_URL, ['Januari'], export_url)
+        assert result['Januari']['nama'].tolist() == ['Bob']
+        assert mock_prepare.call_count == 2
+
+
+def test_evict_cache(tmp_path):
+    cache_dir = str(tmp_path)
+    save_workbook_to_cache(cache_dir, 'old', b'a' * 100)
+    save_workbook_to_cache(cache_dir, 'stale', b'b' * 100)
+    save_workbook_to_cache(cache_dir, 'new', b'c' * 100)
+
+    # Make 'stale' too old and 'old' the least recently accessed
+    for sheet_id, age in [('stale', 7200), ('old', 60)]:
+        meta_path = os.path.join(cache_dir, sheet_id, 'meta.json')
+        meta = load_cache_meta(cache_dir, sheet_id)
+        meta['accessed_at'] = time.time() - age
+        with open(meta_path, 'w') as f:
+            json.dump(meta, f)
+
+    evict_cache(cache_dir, max_size_bytes=400, max_age_seconds=3600)
+
+    assert sorted(os.listdir(cache_dir)) == ['new']
+
+
+def test_cache_meta_evicted_during_run(tmp_path):
+    cache_dir = str(tmp_path)
+    content_hash = save_workbook_to_cache(cache_dir, 'sheet_id', b'workbook')
+    cleaned_df = prepare_filtered_data(make_raw_sheet([('Budi', 'Piano', [['Alice', 'Senin', 100, 50, 'baru']])]))
+
+    # The sheet was evicted (by another run) after its workbook was cached
+    shutil.rmtree(os.path.join(cache_dir, 'sheet_id'))
+    assert load_cached_cleaned_df(cache_dir, 'sheet_id', content_hash, 'Januari') is None
+    save_cleaned_df_to_cache(cache_dir, 'sheet_id', 'Januari', cleaned_df)
+    os.remove(os.path.join(cache_dir, 'sheet_id', 'meta.json'))
+    mark_month_written(cache_dir, 'sheet_id', 'Januari')
+
+    # A partial meta never makes a month look unchanged
+    assert load_cache_meta(cache_dir, 'sheet_id')['months'] == {'Januari': 'written'}
+    assert not is_month_unchanged(cache_dir, 'sheet_id', fingerprint(b'workbook'), 'Januari')
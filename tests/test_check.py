@@ -0,0 +1,48 @@
+import json
+import unittest.mock as mock
+
+from main import parse_args
+from utils.check import check_environment, check_service_account
+
+SHEET_URL = "https://docs.google.com/spreadsheets/d/sheet_id/edit?usp=sharing"
+
+
+def test_check_service_account(tmp_path):
+    path = tmp_path / 'service_account.json'
+    assert check_service_account(None) == "not set"
+    assert check_service_account(str(path)).startswith("file not found")
+
+    path.write_text('{"type": "authorized_user"}')
+    assert check_service_account(str(path)) == "not a service account key file"
+
+    path.write_text(json.dumps({'type': 'service_account', 'client_email': 'etl@x.iam', 'private_key': 'key'}))
+    assert check_service_account(str(path)) is None
+
+
+def test_check_environment(tmp_path):
+    env = {'sheet_url': 'not a url', 'recap_sheet_title': 'Recap', 'service_account_path': None, 'month': 'Maret', 'year': '20x4'}
+
+    problems = dict(check_environment(env))
+
+    assert problems['source'] is None and problems['month'] is None
+    assert problems['sheet_url'] == "The provided URL is not a valid Google Sheets URL."
+    assert problems['service_account_path'] == "not set"
+    assert problems['year'] == "not a year: 20x4"
+
+    # Offline backends don't need any Google setting
+    with mock.patch('config.backends.source', 'xlsx'), \
+            mock.patch('config.backends.source_path', str(tmp_path)), \
+            mock.patch('config.backends.sink', 'memory'):
+        problems = dict(check_environment({'sheet_url': SHEET_URL}))
+    assert 'service_account_path' not in problems
+    assert all(problem is None for name, problem in problems.items() if name != 'pyarrow')
+
+
+def test_parse_args_defaults_to_run():
+    assert parse_args([]).command == 'run'
+    assert parse_args(['--incremental']).incremental
+    args = parse_args(['backfill', 'Januari..Maret', '--no-cache'])
+    assert (args.command, args.months, args.no_cache) == ('backfill', 'Januari..Maret', True)
+    assert parse_args(['rebuild', '--year', '2024']).year == 2024
+    assert parse_args(['backfill', 'all', '--year', '2023']).year == 2023
+    assert parse_args(['watch']).year is None
@@ -1,7 +1,11 @@
 import pytest
 import pandas as pd
+from io import BytesIO
 # from unittest.mock import patch
-from utils.create_clean_data import read_gsheet, remove_unnecessary_rows
+from utils.create_clean_data import (
+    read_gsheet, remove_unnecessary_rows, read_sheets_streaming, transform_raw_data,
+    extract_keterangan_columns, find_invalid_cells, apply_cleaned_schema)
+from tests.raw_sheet import make_raw_sheet, make_workbook_bytes
 
 @pytest.mark.parametrize(
     "sheet_url, expected_exception",
@@ -39,4 +43,114 @@ def test_remove_unnecessary_rows():
     )
     print(expected_df)
 
-    pd.testing.assert_frame_equal(result_df, expected_df)
\ No newline at end of file
+    pd.testing.assert_frame_equal(result_df, expected_df)
+
+def test_read_sheets_streaming():
+    raw = make_raw_sheet([
+        ('Budi', 'Piano', [['Alice', 'Senin', 100, 50, 'baru'], ['Bob', 'Selasa', 150.0, None, 'Lunas']]),
+        ('Sari', 'Gitar', [['Charlie', 'Rabu', 200, None, None]]),
+    ])
+    # Title rows above the first teacher block
+    raw = pd.concat([pd.DataFrame([['Januari 2024'] + [None] * 6, [None] * 7]), raw], ignore_index=True)
+    content = make_workbook_bytes({'Recap': pd.DataFrame([[1, 2]]), 'Januari': raw})
+
+    result = read_sheets_streaming(content, ['Januari'])
+
+    assert list(result) == ['Januari']
+    expected = transform_raw_data(remove_unnecessary_rows(pd.read_excel(BytesIO(content), sheet_name='Januari', header=None)))
+    pd.testing.assert_frame_equal(transform_raw_data(result['Januari']), expected)
+
+    # Missing sheets
+    assert read_sheets_streaming(content, ['Maret'], missing_ok=True) == {}
+    with pytest.raises(RuntimeError):
+        read_sheets_streaming(content, ['Maret'])
+
+
+def test_extract_keterangan_columns():
+    keterangan = ['Baru, Lunas', '', 'TRIAL', 'cuti', 'Keluar', 'belum lunas', 'Baru, Lunas']
+    result_df = extract_keterangan_columns(pd.DataFrame({'keterangan': keterangan}))
+
+    expected_df = pd.DataFrame({
+        'keterangan': keterangan,
+        'is_trial': [0, 0, 1, 0, 0, 0, 0],
+        'is_baru': [1, 0, 0, 0, 0, 0, 1],
+        'is_keluar': [0, 0, 0, 0, 1, 0, 0],
+        'is_cuti': [0, 0, 0, 1, 0, 0, 0],
+        'not_lunas': [0, 1, 1, 1, 1, 0, 0],
+    })
+    expected_df = expected_df.astype({col: 'int8' for col in expected_df.columns[1:]})
+    pd.testing.assert_frame_equal(result_df, expected_df)
+
+
+def test_extract_keterangan_columns_non_string():
+    from config.keterangan import keyword_flags
+    keterangan = ['Baru', 5, None, 'lunas', 3.5, float('nan')]
+    result_df = extract_keterangan_columns(pd.DataFrame({'keterangan': keterangan}, dtype=object))
+
+    # Same flags as searching every keyword with `str.contains`
+    lowered = pd.Series(keterangan, dtype=object).str.lower()
+    for col, (keyword, inverted) in keyword_flags.items():
+        found = lowered.str.contains(keyword, na=False)
+        expected = (~found if inverted else found).astype('int8')
+        assert result_df[col].tolist() == expected.tolist(), col
+
+    # Without any string value at all
+    result_df = extract_keterangan_columns(pd.DataFrame({'keterangan': [5, None]}, dtype=object))
+    assert result_df['is_baru'].tolist() == [0, 0]
+    assert result_df['not_lunas'].tolist() == [1, 1]
+
+
+def test_apply_cleaned_schema(caplog):
+    cleaned_df = extract_keterangan_columns(pd.DataFrame({
+        'nama': ['Alice', 'Bob', 'Charlie'],
+        'jadwal': ['Senin', 'Senin', 'Rabu'],
+        'biaya_spp': [100, 'Rp 150', 200.0],
+        'biaya_regis': [50, 0, None],
+        'keterangan': ['baru', 'lunas', 'lunas'],
+        'instrument': ['Piano', 'Piano', 'Gitar'],
+        'teacher': ['Budi', 'Budi', 'Sari'],
+    }))
+
+    # Invalid cells are reported, not raised
+    invalid_cells = find_invalid_cells(cleaned_df, sheet_name='Januari')
+    assert invalid_cells == [{'column': 'biaya_spp', 'row': 2}]
+    assert "1 invalid biaya_spp cells in Januari (data rows 2), counted as 0" in caplog.text
+    # Names and fees stay out of status.log, which is committed
+    assert 'Bob' not in caplog.text and 'Rp 150' not in caplog.text
+
+    result_df = apply_cleaned_schema(cleaned_df)
+
+    assert result_df['biaya_spp'].tolist() == [100, 0, 200]
+    assert result_df['biaya_regis'].tolist() == [50, 0, 0]
+    assert result_df['biaya_spp'].dtype == 'int64'
+    assert result_df['is_baru'].dtype == 'int8'
+    assert result_df['instrument'].dtype == 'category'
+    assert result_df['teacher'].tolist() == ['Budi', 'Budi', 'Sari']
+
+
+def test_transform_raw_data():
+    raw = make_raw_sheet([
+        ('Budi', 'Piano', [['Alice', 'Senin', 100, 50, 'baru'], ['Bob', 'Selasa', 150, None, 'Lunas']]),
+        ('Sari', 'Gitar', [['Charlie', 'Rabu', 200, None, None]]),
+    ])
+    result_df = transform_raw_data(remove_unnecessary_rows(raw))
+
+    expected_df = pd.DataFrame({
+        'nama': ['Alice', 'Bob', 'Charlie'],
+        'jadwal': ['Senin', 'Selasa', 'Rabu'],
+        'harga': [100, 150, 200],
+        'biaya_pendaftaran': [50, None, None],
+        'keterangan': ['baru', 'Lunas', None],
+        'instrument': ['Piano', 'Piano', 'Gitar'],
+        'teacher': ['Budi', 'Budi', 'Sari'],
+    }, dtype=object)
+    pd.testing.assert_frame_equal(result_df, expected_df)
+
+
+def test_transform_raw_data_many_blocks():
+    blocks = [(f'Teacher {i}', f'Instrument {i % 7}', [[f'Student {i}', 'Senin', 100, None, '']] * 3) for i in range(300)]
+    result_df = transform_raw_data(remove_unnecessary_rows(make_raw_sheet(blocks)))
+
+    assert len(result_df) == 900
+    assert result_df['teacher'].tolist() == [f'Teacher {i}' for i in range(300) for _ in range(3)]
+    assert result_df['instrument'].tolist() == [f'Instrument {i % 7}' for i in range(300) for _ in range(3)]
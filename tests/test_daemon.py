@@ -0,0 +1,193 @@
+import os
+import unittest.mock as mock
+
+import pandas as pd
+
+import main
+from functions import read_recap_tables, run_etl_raw_months
+from utils.backends import CsvDirSource, GoogleSheetSource, InMemoryWorksheet
+from utils.daemon import ChangeWatcher, fingerprint_months
+from tests.raw_sheet import make_raw_sheet
+
+JANUARI = make_raw_sheet([('Budi', 'Piano', [['Alice', 'Senin', 100, 50, 'baru']])])
+FEBRUARI = make_raw_sheet([('Sari', 'Gitar', [['Charlie', 'Rabu', 200, None, 'cuti']])])
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class EditableSheets:
+    '''
+    Local stand-in for the spreadsheet: a `CsvDirSource` whose month tabs
+    are edited by rewriting their files.
+    '''
+    def __init__(self, path, sheets):
+        self.path = path
+        self.edits = 0
+        for month, df in sheets.items():
+            self.edit(month, df)
+        self.source = mock.Mock(wraps=CsvDirSource(str(path)))
+
+    def edit(self, month: str, df: pd.DataFrame) -> None:
+        file_path = self.path / f'{month}.csv'
+        df.to_csv(file_path, header=False, index=False)
+        # Distinct modification times, whatever the file system resolution
+        self.edits += 1
+        os.utime(file_path, ns=(self.edits * 10**9, self.edits * 10**9))
+
+
+def make_watcher(sheets, on_change, clock):
+    return ChangeWatcher(
+        sheets.source, on_change, poll_seconds=10, debounce_seconds=30, max_wait_seconds=100,
+        clock=clock, sleep=lambda seconds: None)
+
+
+def test_watcher_debounces_edits(tmp_path):
+    sheets = EditableSheets(tmp_path, {'Januari': JANUARI, 'Februari': FEBRUARI})
+    clock, runs = FakeClock(), []
+    watcher = make_watcher(sheets, lambda raw_dfs: runs.append(list(raw_dfs)), clock)
+
+    # The first poll processes every month, the next ones only poll the version
+    assert watcher.poll() == ['Januari', 'Februari']
+    for _ in range(3):
+        clock.now += 10
+        assert watcher.poll() == []
+    assert sheets.source.read_months.call_count == 1
+
+    # A burst of edits of one month gives a single run once it is quiet
+    for nama in ['Bob', 'Dave', 'Eve']:
+        sheets.edit('Februari', make_raw_sheet([('Sari', 'Gitar', [[nama, 'Rabu', 200, None, 'cuti']])]))
+        clock.now += 10
+        assert watcher.poll() == []
+    clock.now += 20
+    assert watcher.poll() == []
+    clock.now += 10
+    assert watcher.poll() == ['Februari']
+
+    # A new version without any change to the months does not run the ETL
+    sheets.edit('Januari', JANUARI)
+    clock.now += 30
+    watcher.poll()
+    clock.now += 30
+    assert watcher.poll() == []
+    assert runs == [['Januari', 'Februari'], ['Februari']]
+    assert watcher.stats['syncs'] == 3
+
+
+def test_watcher_max_wait(tmp_path):
+    sheets = EditableSheets(tmp_path, {'Januari': JANUARI})
+    clock, runs = FakeClock(), []
+    watcher = make_watcher(sheets, lambda raw_dfs: runs.append(list(raw_dfs)), clock)
+    watcher.poll()
+
+    # Edits every 10 seconds never leave a quiet period: the first one
+    # (at 10 seconds) is processed after max_wait_seconds
+    for i in range(11):
+        sheets.edit('Januari', make_raw_sheet([('Budi', 'Piano', [['Alice', 'Senin', 100 + i, 50, 'baru']])]))
+        clock.now += 10
+        assert watcher.poll() == ([] if clock.now < 110 else ['Januari'])
+    assert runs == [['Januari'], ['Januari']]
+
+
+def test_watcher_retries_after_error(tmp_path):
+    sheets = EditableSheets(tmp_path, {'Januari': JANUARI})
+    clock = FakeClock()
+    on_change = mock.Mock(side_effect=[RuntimeError("quota"), None])
+    watcher = make_watcher(sheets, on_change, clock)
+
+    assert watcher.poll() == []
+    assert watcher.stats['errors'] == 1
+
+    # Retried once the debounce period is over
+    clock.now += 10
+    assert watcher.poll() == []
+    clock.now += 20
+    assert watcher.poll() == ['Januari']
+    assert on_change.call_count == 2
+
+
+def test_watcher_updates_recap(tmp_path):
+    sheets = EditableSheets(tmp_path, {'Januari': JANUARI, 'Februari': FEBRUARI})
+    clock, worksheet = FakeClock(), InMemoryWorksheet()
+    recap = {'tables': None}
+
+    def on_change(raw_dfs):
+        recap['tables'] = run_etl_raw_months(worksheet, raw_dfs, old_dfs=recap['tables'])
+
+    watcher = make_watcher(sheets, on_change, clock)
+    watcher.poll()
+    sheets.edit('Januari', make_raw_sheet([('Budi', 'Piano', [['Alice', 'Senin', 300, 50, 'baru']])]))
+    worksheet.calls.clear()
+    clock.now += 30
+    watcher.poll()
+    clock.now += 30
+    assert watcher.poll() == ['Januari']
+
+    # The Recap tables kept from the last run are not read again
+    assert [call for call, _ in worksheet.calls] == ['batch_update']
+    assert read_recap_tables(worksheet)['fee']['biaya_spp'].tolist() == [300, 200]
+
+
+# `main.watch` logs to the tracked status.log, its logger is patched in the tests
+@mock.patch('main.log_run_metrics')
+@mock.patch('main.logger')
+@mock.patch('utils.daemon.ChangeWatcher')
+@mock.patch('functions.get_sink')
+@mock.patch('functions.get_source')
+@mock.patch('utils.sheets_client.get_sheets_client_config')
+@mock.patch('utils.backends.get_backends_config')
+def test_watch_request_budget_per_run(
+        mock_get_backends_config, mock_get_sheets_client_config, mock_get_source, mock_get_sink,
+        mock_change_watcher, mock_logger, mock_log_run_metrics):
+    mock_get_backends_config.return_value = {'source': 'csv', 'sink': 'memory'}
+    # The first run reads and writes the Recap, the next ones only write it
+    mock_get_sheets_client_config.return_value = {'requests_per_minute': 6000, 'burst': 100, 'request_budget': 2}
+    mock_get_sink.side_effect = lambda *args: args[4].wrap(InMemoryWorksheet())
+    mock_change_watcher.return_value.stats = {}
+
+    main.watch(year=2024)
+    on_change = mock_change_watcher.call_args.args[1]
+
+    # Far more requests than the budget over the lifetime of the daemon
+    for spp in range(100, 600, 100):
+        on_change({'Januari': make_raw_sheet([('Budi', 'Piano', [['Alice', 'Senin', spp, 50, 'baru']])])})
+
+    # Every run is counted against its own budget
+    records = [call.args[1] for call in mock_log_run_metrics.call_args_list]
+    assert [record['status'] for record in records] == ['ok'] * 5
+    assert [record['sheets_api']['requests'] for record in records] == [2, 1, 1, 1, 1]
+
+
+@mock.patch('main.logger')
+@mock.patch('utils.daemon.ChangeWatcher')
+@mock.patch('functions.get_sink')
+@mock.patch('functions.get_source')
+@mock.patch('utils.backends.get_backends_config', return_value={'source': 'csv', 'sink': 'memory'})
+def test_watch_explicit_zero_seconds(
+        mock_get_backends_config, mock_get_source, mock_get_sink, mock_change_watcher, mock_logger):
+    mock_change_watcher.return_value.stats = {}
+
+    main.watch(poll_seconds=0, debounce_seconds=0, year=2024)
+
+    # 0 is not a missing option, the max wait falls back to the config
+    from config.daemon import max_wait_seconds
+    assert mock_change_watcher.call_args.args[2:] == (0, 0, max_wait_seconds)
+
+
+def test_fingerprint_months():
+    assert fingerprint_months({'Januari': JANUARI}) == fingerprint_months({'Januari': JANUARI.copy()})
+    assert fingerprint_months({'Januari': JANUARI}) != fingerprint_months({'Januari': FEBRUARI})
+
+
+def test_google_sheet_source_version():
+    session = mock.Mock()
+    session.get.return_value.json.return_value = {'version': '42', 'modifiedTime': '2024-01-01T00:00:00Z'}
+    sheet_url = 'https://docs.google.com/spreadsheets/d/abc123/edit?usp=sharing'
+
+    assert GoogleSheetSource(sheet_url, session).get_version() == '42'
+    assert session.get.call_args.args[0] == 'https://www.googleapis.com/drive/v3/files/abc123'
@@ -0,0 +1,56 @@
+import time
+import pytest
+
+from utils.dag import run_dag
+from utils.metrics import RunMetrics, stage
+
+
+def test_run_dag_overlaps_independent_tasks():
+    def slow(value):
+        def task(*_):
+            time.sleep(0.2)
+            return value
+        return task
+
+    run = run_dag({
+        'extract': (slow(2), []),
+        'worksheet': (slow('ws'), []),
+        'read_recap': (lambda ws: f'{ws} tables', ['worksheet']),
+        'aggregate': (lambda x: x * 10, ['extract']),
+        'write': (lambda tables, total: (tables, total), ['read_recap', 'aggregate']),
+    })
+
+    assert run.results['write'] == ('ws tables', 20)
+    assert run.seconds < 0.35
+    assert run.timings['write']['start'] >= run.timings['aggregate']['end']
+    assert run.critical_path()[-1] == 'write'
+    assert list(run.report()['tasks'])[-1] == 'write'
+
+
+def test_run_dag_records_stages_in_current_run():
+    def task():
+        with stage('download'):
+            pass
+
+    with RunMetrics('test') as metrics:
+        run_dag({'a': (task, []), 'b': (task, [])})
+
+    assert [record['stage'] for record in metrics.stages] == ['download', 'download']
+
+
+def test_run_dag_failure_cancels_dependents():
+    called = []
+
+    def fail():
+        raise RuntimeError("download failed")
+
+    with pytest.raises(RuntimeError, match="download failed"):
+        run_dag({'extract': (fail, []), 'write': (lambda _: called.append(1), ['extract'])})
+    assert called == []
+
+
+def test_run_dag_checks_dependencies():
+    with pytest.raises(ValueError, match="unknown"):
+        run_dag({'a': (lambda _: None, ['b'])})
+    with pytest.raises(ValueError, match="cycle"):
+        run_dag({'a': (lambda _: None, ['b']), 'b': (lambda _: None, ['a'])})
@@ -1,4 +1,3 @@
-import gspread
 import pandas as pd
 import unittest.mock as mock
 
@@ -9,14 +8,13 @@ from utils.etl.common_utils import (
     add_month_columns,
     join_non_empty_strings,
     update_by_month,
+    diff_table_ranges,
+    get_spreadsheet_table,
+    get_spreadsheet_tables,
+    update_to_spreadsheet_worksheet,
 )
-
-class Cell:
-    def __init__(self, row, col, value):
-        self.row = row
-        self.col = col
-        self.value = value
-
+from utils.backends import InMemoryWorksheet
+from utils.etl.upsert import upsert
 
 def test_split_letters_numbers():
     assert split_letters_numbers("A1") == ("A", 1)
@@ -26,27 +24,35 @@ def test_split_letters_numbers():
     assert split_letters_numbers("ABC") is None
 
 
-@mock.patch('gspread.Worksheet.range')
-def test_detect_end_row(mock_range):
+def test_detect_end_row():
     mock_worksheet = mock.Mock()
-    mock_worksheet.range.return_value = [
-        Cell(1, 'A', 'ETL Biaya'),
-        Cell(2, 'A', 'month_num'),
-        Cell(3, 'A', '2'),
-        Cell(4, 'A', '3'),
-        Cell(5, 'A', '3'),
-        Cell(6, 'A', '4'),
-        Cell(7, 'A', ''),
-        Cell(8, 'A', ''),
-        Cell(9, 'A', ''),
-        Cell(10, 'A', '')
+    mock_worksheet.get.return_value = [
+        ['ETL Biaya'],
+        ['month_num'],
+        ['2'],
+        ['3'],
+        ['3'],
+        ['4'],
+        [],
+        ['not part of the table'],
     ]
 
-    result = detect_end_row(mock_worksheet, 'A1:A10')
+    result = detect_end_row(mock_worksheet, 'A1')
 
+    mock_worksheet.get.assert_called_once_with('A1:A')
     assert result == 6
 
 
+def test_detect_end_row_unbounded():
+    worksheet = InMemoryWorksheet(rows=5000)
+    worksheet.set_values([['month_num']] + [[i % 12 + 1] for i in range(2500)], 'G2')
+
+    assert detect_end_row(worksheet, 'G2') == 2502
+
+    # Empty table
+    assert detect_end_row(InMemoryWorksheet(), 'A2') == 1
+
+
 def test_fix_int_columns_dtype():
     df = pd.DataFrame({"col1": ["1", "2", "3"], "col2": ["4", "5", "6"]})
     int_cols = ["col1", "col2"]
@@ -78,4 +84,56 @@ def test_update_by_month():
     result_df = update_by_month(old_df, updated_df, 2)
 
     expected_df = pd.DataFrame({"month_num": [1, 2, 3], "value": ["old1", "new2", "old3"]})
-    pd.testing.assert_frame_equal(result_df, expected_df)
\ No newline at end of file
+    pd.testing.assert_frame_equal(result_df, expected_df)
+
+def test_update_several_months():
+    old_df = pd.DataFrame({"month_num": [1, 2, 3], "value": ["old1", "old2", "old3"]})
+    updated_df = pd.DataFrame({"month_num": [1, 3], "value": ["new1", "new3"]})
+    result_df, _ = upsert(old_df, updated_df, [1, 3])
+
+    expected_df = pd.DataFrame({"month_num": [1, 2, 3], "value": ["new1", "old2", "new3"]})
+    pd.testing.assert_frame_equal(result_df, expected_df)
+
+
+def test_diff_table_ranges():
+    old_df = pd.DataFrame({"month_num": [1, 1, 2, 2], "instrument": ["a", "b", "a", "b"], "total": [1, 2, 3, 4]})
+    new_df = pd.DataFrame({"month_num": [1, 1, 2], "instrument": ["a", "b", "a"], "total": [1, 5, 6]})
+
+    result = diff_table_ranges(old_df, new_df, "G2")
+
+    assert result == [
+        {"range": "I4:I5", "values": [[5], [6]]},
+        {"range": "G6:I6", "values": [["", "", ""]]},
+    ]
+    assert diff_table_ranges(old_df, old_df, "G2") == []
+
+
+def test_update_to_spreadsheet_worksheet_diff():
+    worksheet = InMemoryWorksheet()
+    worksheet.set_values([["month_num", "month", "value"], [1, "Januari", 10], [2, "Februari", 20], [2, "Februari", 30]], "A2")
+    old_df = get_spreadsheet_table(worksheet, start_cell="A2", end_col="C")
+    old_df = fix_int_columns_dtype(old_df, int_cols=["month_num", "value"])
+    updated_df = update_by_month(old_df, pd.DataFrame({"month_num": [2], "month": ["Februari"], "value": [25]}), 2)
+    worksheet.calls.clear()
+
+    update_to_spreadsheet_worksheet(worksheet, updated_df, old_df=old_df, start_cell="A2")
+
+    # One request, only the changed cell and the cleared trailing row
+    assert worksheet.calls == [("batch_update", ["C4:C4", "A5:C5"])]
+    assert worksheet.get("A2:C10") == [["month_num", "month", "value"], ["1", "Januari", "10"], ["2", "Februari", "25"]]
+
+
+def test_get_spreadsheet_tables():
+    worksheet = InMemoryWorksheet()
+    worksheet.set_values([["month_num", "instrument", "biaya_spp"], [1, "piano", 100], [2, "piano", 200]], "A2")
+    worksheet.set_values([["month_num", "instrument", "total", "nama"], [1, "piano", 2, "Alice"], [1, "gitar", 1]], "G2")
+    worksheet.set_values([["not part of the table"]], "G7")
+
+    fee_df, student_df = get_spreadsheet_tables(
+        worksheet, [{"start_cell": "A2", "end_col": "E"}, {"start_cell": "G2", "end_col": "S"}])
+
+    assert worksheet.calls == [("batch_get", ["A2:E", "G2:S"])]
+    pd.testing.assert_frame_equal(fee_df, pd.DataFrame(
+        {"month_num": ["1", "2"], "instrument": ["piano", "piano"], "biaya_spp": ["100", "200"]}))
+    pd.testing.assert_frame_equal(student_df, pd.DataFrame(
+        {"month_num": ["1", "1"], "instrument": ["piano", "gitar"], "total": ["2", "1"], "nama": ["Alice", ""]}))
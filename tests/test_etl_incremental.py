@@ -0,0 +1,62 @@
+import pandas as pd
+import unittest.mock as mock
+
+from utils.etl.student import calculate_student_aggregate
+from utils.etl.fee import calculate_fee_aggregate
+from utils.etl.incremental import (
+    hash_teacher_blocks,
+    get_changed_instruments,
+    update_partial_aggregate,
+    load_incremental_state,
+    save_incremental_state,
+)
+from tests.raw_sheet import make_cleaned_df
+
+BLOCKS = [
+    ('Budi', 'Piano', [['Alice', 'Senin', 100, 50, 'baru'], ['Bob', 'Selasa', 150, None, 'Lunas']]),
+    ('Sari', 'Gitar', [['Charlie', 'Rabu', 200, None, 'cuti']]),
+    ('Tono', 'Drum', [['Dave', 'Kamis', 250, None, 'keluar']]),
+    ('Ani', 'Piano', [['Eve', 'Jumat', 100, None, '']]),
+]
+
+
+def test_get_changed_instruments():
+    old_hashes = hash_teacher_blocks(make_cleaned_df(BLOCKS))
+
+    # Edit a Gitar student, remove the Drum block, add a Biola block
+    blocks = [b for b in BLOCKS if b[1] != 'Drum']
+    blocks[1] = ('Sari', 'Gitar', [['Charlie', 'Rabu', 200, None, 'lunas']])
+    blocks.append(('Rina', 'Biola', [['Frank', 'Sabtu', 300, 50, 'baru']]))
+    new_hashes = hash_teacher_blocks(make_cleaned_df(blocks))
+
+    assert get_changed_instruments(old_hashes, old_hashes) == set()
+    assert get_changed_instruments(old_hashes, new_hashes) == {'Gitar', 'Drum', 'Biola'}
+
+
+def test_update_partial_aggregate():
+    old_df = make_cleaned_df(BLOCKS)
+    blocks = [b for b in BLOCKS if b[1] != 'Drum']
+    blocks[1] = ('Sari', 'Gitar', [['Charlie', 'Rabu', 200, None, 'lunas'], ['Frank', 'Rabu', 200, 50, 'baru']])
+    new_df = make_cleaned_df(blocks)
+    changed = get_changed_instruments(hash_teacher_blocks(old_df), hash_teacher_blocks(new_df))
+
+    for calculate_aggregate in [calculate_student_aggregate, calculate_fee_aggregate]:
+        old_partial = calculate_aggregate(old_df, 'Januari', 1)
+        spy = mock.Mock(wraps=calculate_aggregate)
+
+        result = update_partial_aggregate(new_df, 'Januari', 1, spy, old_partial, changed)
+
+        # Only the changed instrument is recomputed
+        assert spy.call_args.args[0]['instrument'].unique().tolist() == ['Gitar']
+        pd.testing.assert_frame_equal(result, calculate_aggregate(new_df, 'Januari', 1), check_dtype=False)
+
+
+def test_incremental_state(tmp_path):
+    assert load_incremental_state(str(tmp_path), 'sheet_id', 'Januari') == {'block_hashes': {}, 'partials': {}}
+
+    state = {'block_hashes': {('Piano', 'Budi'): 'abc'}, 'partials': {'fee': pd.DataFrame({'instrument': ['Piano']})}}
+    save_incremental_state(str(tmp_path), 'sheet_id', 'Januari', state)
+
+    loaded = load_incremental_state(str(tmp_path), 'sheet_id', 'Januari')
+    assert loaded['block_hashes'] == state['block_hashes']
+    pd.testing.assert_frame_equal(loaded['partials']['fee'], state['partials']['fee'])
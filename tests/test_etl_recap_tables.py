@@ -0,0 +1,58 @@
+import pandas as pd
+import pytest
+
+from utils.etl.recap_tables import get_recap_table_configs, get_source_cols, calculate_recap_aggregates
+from utils.etl.student import calculate_student_aggregate
+from utils.etl.fee import calculate_fee_aggregate
+
+CLEANED_DF = pd.DataFrame({
+    'nama': ['Alice', 'Bob', 'Charlie'],
+    'instrument': ['Piano', 'Piano', 'Gitar'],
+    'biaya_spp': [100, 150, 200],
+    'biaya_regis': [50, 0, 0],
+    'is_baru': [1, 0, 1],
+    'is_keluar': [0, 0, 0],
+    'is_cuti': [0, 1, 0],
+    'not_lunas': [1, 1, 0],
+})
+
+
+def test_calculate_recap_aggregates():
+    result = calculate_recap_aggregates(CLEANED_DF, 'Januari', 1)
+
+    assert list(result) == list(get_recap_table_configs())
+    pd.testing.assert_frame_equal(result['student'], calculate_student_aggregate(CLEANED_DF, 'Januari', 1))
+    pd.testing.assert_frame_equal(result['fee'], calculate_fee_aggregate(CLEANED_DF, 'Januari', 1))
+
+
+def test_calculate_recap_aggregates_new_table():
+    tables = {
+        'fee': get_recap_table_configs(['fee'])['fee'],
+        'new_students': {
+            'start_cell': 'U2', 'end_col': 'Y', 'int_cols': ['month_num', 'total', 'is_baru'],
+            'aggregations': {
+                'total': ('instrument', 'size'),
+                'is_baru': ('is_baru', 'sum'),
+                'nama_is_baru': ('is_baru', 'names'),
+                'spp': ('biaya_spp', 'sum'),
+            },
+        },
+    }
+
+    result = calculate_recap_aggregates(CLEANED_DF, 'Januari', 1, tables)
+
+    assert result['new_students'].values.tolist() == [
+        [1, 'Januari', 'Gitar', 1, 1, 'Charlie', 200],
+        [1, 'Januari', 'Piano', 2, 1, 'Alice', 250],
+    ]
+    assert result['fee']['biaya_spp'].tolist() == [200, 250]
+    assert get_source_cols(tables) == ['instrument', 'biaya_spp', 'biaya_regis', 'is_baru', 'nama']
+
+
+def test_recap_tables_errors():
+    with pytest.raises(ValueError, match="Unknown Recap tables: other"):
+        get_recap_table_configs(['fee', 'other'])
+
+    table = {'aggregations': {'median_spp': ('biaya_spp', 'median')}}
+    with pytest.raises(ValueError, match="Unknown aggregation functions: median"):
+        calculate_recap_aggregates(CLEANED_DF, 'Januari', 1, {'other': table})
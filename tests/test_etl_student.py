@@ -23,16 +23,34 @@ def test_calculate_student_aggregate():
         'month': ['January', 'January'],
         'instrument': ['guitar', 'piano'],
         'total': [2, 2],
-        'is_trial': [1, 1],
         'is_baru': [1, 2],
         'is_keluar': [0, 1],
         'is_cuti': [1, 0],
         'not_lunas': [2, 0],
-        'nama_is_trial': ['Dave', 'Alice'],
-        'nama_is_keluar': ['', 'Bob'],
-        'nama_is_cuti': ['Charlie', ''],
-        'nama_not_lunas': ['Charlie, Dave', '']
+        'nama_is_baru': ['Dave', 'Alice, Bob'],
+        'nama_is_keluar': [' ', 'Bob'],
+        'nama_is_cuti': ['Charlie', ' '],
+        'nama_not_lunas': ['Charlie, Dave', ' ']
     }
-    expected_df = pd.DataFrame(expected_data).fillna('')
+    expected_df = pd.DataFrame(expected_data)
 
     pd.testing.assert_frame_equal(result, expected_df)
+
+
+def test_calculate_student_aggregate_empty_names():
+    data = {
+        'instrument': ['piano', 'piano'],
+        'is_baru': [1, 0],
+        'is_keluar': [0, 0],
+        'is_cuti': [0, 0],
+        'not_lunas': [1, 1],
+        'nama': ['', 'Bob']
+    }
+
+    result = calculate_student_aggregate(pd.DataFrame(data), 'January', 1)
+
+    # Students without a name are counted but not listed
+    assert result['is_baru'].tolist() == [1]
+    assert result['nama_is_baru'].tolist() == ['']
+    assert result['nama_not_lunas'].tolist() == ['Bob']
+    assert result['nama_is_keluar'].tolist() == [' ']
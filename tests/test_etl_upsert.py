@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+
+from utils.etl.upsert import upsert, count_changes, has_changes
+
+
+def _recap(rows):
+    return pd.DataFrame(rows, columns=["month_num", "instrument", "total"])
+
+
+def test_upsert_month():
+    old_df = _recap([[1, "Gitar", 1], [1, "Piano", 2], [2, "Gitar", 3], [2, "Piano", 4], [3, "Piano", 5]])
+    updated_df = _recap([[2, "Piano", 4], [2, "Drum", 6]])
+
+    result_df, changes = upsert(old_df, updated_df)
+
+    # Gitar disappeared from month 2, Drum is merged at its sorted position
+    expected_df = _recap([[1, "Gitar", 1], [1, "Piano", 2], [2, "Drum", 6], [2, "Piano", 4], [3, "Piano", 5]])
+    pd.testing.assert_frame_equal(result_df, expected_df)
+    assert changes == {"inserted": [(2, "Drum")], "updated": [], "deleted": [(2, "Gitar")]}
+    assert count_changes(changes) == {"inserted": 1, "updated": 0, "deleted": 1}
+
+
+def test_upsert_single_instrument():
+    old_df = _recap([[1, "Gitar", 1], [1, "Piano", 2], [2, "Piano", 4]])
+
+    result_df, changes = upsert(old_df, _recap([[1, "Piano", 7]]), month_nums=[])
+
+    pd.testing.assert_frame_equal(result_df, _recap([[1, "Gitar", 1], [1, "Piano", 7], [2, "Piano", 4]]))
+    assert changes == {"inserted": [], "updated": [(1, "Piano")], "deleted": []}
+
+
+def test_upsert_several_months():
+    old_df = _recap([[1, "Piano", 1], [2, "Piano", 2], [3, "Piano", 3]])
+    updated_df = _recap([[4, "Piano", 4], [1, "Piano", 1], [3, "Biola", 5]])
+
+    result_df, changes = upsert(old_df, updated_df, month_nums=[1, 3, 4])
+
+    expected_df = _recap([[1, "Piano", 1], [2, "Piano", 2], [3, "Biola", 5], [4, "Piano", 4]])
+    pd.testing.assert_frame_equal(result_df, expected_df)
+    assert changes == {"inserted": [(3, "Biola"), (4, "Piano")], "updated": [], "deleted": [(3, "Piano")]}
+
+
+def test_upsert_unchanged_and_new_table():
+    old_df = _recap([[1, "Gitar", 1], [1, "Piano", 2]])
+    _, changes = upsert(old_df, old_df.iloc[::-1])
+    assert not has_changes(changes)
+
+    # Table not created yet, unsorted history
+    result_df, changes = upsert(pd.DataFrame(), _recap([[2, "Piano", 2], [1, "Piano", 1]]))
+    pd.testing.assert_frame_equal(result_df, _recap([[1, "Piano", 1], [2, "Piano", 2]]), check_dtype=False)
+    assert changes["inserted"] == [(1, "Piano"), (2, "Piano")]
+
+    result_df, _ = upsert(_recap([[3, "Piano", 3], [1, "Piano", 1]]), _recap([[2, "Piano", 2]]))
+    assert result_df["month_num"].tolist() == [1, 2, 3]
+
+
+def test_upsert_duplicate_keys():
+    with pytest.raises(ValueError, match="Duplicate keys"):
+        upsert(_recap([]), _recap([[1, "Piano", 1], [1, "Piano", 2]]))
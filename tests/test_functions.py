@@ -0,0 +1,168 @@
+import json
+import time
+import pytest
+import pandas as pd
+import unittest.mock as mock
+
+from functions import (
+    parse_months, fetch_and_prepare_months, read_recap_tables, write_recap_tables,
+    update_recap, load_branch_configs, run_etl_branches, run_etl)
+from utils.backends import InMemoryWorksheet
+from utils.metrics import RunMetrics
+from utils.warehouse import read_warehouse_months
+from utils.etl.common_utils import update_by_month
+from utils.etl.student import calculate_student_aggregate
+from utils.etl.fee import calculate_fee_aggregate
+from tests.raw_sheet import make_raw_sheet, make_cleaned_df, make_workbook_bytes
+
+SHEET_URL = "https://docs.google.com/spreadsheets/d/sheet_id/edit?usp=sharing"
+
+
+def test_parse_months():
+    assert parse_months('Januari..Maret') == ['Januari', 'Februari', 'Maret']
+    assert parse_months('Maret, Januari') == ['Januari', 'Maret']
+    assert parse_months('Januari..Februari,Mei') == ['Januari', 'Februari', 'Mei']
+    assert parse_months('all') is None
+
+    with pytest.raises(ValueError):
+        parse_months('Jan..Maret')
+    with pytest.raises(ValueError, match="starts after it ends"):
+        parse_months('Mei..Januari')
+
+
+@mock.patch('functions.download_workbook')
+def test_fetch_and_prepare_months(mock_download_workbook):
+    mock_download_workbook.return_value = make_workbook_bytes({
+        'Februari': make_raw_sheet([('Budi', 'Piano', [['Alice', 'Senin', 100, 50, 'baru']])]),
+        'Januari': make_raw_sheet([('Budi', 'Piano', [['Bob', 'Selasa', 200, None, 'lunas']])]),
+        'Recap': pd.DataFrame([['month_num', 'month']]),
+    })
+
+    result = fetch_and_prepare_months(SHEET_URL)
+
+    # Downloaded once, every month tab kept in calendar order
+    mock_download_workbook.assert_called_once()
+    assert list(result) == ['Januari', 'Februari']
+    assert result['Januari']['nama'].tolist() == ['Bob']
+    assert result['Februari']['is_baru'].tolist() == [1]
+
+
+def test_read_recap_tables():
+    worksheet = InMemoryWorksheet()
+    worksheet.set_values([["month_num", "month", "instrument", "biaya_spp", "biaya_regis"], [1, "Januari", "Piano", 100, 0]], "A2")
+    worksheet.set_values([
+        ["month_num", "month", "instrument", "total", "is_baru", "is_keluar", "is_cuti", "not_lunas",
+         "nama_is_baru", "nama_is_keluar", "nama_is_cuti", "nama_not_lunas"],
+        [1, "Januari", "Piano", 2, 1, 0, 0, 1, "Alice", " ", " ", "Bob"]], "G2")
+
+    old_dfs = read_recap_tables(worksheet)
+
+    assert len(worksheet.calls) == 1
+    assert old_dfs['fee']['biaya_spp'].tolist() == [100]
+    assert old_dfs['student']['not_lunas'].tolist() == [1]
+
+
+def test_write_recap_tables():
+    worksheet = InMemoryWorksheet()
+    worksheet.set_values([["month_num", "month", "instrument", "biaya_spp", "biaya_regis"], [1, "Januari", "Piano", 100, 0]], "A2")
+    worksheet.set_values([
+        ["month_num", "month", "instrument", "total", "is_baru", "is_keluar", "is_cuti", "not_lunas",
+         "nama_is_baru", "nama_is_keluar", "nama_is_cuti", "nama_not_lunas"],
+        [1, "Januari", "Piano", 1, 1, 0, 0, 1, "Alice", " ", " ", "Alice"]], "G2")
+    cleaned_df = make_cleaned_df([('Budi', 'Piano', [['Bob', 'Senin', 150, 50, 'baru, lunas']])])
+
+    old_dfs = read_recap_tables(worksheet)
+    updated_dfs = {
+        'student': update_by_month(old_dfs['student'], calculate_student_aggregate(cleaned_df, 'Februari', 2), 2),
+        'fee': update_by_month(old_dfs['fee'], calculate_fee_aggregate(cleaned_df, 'Februari', 2), 2),
+    }
+    write_recap_tables(worksheet, updated_dfs, old_dfs)
+
+    # One read and one write for every table
+    assert [call for call, _ in worksheet.calls] == ['batch_get', 'batch_update']
+    assert worksheet.get("A4:E4") == [["2", "Februari", "Piano", "150", "50"]]
+    assert worksheet.get("G4:S4") == [["2", "Februari", "Piano", "1", "1", "0", "0", "0", "Bob", " ", " ", " "]]
+
+
+def test_update_recap_skips_unchanged_tables():
+    worksheet = InMemoryWorksheet()
+    cleaned_df = make_cleaned_df([('Budi', 'Piano', [['Bob', 'Senin', 150, 50, 'baru, lunas']])])
+    update_recap(worksheet, cleaned_df, 'Februari', 2)
+    worksheet.calls.clear()
+
+    # Same month again: nothing changed, nothing written
+    update_recap(worksheet, cleaned_df, 'Februari', 2)
+    assert [call for call, _ in worksheet.calls] == ['batch_get']
+
+
+def test_load_branch_configs(tmp_path):
+    path = tmp_path / 'branches.json'
+    path.write_text(json.dumps([
+        {"name": "A", "sheet_url": SHEET_URL, "recap_sheet_title": "Recap"},
+        {"sheet_url": SHEET_URL, "recap_sheet_title": "Recap", "service_account_path": "b.json"},
+    ]))
+
+    branches = load_branch_configs(str(path), 'default.json')
+
+    assert branches[0]['service_account_path'] == 'default.json'
+    assert branches[1]['name'] == SHEET_URL
+
+    with pytest.raises(ValueError):
+        load_branch_configs(str(path))
+
+
+def test_run_etl_branches():
+    def fake_run_etl(sheet_url, *args, evict=True):
+        # The shared cache is only evicted once every branch is done
+        assert not evict
+        time.sleep(0.2)
+        if sheet_url == 'broken':
+            raise RuntimeError("Failed to read the Google Sheets document")
+        return sheet_url != 'unchanged'
+
+    branches = [
+        {"name": f"branch {i}", "sheet_url": url, "recap_sheet_title": "Recap", "service_account_path": "sa.json"}
+        for i, url in enumerate(['ok'] * 8 + ['broken', 'unchanged'])
+    ]
+
+    with mock.patch('functions.run_etl', side_effect=fake_run_etl), \
+            mock.patch('functions.evict_cache') as mock_evict_cache:
+        start = time.perf_counter()
+        results = run_etl_branches(branches, 'Januari', 1, max_workers=10)
+        elapsed = time.perf_counter() - start
+    mock_evict_cache.assert_called_once()
+
+    # Branches run concurrently and failures stay isolated
+    assert elapsed < 1
+    assert isinstance(results['branch 8'], RuntimeError)
+    assert results['branch 9'] is False
+    assert all(results[f'branch {i}'] is True for i in range(8))
+
+
+def test_run_etl_dag(tmp_path):
+    workbook_path = tmp_path / 'export.xlsx'
+    workbook_path.write_bytes(make_workbook_bytes({'Januari': make_raw_sheet([
+        ('Budi', 'Piano', [['Alice', 'Senin', 100, 50, 'baru'], ['Bob', 'Selasa', 150, None, 'lunas']]),
+    ])}))
+    cache_config = {
+        'cache_dir': str(tmp_path / 'cache'), 'max_size_bytes': 10**9, 'max_age_seconds': 3600,
+        'incremental_dir': str(tmp_path / 'incremental')}
+    warehouse_config = {'enabled': True, 'warehouse_dir': str(tmp_path / 'warehouse')}
+    worksheet = InMemoryWorksheet()
+
+    with mock.patch('functions.get_session'), \
+            mock.patch('functions.get_recap_worksheet', return_value=worksheet), \
+            mock.patch('functions.get_cache_config', return_value=cache_config), \
+            mock.patch('functions.get_warehouse_config', return_value=warehouse_config), \
+            mock.patch.dict('os.environ', {'year': '2024'}), \
+            RunMetrics('test') as metrics:
+        assert run_etl(SHEET_URL, 'Recap', 'sa.json', 'Januari', 1, export_url=workbook_path.as_uri())
+        # Unchanged workbook
+        assert not run_etl(SHEET_URL, 'Recap', 'sa.json', 'Januari', 1, export_url=workbook_path.as_uri())
+
+    assert read_recap_tables(worksheet)['fee']['biaya_spp'].tolist() == [250]
+    assert list(read_warehouse_months(str(tmp_path / 'warehouse'), 'sheet_id', 2024)) == ['Januari']
+    dag = metrics.fields['dag']
+    assert dag['critical_path'][-1] == 'write'
+    assert set(dag['tasks']) == {
+        'auth', 'extract', 'warehouse', 'worksheet', 'read_recap', 'aggregate', 'write'}
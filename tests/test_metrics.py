@@ -0,0 +1,65 @@
+import json
+import logging
+
+from functions import run_etl_backends
+from logger_config import log_run_metrics
+from utils.backends import XlsxFileSource, InMemoryWorksheet
+from utils.sheets_client import SheetsClient
+from utils.metrics import RunMetrics, stage, set_run_field, profiled
+from tests.raw_sheet import make_raw_sheet, make_workbook_bytes
+
+
+def test_stage_outside_run_is_noop():
+    with stage('download') as record:
+        record['bytes'] = 10
+    set_run_field('months', ['Januari'])
+
+
+def test_run_metrics_records_stages():
+    sheets_client = SheetsClient(requests_per_minute=6000, burst=100)
+    worksheet = sheets_client.wrap(InMemoryWorksheet())
+
+    with RunMetrics('test', sheets_client, trace_memory=True) as metrics:
+        with stage('read', rows_in=3) as record:
+            worksheet.get('A1:B2')
+            worksheet.get('C1:D2')
+            record['rows_out'] = 2
+        set_run_field('months', ['Januari'])
+
+    record = metrics.record()
+    assert record['run'] == 'test'
+    assert record['status'] == 'ok'
+    assert record['months'] == ['Januari']
+    assert record['sheets_api']['requests'] == 2
+    stage_record = record['stages'][0]
+    assert stage_record['stage'] == 'read'
+    assert (stage_record['rows_in'], stage_record['rows_out'], stage_record['api_requests']) == (3, 2, 2)
+    assert 'peak_traced_mib' in stage_record
+
+
+def test_run_etl_backends_metrics(tmp_path, caplog):
+    workbook_path = tmp_path / 'export.xlsx'
+    workbook_path.write_bytes(make_workbook_bytes({'Januari': make_raw_sheet([
+        ('Budi', 'Piano', [['Alice', 'Senin', 100, 50, 'baru'], ['Bob', 'Selasa', 150, None, 'lunas']]),
+    ])}))
+
+    with RunMetrics('backfill') as metrics:
+        run_etl_backends(XlsxFileSource(str(workbook_path)), InMemoryWorksheet(), None)
+
+    stages = [record['stage'] for record in metrics.record()['stages']]
+    assert stages == ['extract', 'transform', 'read_recap', 'aggregate', 'write_recap']
+    assert metrics.record()['stages'][1]['rows_out'] == 2
+
+    # One JSON record per run in the log
+    logger = logging.getLogger('test_metrics')
+    with caplog.at_level(logging.INFO, logger='test_metrics'):
+        log_run_metrics(logger, metrics.record())
+    message = caplog.records[-1].getMessage()
+    assert json.loads(message.removeprefix('Metrics: '))['run'] == 'backfill'
+
+
+def test_profiled_dumps_stats(tmp_path):
+    path = tmp_path / 'run.prof'
+    with profiled(str(path)):
+        sum(range(1000))
+    assert path.exists()
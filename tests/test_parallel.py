@@ -0,0 +1,45 @@
+import pytest
+import pandas as pd
+import unittest.mock as mock
+
+from functions import fetch_and_prepare_months, prepare_filtered_data
+from utils.create_clean_data import read_sheets_streaming
+from utils.parallel import prepare_sheets_parallel
+from tests.raw_sheet import make_raw_sheet, make_workbook_bytes
+
+SHEETS = {
+    'Januari': make_raw_sheet([('Budi', 'Piano', [['Bob', 'Selasa', 200, None, 'lunas']])]),
+    'Februari': make_raw_sheet([
+        ('Budi', 'Piano', [['Alice', 'Senin', 100, 50, 'baru'], ['Eve', 'Senin', 100, 'gratis', 'trial']]),
+        ('Sari', 'Gitar', [['Charlie', 'Rabu', 200, None, 'cuti']]),
+    ]),
+    'Maret': make_raw_sheet([('Tono', 'Drum', [['Dave', 'Kamis', 250, None, 'keluar']])]),
+}
+CONTENT = make_workbook_bytes(SHEETS)
+
+
+def test_prepare_sheets_parallel(caplog):
+    result, invalid_cells = prepare_sheets_parallel(CONTENT, ['Maret', 'April', 'Januari', 'Februari'], 2, missing_ok=True)
+
+    # Same frames (and compact dtypes) as the serial path, in the requested order
+    expected = {month: prepare_filtered_data(df) for month, df in read_sheets_streaming(CONTENT, list(SHEETS)).items()}
+    assert list(result) == ['Maret', 'Januari', 'Februari']
+    for month, cleaned_df in result.items():
+        pd.testing.assert_frame_equal(cleaned_df, expected[month])
+    assert invalid_cells == 1
+    # Logged by this process, the workers have no log handler
+    assert "1 invalid biaya_regis cells in Februari (data rows 2), counted as 0" in caplog.text
+
+    with pytest.raises(RuntimeError, match="Worksheet named 'April' not found"):
+        prepare_sheets_parallel(CONTENT, ['Januari', 'April'], 2, start_method='fork')
+
+
+@mock.patch('functions.download_workbook', return_value=CONTENT)
+def test_fetch_and_prepare_months_parallel(mock_download_workbook):
+    with mock.patch('functions.prepare_sheets_parallel', wraps=prepare_sheets_parallel) as spy:
+        result = fetch_and_prepare_months('https://docs.google.com/spreadsheets/d/abc/edit?usp=sharing', prepare_workers=4)
+
+    # Every month tab in calendar order
+    assert spy.call_args.args[2] == 4
+    assert list(result) == ['Januari', 'Februari', 'Maret']
+    assert result['Februari']['nama'].tolist() == ['Alice', 'Eve', 'Charlie']
@@ -0,0 +1,68 @@
+import unittest.mock as mock
+from datetime import datetime, timedelta, timezone
+
+from google.auth.transport.requests import AuthorizedSession
+
+from utils import sessions
+from utils.sessions import SheetsSession, get_session, clear_sessions
+
+
+class FakeCredentials:
+    def __init__(self, expires_in):
+        self.token = 'token'
+        self.expiry = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(seconds=expires_in)
+        self.refreshes = 0
+        self.requests = []
+
+    def refresh(self, request):
+        self.refreshes += 1
+        self.requests.append(request)
+        self.expiry = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(hours=1)
+
+    def before_request(self, *args):
+        pass
+
+
+def test_ensure_fresh_token():
+    credentials = FakeCredentials(expires_in=3600)
+    session = SheetsSession(credentials, refresh_margin_seconds=300)
+
+    session.ensure_fresh_token()
+    assert credentials.refreshes == 0
+
+    # Refreshed ahead of expiry
+    credentials.expiry = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(seconds=60)
+    session.ensure_fresh_token()
+    assert credentials.refreshes == 1
+
+    # Not through the authorized session
+    assert credentials.requests[0].session is not session.session
+    assert not isinstance(credentials.requests[0].session, AuthorizedSession)
+
+
+def test_worksheet_memoized():
+    session = SheetsSession(FakeCredentials(expires_in=3600))
+    session.client = mock.Mock()
+
+    first = session.worksheet('sheet_id', 'Recap')
+    second = session.worksheet('sheet_id', 'Recap')
+
+    assert first is second
+    session.client.open_by_key.assert_called_once_with('sheet_id')
+    session.client.open_by_key.return_value.worksheet.assert_called_once_with('Recap')
+
+
+def test_get_session_cached():
+    clear_sessions()
+    with mock.patch.object(sessions.Credentials, 'from_service_account_file', return_value=FakeCredentials(3600)) as from_file:
+        first = get_session('sa.json')
+        second = get_session('sa.json')
+        other = get_session('other.json')
+
+    assert first is second
+    assert first is not other
+    assert from_file.call_count == 2
+
+    # The export download and the API client share the same connection pool
+    assert first.client.http_client.session is first.session
+    clear_sessions()
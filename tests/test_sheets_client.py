@@ -0,0 +1,130 @@
+import pytest
+import random
+from gspread.exceptions import APIError
+
+from utils.sheets_client import SheetsClient, RequestBudgetExceeded, is_retryable
+from utils.backends import InMemoryWorksheet
+
+
+class FakeResponse:
+    def __init__(self, code, headers=None):
+        self.status_code = code
+        self.headers = headers or {}
+
+    def json(self):
+        return {'error': {'code': self.status_code, 'message': 'error', 'status': 'ERROR'}}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FlakyWorksheet(InMemoryWorksheet):
+    '''
+    Fails the first `failures` API calls with the given status code,
+    and takes `latency` seconds (on the fake clock) per call.
+    '''
+    def __init__(self, clock, failures, code=429, latency=0.2, headers=None):
+        super().__init__()
+        self.clock = clock
+        self.failures = failures
+        self.code = code
+        self.latency = latency
+        self.headers = headers
+
+    def get(self, range_name, **kwargs):
+        self.clock.now += self.latency
+        if self.failures:
+            self.failures -= 1
+            raise APIError(FakeResponse(self.code, self.headers))
+        return super().get(range_name)
+
+
+def make_client(clock, **kwargs):
+    return SheetsClient(clock=clock, sleep=clock.sleep, rng=random.Random(0), **kwargs)
+
+
+def test_retry_with_backoff():
+    clock = FakeClock()
+    client = make_client(clock, backoff_base_seconds=1.0)
+    worksheet = client.wrap(FlakyWorksheet(clock, failures=3))
+    worksheet.set_values([['a']], 'A1')
+
+    assert worksheet.get('A1:A') == [['a']]
+    assert client.stats['requests'] == 4
+    assert client.stats['retries'] == 3
+    # Jittered backoff stays under the exponential cap
+    assert all(0 <= wait <= 2 ** i for i, wait in enumerate(clock.sleeps))
+
+
+def test_retry_after_header():
+    clock = FakeClock()
+    client = make_client(clock)
+    worksheet = client.wrap(FlakyWorksheet(clock, failures=1, headers={'Retry-After': '7'}))
+
+    worksheet.get('A1:A')
+
+    assert clock.sleeps == [7.0]
+
+
+def test_non_retryable_and_exhausted_retries():
+    clock = FakeClock()
+    client = make_client(clock, max_retries=2)
+
+    with pytest.raises(APIError):
+        client.wrap(FlakyWorksheet(clock, failures=1, code=400)).get('A1:A')
+    assert client.stats['retries'] == 0
+
+    with pytest.raises(APIError):
+        client.wrap(FlakyWorksheet(clock, failures=5, code=503)).get('A1:A')
+    assert client.stats['retries'] == 2
+    assert client.stats['errors'] == 2
+
+
+def test_rate_limit():
+    clock = FakeClock()
+    client = make_client(clock, requests_per_minute=60, burst=10)
+    worksheet = client.wrap(FlakyWorksheet(clock, failures=0, latency=0.0))
+
+    for _ in range(70):
+        worksheet.get('A1:A')
+
+    # The burst goes through, the rest is paced at one request per second
+    assert clock.now == pytest.approx(60)
+    assert client.stats['throttled_seconds'] == pytest.approx(60)
+
+
+def test_request_budget():
+    clock = FakeClock()
+    client = make_client(clock, request_budget=3)
+    worksheet = client.wrap(InMemoryWorksheet())
+
+    for _ in range(3):
+        worksheet.get('A1:A')
+    with pytest.raises(RequestBudgetExceeded):
+        worksheet.get('A1:A')
+
+    # Non API attributes are not counted
+    assert worksheet.row_count == 1000
+    assert client.stats['requests'] == 3
+
+    # A new run gets the whole budget again
+    client.begin_run()
+    worksheet.get('A1:A')
+    assert client.stats['requests'] == 1
+
+
+def test_is_retryable():
+    assert is_retryable(APIError(FakeResponse(429)))
+    assert is_retryable(APIError(FakeResponse(500)))
+    assert not is_retryable(APIError(FakeResponse(404)))
+    assert not is_retryable(ValueError())
@@ -0,0 +1,89 @@
+import os
+import pytest
+import unittest.mock as mock
+
+from functions import require_year, run_etl_months, persist_to_warehouse, rebuild_recap, update_recap_months, read_recap_tables
+from utils.backends import InMemoryWorksheet
+from utils.warehouse import write_partition, read_warehouse, read_warehouse_months
+from tests.raw_sheet import make_cleaned_df
+
+SHEET_URL = "https://docs.google.com/spreadsheets/d/sheet_id/edit?usp=sharing"
+JANUARI = make_cleaned_df([
+    ('Budi', 'Piano', [['Alice', 'Senin', 100, 50, 'baru'], ['Bob', 'Selasa', 150, None, 'lunas']]),
+    ('Sari', 'Gitar', [['Charlie', 'Rabu', 200, None, 'cuti']]),
+])
+FEBRUARI = make_cleaned_df([('Budi', 'Piano', [['Alice', 'Senin', 100, None, 'lunas']])])
+
+
+def test_write_partition_replaces_partition(tmp_path):
+    warehouse_dir = str(tmp_path)
+    write_partition(warehouse_dir, 'sheet_id', 2024, 1, JANUARI)
+    file_path = write_partition(warehouse_dir, 'sheet_id', 2024, 1, FEBRUARI)
+
+    assert file_path == os.path.join(warehouse_dir, 'sheet_id', 'year=2024', 'month_num=1', 'part-0.parquet')
+    assert os.listdir(os.path.dirname(file_path)) == ['part-0.parquet']
+    assert read_warehouse(warehouse_dir, 'sheet_id')['nama'].tolist() == ['Alice']
+
+
+def test_read_warehouse_projection_and_pushdown(tmp_path):
+    warehouse_dir = str(tmp_path)
+    write_partition(warehouse_dir, 'sheet_id', 2023, 2, JANUARI)
+    write_partition(warehouse_dir, 'sheet_id', 2024, 1, JANUARI)
+    write_partition(warehouse_dir, 'sheet_id', 2024, 2, FEBRUARI)
+
+    df = read_warehouse(warehouse_dir, 'sheet_id', year=2024, month_nums=[2], columns=['nama'])
+    assert list(df.columns) == ['year', 'month_num', 'nama']
+    assert df.values.tolist() == [[2024, 2, 'Alice']]
+
+    result = read_warehouse_months(warehouse_dir, 'sheet_id', 2024)
+    assert list(result) == ['Januari', 'Februari']
+    assert result['Januari']['nama'].tolist() == ['Alice', 'Bob', 'Charlie']
+    assert read_warehouse_months(warehouse_dir, 'other_sheet_id', 2024) == {}
+
+
+def test_rebuild_recap(tmp_path):
+    warehouse_config = {'enabled': True, 'warehouse_dir': str(tmp_path)}
+    cleaned_dfs = {'Januari': JANUARI, 'Februari': FEBRUARI}
+
+    with mock.patch('functions.get_warehouse_config', return_value=warehouse_config):
+        persist_to_warehouse(SHEET_URL, cleaned_dfs, 2024)
+
+        worksheet = InMemoryWorksheet()
+        assert rebuild_recap(SHEET_URL, worksheet, 2024) == ['Januari', 'Februari']
+        assert rebuild_recap(SHEET_URL, InMemoryWorksheet(), 2023) == []
+
+    # Same Recap as a run on the freshly parsed data
+    expected = InMemoryWorksheet()
+    update_recap_months(expected, cleaned_dfs)
+    for name, df in read_recap_tables(worksheet).items():
+        assert df.equals(read_recap_tables(expected)[name])
+
+
+def test_unknown_year_is_never_assumed(tmp_path):
+    warehouse_config = {'enabled': True, 'warehouse_dir': str(tmp_path)}
+
+    with mock.patch.dict('os.environ', {'year': ''}), \
+            mock.patch('functions.get_warehouse_config', return_value=warehouse_config), \
+            mock.patch('functions.get_session') as mock_get_session:
+        # Backfilled month tabs may be from a past year
+        with pytest.raises(ValueError, match="--year"):
+            run_etl_months(SHEET_URL, 'Recap', 'sa.json', ['Januari'])
+        mock_get_session.assert_not_called()
+
+        with pytest.raises(ValueError, match="--year"):
+            persist_to_warehouse(SHEET_URL, {'Januari': JANUARI}, None)
+        assert os.listdir(tmp_path) == []
+        assert require_year(2023) == 2023
+
+    with mock.patch.dict('os.environ', {'year': '2024'}):
+        assert require_year() == 2024
+
+
+def test_warehouse_dir_is_ignored_by_git():
+    # The scheduled workflow commits the whole tree, the warehouse holds personal data
+    from config.warehouse import warehouse_dir
+    gitignore_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.gitignore')
+    with open(gitignore_path) as f:
+        patterns = [line.strip() for line in f]
+
+    assert f'{warehouse_dir.strip("/")}/' in patterns
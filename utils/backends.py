@@ -0,0 +1,248 @@
+import pandas as pd
+from gspread.cell import Cell
+from gspread.utils import a1_range_to_grid_range, a1_to_rowcol
+
+import requests
+
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.create_clean_data import (
+    get_sheet_id, get_export_url, download_workbook, read_sheets_streaming, remove_unnecessary_rows)
+
+
+def get_backends_config() -> dict:
+    '''
+    Imports the source/sink backend settings from the `config.backends`
+    module and returns them as a dictionary.
+    '''
+    from config.backends import source, source_path, sink, sink_path
+    kwargs = {
+        'source': source,
+        'source_path': source_path,
+        'sink': sink,
+        'sink_path': sink_path
+    }
+    return kwargs
+
+
+# Sources: `read_months` returns the raw month sheets keyed by month, with the
+# unnecessary rows already removed (like `read_sheets_streaming`), and
+# `get_version` returns a cheap token that changes whenever the data may have
+# changed (used to poll for edits, see `utils.daemon`).
+
+# Drive API metadata of a file: `version` increases on every change of its content
+DRIVE_FILE_URL = 'https://www.googleapis.com/drive/v3/files/{file_id}'
+
+def read_workbook_months(content: bytes, selected_months: Optional[List[str]] = None) -> Dict[str, pd.DataFrame]:
+    '''
+    Streams the selected month tabs of a workbook, or every month tab if None.
+    '''
+    from config.months import months
+    if selected_months is None:
+        return read_sheets_streaming(content, months, missing_ok=True)
+    return read_sheets_streaming(content, selected_months)
+
+
+class GoogleSheetSource:
+    '''
+    Reads the month tabs of the Google Sheets xlsx export.
+    '''
+    def __init__(self, sheet_url: str, session: Optional[requests.Session] = None):
+        self.sheet_url = sheet_url
+        self.session = session
+
+    def read_months(self, selected_months: Optional[List[str]] = None) -> Dict[str, pd.DataFrame]:
+        content = download_workbook(get_export_url(self.sheet_url), self.session)
+        return read_workbook_months(content, selected_months)
+
+    def get_version(self) -> str:
+        '''
+        Returns the Drive version of the spreadsheet, with a single small
+        metadata request (the session must be authorized).
+        '''
+        if self.session is None:
+            raise RuntimeError("Polling the spreadsheet version needs an authorized session")
+        response = self.session.get(
+            DRIVE_FILE_URL.format(file_id=get_sheet_id(self.sheet_url)),
+            params={'fields': 'version,modifiedTime'})
+        response.raise_for_status()
+        return response.json()['version']
+
+
+class XlsxFileSource:
+    '''
+    Reads the month tabs of a local xlsx workbook (e.g. a saved export).
+    '''
+    def __init__(self, path: str):
+        self.path = path
+
+    def read_months(self, selected_months: Optional[List[str]] = None) -> Dict[str, pd.DataFrame]:
+        with open(self.path, 'rb') as f:
+            content = f.read()
+        return read_workbook_months(content, selected_months)
+
+    def get_version(self) -> str:
+        stat = os.stat(self.path)
+        return f'{stat.st_mtime_ns}-{stat.st_size}'
+
+
+class CsvDirSource:
+    '''
+    Reads month sheets stored as `<month>.csv` files (raw cells, no header row).
+    '''
+    def __init__(self, path: str):
+        self.path = path
+
+    def read_months(self, selected_months: Optional[List[str]] = None) -> Dict[str, pd.DataFrame]:
+        from config.months import months
+        dfs = {}
+        for month in selected_months or months:
+            file_path = os.path.join(self.path, f'{month}.csv')
+            if selected_months is None and not os.path.exists(file_path):
+                continue
+            df = pd.read_csv(file_path, header=None)
+            df.columns = range(df.shape[1])
+            dfs[month] = remove_unnecessary_rows(df.astype(object))
+        return dfs
+
+    def get_version(self) -> str:
+        versions = []
+        for entry in sorted(os.scandir(self.path), key=lambda entry: entry.name):
+            if entry.name.endswith('.csv'):
+                stat = entry.stat()
+                versions.append(f'{entry.name}:{stat.st_mtime_ns}-{stat.st_size}')
+        return ','.join(versions)
+
+
+# Sinks: objects compatible with the part of `gspread.Worksheet` the ETL uses.
+
+class InMemoryWorksheet:
+    '''
+    In-memory stand-in for `gspread.Worksheet` (get, batch_get, range,
+    col_values, update, batch_update). Values are stored as strings, like the
+    formatted values the Sheets API returns, and every call is recorded in `calls`.
+    '''
+    def __init__(self, rows: int = 1000, cols: int = 26):
+        self.row_count = rows
+        self.col_count = cols
+        self.cells: Dict[Tuple[int, int], str] = {}
+        self.calls: List[Tuple[str, Any]] = []
+
+    def set_values(self, values: List[list], start_cell: str = 'A1') -> None:
+        start_row, start_col = a1_to_rowcol(start_cell)
+        for i, row in enumerate(values):
+            for j, value in enumerate(row):
+                key = (start_row + i, start_col + j)
+                if value is None or value == '':
+                    self.cells.pop(key, None)
+                else:
+                    self.cells[key] = str(value)
+        self.row_count = max([self.row_count] + [r for r, _ in self.cells])
+
+    def _bounds(self, range_name: str) -> Tuple[int, int, int, int]:
+        grid = a1_range_to_grid_range(range_name)
+        return (
+            grid.get('startRowIndex', 0) + 1, grid.get('endRowIndex', self.row_count),
+            grid.get('startColumnIndex', 0) + 1, grid.get('endColumnIndex', self.col_count))
+
+    def _values(self, range_name: str) -> List[List[str]]:
+        first_row, last_row, first_col, last_col = self._bounds(range_name)
+        values = [
+            [self.cells.get((r, c), '') for c in range(first_col, last_col + 1)]
+            for r in range(first_row, last_row + 1)
+        ]
+        # Like the Sheets API, trailing empty cells and rows are trimmed
+        values = [row[:max([j + 1 for j, v in enumerate(row) if v] or [0])] for row in values]
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def get(self, range_name: str, **kwargs) -> List[List[str]]:
+        self.calls.append(('get', range_name))
+        return self._values(range_name)
+
+    def batch_get(self, ranges: List[str], **kwargs) -> List[List[List[str]]]:
+        self.calls.append(('batch_get', list(ranges)))
+        return [self._values(range_name) for range_name in ranges]
+
+    def col_values(self, col: int, **kwargs) -> List[str]:
+        self.calls.append(('col_values', col))
+        values = [self.cells.get((r, col), '') for r in range(1, self.row_count + 1)]
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def range(self, range_name: str) -> List[Cell]:
+        self.calls.append(('range', range_name))
+        first_row, last_row, first_col, last_col = self._bounds(range_name)
+        return [
+            Cell(r, c, self.cells.get((r, c), ''))
+            for r in range(first_row, last_row + 1) for c in range(first_col, last_col + 1)
+        ]
+
+    def update(self, values: List[list], range_name: str = 'A1', **kwargs) -> None:
+        self.calls.append(('update', range_name))
+        self.set_values(values, range_name.split(':')[0])
+
+    def batch_update(self, data: List[dict], **kwargs) -> None:
+        self.calls.append(('batch_update', [d['range'] for d in data]))
+        for d in data:
+            self.set_values(d['values'], d['range'].split(':')[0])
+
+
+class FileTablesWorksheet(InMemoryWorksheet):
+    '''
+    `InMemoryWorksheet` whose Recap tables are loaded from and saved to one
+    CSV or Parquet file per table (`<name>.csv` / `<name>.parquet`).
+    Tables are saved after every write.
+    '''
+    def __init__(self, path: str, tables: Dict[str, dict], file_format: str = 'csv'):
+        super().__init__()
+        if file_format not in ('csv', 'parquet'):
+            raise ValueError(f"Unknown table file format: {file_format}")
+        self.path = path
+        self.tables = tables
+        self.file_format = file_format
+
+        for name, config in tables.items():
+            file_path = self._file_path(name)
+            if os.path.exists(file_path):
+                df = self._read(file_path)
+                self.set_values([list(df)] + df.values.tolist(), config['start_cell'])
+
+    def _file_path(self, name: str) -> str:
+        return os.path.join(self.path, f'{name}.{self.file_format}')
+
+    def _read(self, file_path: str) -> pd.DataFrame:
+        if self.file_format == 'csv':
+            return pd.read_csv(file_path, dtype=str, keep_default_na=False)
+        return pd.read_parquet(file_path).astype(str)
+
+    def save(self) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        for name, config in self.tables.items():
+            data = self._values(f"{config['start_cell']}:{config['end_col']}")
+            if not data:
+                continue
+            end = next((i for i, row in enumerate(data) if not row or not row[0]), len(data))
+            columns = data[0]
+            rows = [row + [''] * (len(columns) - len(row)) for row in data[1:end]]
+            df = pd.DataFrame(rows, columns=columns)
+
+            # Write atomically
+            file_path = self._file_path(name)
+            tmp_path = file_path + '.tmp'
+            if self.file_format == 'csv':
+                df.to_csv(tmp_path, index=False)
+            else:
+                df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, file_path)
+
+    def update(self, values: List[list], range_name: str = 'A1', **kwargs) -> None:
+        super().update(values, range_name, **kwargs)
+        self.save()
+
+    def batch_update(self, data: List[dict], **kwargs) -> None:
+        super().batch_update(data, **kwargs)
+        self.save()
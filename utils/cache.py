@@ -0,0 +1,155 @@
+import pandas as pd
+
+import os
+import json
+import time
+import shutil
+import hashlib
+from typing import Optional
+
+
+def get_cache_config() -> dict:
+    '''
+    Imports the workbook cache settings from the `config.cache` module
+    and returns them as a dictionary.
+    '''
+    from config.cache import cache_dir, max_size_bytes, max_age_seconds, incremental_dir
+    kwargs = {
+        'cache_dir': cache_dir,
+        'max_size_bytes': max_size_bytes,
+        'max_age_seconds': max_age_seconds,
+        'incremental_dir': incremental_dir
+    }
+    return kwargs
+
+
+def fingerprint(content: bytes) -> str:
+    '''
+    Returns the SHA-256 hex digest of the exported workbook bytes.
+    '''
+    return hashlib.sha256(content).hexdigest()
+
+
+def _sheet_dir(cache_dir: str, sheet_id: str) -> str:
+    return os.path.join(cache_dir, sheet_id)
+
+
+def load_cache_meta(cache_dir: str, sheet_id: str) -> dict:
+    '''
+    Reads the cache metadata of a sheet. Returns an empty dictionary
+    if the sheet has not been cached yet.
+    '''
+    meta_path = os.path.join(_sheet_dir(cache_dir, sheet_id), 'meta.json')
+    if not os.path.exists(meta_path):
+        return {}
+    with open(meta_path) as f:
+        return json.load(f)
+
+
+def _save_cache_meta(cache_dir: str, sheet_id: str, meta: dict) -> None:
+    meta['accessed_at'] = time.time()
+    meta_path = os.path.join(_sheet_dir(cache_dir, sheet_id), 'meta.json')
+    tmp_path = meta_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+
+def save_workbook_to_cache(cache_dir: str, sheet_id: str, content: bytes) -> str:
+    '''
+    Stores the exported workbook bytes and returns their content hash.
+    If the hash differs from the cached one, every per-month entry
+    of that sheet is invalidated.
+    '''
+    content_hash = fingerprint(content)
+    sheet_dir = _sheet_dir(cache_dir, sheet_id)
+    meta = load_cache_meta(cache_dir, sheet_id)
+
+    if meta.get('hash') != content_hash:
+        # Workbook changed, drop the stale entries
+        shutil.rmtree(sheet_dir, ignore_errors=True)
+        os.makedirs(sheet_dir)
+        with open(os.path.join(sheet_dir, 'workbook.xlsx'), 'wb') as f:
+            f.write(content)
+        meta = {'hash': content_hash, 'months': {}}
+
+    _save_cache_meta(cache_dir, sheet_id, meta)
+    return content_hash
+
+
+def is_month_unchanged(cache_dir: str, sheet_id: str, content_hash: str, month: str) -> bool:
+    '''
+    Returns True if the month was already written to the Recap
+    from a workbook with the same content hash.
+    '''
+    meta = load_cache_meta(cache_dir, sheet_id)
+    return meta.get('hash') == content_hash and meta.get('months', {}).get(month) == 'written'
+
+
+def load_cached_cleaned_df(cache_dir: str, sheet_id: str, content_hash: str, month: str) -> Optional[pd.DataFrame]:
+    '''
+    Returns the parsed `cleaned_df` of a month if it was cached
+    from a workbook with the same content hash.
+    '''
+    meta = load_cache_meta(cache_dir, sheet_id)
+    file_path = os.path.join(_sheet_dir(cache_dir, sheet_id), f'{month}.pkl')
+    if meta.get('hash') != content_hash or month not in meta.get('months', {}) or not os.path.exists(file_path):
+        return None
+    return pd.read_pickle(file_path)
+
+
+def save_cleaned_df_to_cache(cache_dir: str, sheet_id: str, month: str, cleaned_df: pd.DataFrame) -> None:
+    '''
+    Stores the parsed `cleaned_df` of a month next to its workbook.
+    The sheet directory and metadata are recreated if they were evicted.
+    '''
+    meta = load_cache_meta(cache_dir, sheet_id)
+    os.makedirs(_sheet_dir(cache_dir, sheet_id), exist_ok=True)
+    cleaned_df.to_pickle(os.path.join(_sheet_dir(cache_dir, sheet_id), f'{month}.pkl'))
+    meta.setdefault('months', {}).setdefault(month, 'parsed')
+    _save_cache_meta(cache_dir, sheet_id, meta)
+
+
+def mark_month_written(cache_dir: str, sheet_id: str, month: str) -> None:
+    '''
+    Records that the month has been successfully written to the Recap,
+    so the next run with the same workbook can be skipped.
+    '''
+    meta = load_cache_meta(cache_dir, sheet_id)
+    os.makedirs(_sheet_dir(cache_dir, sheet_id), exist_ok=True)
+    meta.setdefault('months', {})[month] = 'written'
+    _save_cache_meta(cache_dir, sheet_id, meta)
+
+
+def _dir_size(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path) for name in names
+    )
+
+
+def evict_cache(cache_dir: str, max_size_bytes: int, max_age_seconds: int, **kwargs) -> None:
+    '''
+    Removes cached sheets that were not accessed within `max_age_seconds`,
+    then removes the least recently accessed ones until the cache
+    is smaller than `max_size_bytes`.
+    '''
+    if not os.path.isdir(cache_dir):
+        return
+
+    now = time.time()
+    entries = []
+    for sheet_id in os.listdir(cache_dir):
+        accessed_at = load_cache_meta(cache_dir, sheet_id).get('accessed_at', 0)
+        sheet_dir = _sheet_dir(cache_dir, sheet_id)
+        if now - accessed_at > max_age_seconds:
+            shutil.rmtree(sheet_dir, ignore_errors=True)
+        else:
+            entries.append((accessed_at, sheet_dir, _dir_size(sheet_dir)))
+
+    total_size = sum(size for _, _, size in entries)
+    for _, sheet_dir, size in sorted(entries):
+        if total_size <= max_size_bytes:
+            break
+        shutil.rmtree(sheet_dir, ignore_errors=True)
+        total_size -= size
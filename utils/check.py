@@ -0,0 +1,76 @@
+import os
+import json
+import importlib.util
+from typing import Dict, List, Optional, Tuple
+
+from config.months import months
+from utils.sheet_url import get_sheet_id
+
+# Only the standard library and the config modules are imported here, so that
+# checking the environment takes milliseconds.
+
+SOURCES = ('gsheet', 'xlsx', 'csv')
+SINKS = ('gsheet', 'memory', 'csv', 'parquet')
+
+
+def check_service_account(path: Optional[str]) -> Optional[str]:
+    '''
+    Returns what is wrong with the service account key file, if anything.
+    '''
+    if not path:
+        return "not set"
+    if not os.path.isfile(path):
+        return f"file not found: {path}"
+    try:
+        with open(path) as f:
+            key = json.load(f)
+    except (OSError, ValueError) as e:
+        return f"not a JSON key file: {e}"
+    missing = [field for field in ('client_email', 'private_key') if not key.get(field)]
+    if key.get('type') != 'service_account' or missing:
+        return "not a service account key file"
+    return None
+
+
+def check_environment(env: Dict[str, Optional[str]]) -> List[Tuple[str, Optional[str]]]:
+    '''
+    Validates the environment variables and the configuration modules without
+    importing the ETL dependencies or making any request. Returns one
+    (name, problem) pair per check, the problem being None when it passed.
+    '''
+    from config.backends import source, source_path, sink, sink_path
+
+    results = []
+    uses_google = source == 'gsheet' or sink == 'gsheet'
+
+    # Backends
+    results.append(('source', None if source in SOURCES else f"unknown source backend: {source}"))
+    if source in ('xlsx', 'csv'):
+        results.append(('source_path', None if os.path.exists(source_path) else f"not found: {source_path!r}"))
+    results.append(('sink', None if sink in SINKS else f"unknown sink backend: {sink}"))
+    if sink in ('csv', 'parquet'):
+        results.append(('sink_path', None if sink_path else "not set"))
+
+    # Environment variables
+    try:
+        get_sheet_id(env.get('sheet_url') or '')
+        results.append(('sheet_url', None))
+    except ValueError as e:
+        results.append(('sheet_url', str(e)))
+    if uses_google:
+        results.append(('recap_sheet_title', None if env.get('recap_sheet_title') else "not set"))
+        results.append(('service_account_path', check_service_account(env.get('service_account_path'))))
+    if env.get('month'):
+        results.append(('month', None if env['month'] in months else f"unknown month: {env['month']}"))
+    if env.get('year'):
+        results.append(('year', None if env['year'].isdigit() else f"not a year: {env['year']}"))
+
+    # Dependencies (located, not imported)
+    packages = ['pandas', 'openpyxl', 'pyarrow']
+    if uses_google:
+        packages += ['gspread', 'google.auth']
+    for package in packages:
+        found = importlib.util.find_spec(package) is not None
+        results.append((package, None if found else "not installed"))
+
+    return results
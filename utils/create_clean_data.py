@@ -1,21 +1,25 @@
 import pandas as pd
-import re    
+import numpy as np
+import requests
+from openpyxl import load_workbook
+from openpyxl.worksheet._read_only import ReadOnlyWorksheet
+
+import logging
+from io import BytesIO
+from urllib.request import urlopen
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from utils.sheet_url import get_sheet_id, get_export_url
+
+logger = logging.getLogger(__name__)
 
 def read_gsheet(sheet_url: str, **kwargs) -> pd.DataFrame:
     '''
     Validates the provided Google Sheets URL, converts it to an exportable
     URL, and reads the data into a Pandas DataFrame.
     '''
-    # Validate the input URL
-    # https://docs.google.com/spreadsheets/d/1kaci6AtLCpOENLcfJ2RvtgMOph1FcBumvJ2pkRBQhro/edit?usp=sharing
-    
-    pattern = r'^https:\/\/docs\.google\.com\/spreadsheets\/d\/[a-zA-Z0-9_-]+\/[a-z]+\?usp=sharing$'
-    if not re.match(pattern, sheet_url):
-        raise ValueError("The provided URL is not a valid Google Sheets URL.")
-
     # Convert to the export URL
-    id = sheet_url.split('/')[-2]
-    converted_url = f"https://docs.google.com/spreadsheets/d/{id}/export?format=xlsx"
+    converted_url = get_export_url(sheet_url)
 
     # Read the Excel file into a DataFrame
     try:
@@ -26,6 +30,111 @@ def read_gsheet(sheet_url: str, **kwargs) -> pd.DataFrame:
     return df
 
 
+def download_workbook(export_url: str, session: Optional[requests.Session] = None) -> bytes:
+    '''
+    Downloads the exported workbook and returns its raw bytes.
+    If a (keep-alive, authorized) session is given, HTTP(S) downloads reuse its
+    connection pool. Any URL supported by urllib works otherwise, so a `file://`
+    URL can stand in for the export URL when running offline.
+    '''
+    try:
+        if session is not None and export_url.startswith(('http://', 'https://')):
+            response = session.get(export_url)
+            response.raise_for_status()
+            return response.content
+        with urlopen(export_url) as response:
+            return response.read()
+    except Exception as e:
+        raise RuntimeError(f"Failed to download the Google Sheets document: {e}")
+
+
+def read_sheets_streaming(
+        content: bytes,
+        sheet_names: Optional[List[str]] = None,
+        missing_ok: bool = False
+    ) -> Dict[str, pd.DataFrame]:
+    '''
+    Streams the requested sheets of the workbook with openpyxl in read-only
+    mode and returns, for each sheet, the same rows `remove_unnecessary_rows`
+    would keep. Only the kept rows are ever materialized, so memory does not
+    grow with the number of tabs or blank rows. If `sheet_names` is None,
+    every sheet is read; with `missing_ok`, absent sheets are skipped.
+    '''
+    try:
+        wb = load_workbook(BytesIO(content), read_only=True, data_only=True, keep_links=False)
+    except Exception as e:
+        raise RuntimeError(f"Failed to read the Google Sheets document: {e}")
+
+    try:
+        if sheet_names is None:
+            sheet_names = wb.sheetnames
+
+        dfs = {}
+        for sheet_name in sheet_names:
+            if sheet_name not in wb.sheetnames:
+                if missing_ok:
+                    continue
+                raise RuntimeError(f"Failed to read the Google Sheets document: Worksheet named '{sheet_name}' not found")
+
+            dfs[sheet_name] = read_sheet_df(wb[sheet_name])
+    finally:
+        wb.close()
+
+    return dfs
+
+
+def read_sheet_df(worksheet: ReadOnlyWorksheet) -> pd.DataFrame:
+    '''
+    Reads the rows of a (read-only) sheet that `remove_unnecessary_rows`
+    would keep into a DataFrame.
+    '''
+    rows = list(iter_sheet_rows(worksheet))
+
+    # Pad ragged rows to the widest one
+    width = max((len(row) for row in rows), default=0)
+    for row in rows:
+        row.extend([np.nan] * (width - len(row)))
+
+    return pd.DataFrame(rows)
+
+
+def iter_sheet_rows(worksheet: ReadOnlyWorksheet) -> Iterator[List[Any]]:
+    '''
+    Yields the rows of a raw month sheet one by one, skipping empty rows,
+    'total per bulan' rows and everything above the first 'teacher' block header.
+    '''
+    in_blocks = False
+    for values in worksheet.iter_rows(values_only=True):
+        row = [_convert_cell(value) for value in values]
+
+        # Empty rows
+        if all(value is np.nan for value in row):
+            continue
+
+        # `total per bulan` rows
+        if len(row) > 3 and isinstance(row[3], str) and 'total per bulan' in row[3].lower():
+            continue
+
+        # Rows above the first teacher block are never used
+        if not in_blocks:
+            if not (isinstance(row[0], str) and 'teacher' in row[0].lower()):
+                continue
+            in_blocks = True
+
+        yield row
+
+
+def _convert_cell(value: Any) -> Any:
+    '''
+    Converts a raw openpyxl value the same way `pd.read_excel` does.
+    '''
+    if value is None or value == '':
+        return np.nan
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
 def remove_unnecessary_rows(df: pd.DataFrame) -> pd.DataFrame:
     '''
     Removes rows that contain only NaN values and rows that contain 
@@ -43,46 +152,51 @@ def remove_unnecessary_rows(df: pd.DataFrame) -> pd.DataFrame:
 
 def transform_raw_data(df: pd.DataFrame) -> pd.DataFrame:
     '''
-    Processes the raw data by segmenting it into sub-dataframes
-    based on the occurrence of 'teacher' in the first column. It then tidies and 
-    cleans each sub-dataframe, adds relevant columns, and concatenates them into a 
-    single cleaned DataFrame.
+    Processes the raw data by segmenting it into teacher blocks based on
+    the occurrence of 'teacher' in the first column. Every block starts with
+    a teacher row, an instrument row and a header row. Blocks are labeled in a
+    single pass (cumulative sum over the 'teacher' mask), so the data rows of
+    every block are tidied at once, without any per-block copy.
     '''
-    # Output cleaned dataframe
-    cleaned_df = []
+    df = df.reset_index(drop=True)
 
-    # Finding boundary index for each `df_sub`
-    filt = df[0].str.lower().str.contains("teacher", na=False)
-    df_sub_ids = df[filt].index.tolist()
-    df_sub_ids.append(len(df))
+    # Label blocks and the position of each row inside its block
+    is_top = df[0].str.lower().str.contains("teacher", na=False).to_numpy()
+    block = np.cumsum(is_top)
+    row_ids = np.arange(len(df))
+    block_start = np.maximum.accumulate(np.where(is_top, row_ids, 0))
+    pos = row_ids - block_start
 
-    # Iterate each `df_sub`
-    for i in range(len(df_sub_ids[:-1])):
-        # Get teacher and instrument
-        top_row = df_sub_ids[i]
-        teacher = df.iloc[top_row, 1]
-        instrument = df.iloc[top_row+1, 1]
+    # Teacher (top row) and instrument (row below it) of each block
+    teachers = pd.Series(df[1].to_numpy()[is_top], index=block[is_top])
+    instrument_rows = (pos == 1) & (block > 0)
+    instruments = pd.Series(df[1].to_numpy()[instrument_rows], index=block[instrument_rows])
 
-        # Get the sub dataframe
-        start = top_row + 2
-        end = df_sub_ids[i+1]
-        df_sub = df.copy().iloc[start:end].reset_index(drop=True)
+    # Header rows, and the data rows below them
+    header_rows = (pos == 2) & (block > 0)
+    data_rows = (pos > 2) & (block > 0)
+    headers = df[header_rows]
+    header_blocks = block[header_rows]
+
+    # Blocks normally share the same header, tidy every group of identical headers at once
+    cleaned_df = []
+    for _, same_header in headers.groupby(list(headers.columns), dropna=False, sort=False):
+        same_blocks = header_blocks[headers.index.get_indexer(same_header.index)]
+        rows = data_rows & np.isin(block, same_blocks)
 
-        # Tidy it
-        df_sub.columns = df_sub.iloc[0].str.lower().str.replace(' ', '_').values
-        df_sub = df_sub.drop([0]).reset_index(drop=True)
+        df_sub = df[rows]
+        df_sub.columns = same_header.iloc[0].str.lower().str.replace(' ', '_').values
 
         # Drop unnecessary column
-        df_sub.drop(['no', 'keterangan_tambahan'], axis=1, inplace=True)
+        df_sub = df_sub.drop(['no', 'keterangan_tambahan'], axis=1)
 
         # Add columns for teacher and instrument
-        df_sub['instrument'] = instrument
-        df_sub['teacher'] = teacher
+        df_sub['instrument'] = instruments.reindex(block[rows]).to_numpy()
+        df_sub['teacher'] = teachers.reindex(block[rows]).to_numpy()
 
-        # Append it
         cleaned_df.append(df_sub)
 
-    return pd.concat(cleaned_df, ignore_index=True)
+    return pd.concat(cleaned_df).sort_index().reset_index(drop=True)
 
 
 def clean_transformed_data(cleaned_df: pd.DataFrame) -> pd.DataFrame:
@@ -105,17 +219,114 @@ def clean_transformed_data(cleaned_df: pd.DataFrame) -> pd.DataFrame:
 
 def extract_keterangan_columns(cleaned_df: pd.DataFrame) -> pd.DataFrame:
     '''
-    Creates new boolean columns based on the presence of specific keywords 
-    in the 'keterangan' column of the DataFrame.
+    Creates new flag columns (int8) based on the presence of specific keywords
+    in the 'keterangan' column of the DataFrame. The keyword -> flag mapping is
+    declared in `config.keterangan`. Keywords are only searched once per distinct
+    lowercased value, then broadcast back to every row.
+    '''
+    from config.keterangan import keyword_flags
+
+    # Factorize, since 'keterangan' has few distinct values, then lowercase the
+    # distinct values. Non-string values (numbers, NaN) contain no keyword
+    codes, uniques = pd.factorize(cleaned_df['keterangan'], use_na_sentinel=False)
+    uniques = [value.lower() if isinstance(value, str) else '' for value in uniques]
+
+    for col, (keyword, inverted) in keyword_flags.items():
+        flags = np.fromiter(((keyword in value) != inverted for value in uniques), dtype=np.int8, count=len(uniques))
+        cleaned_df[col] = flags[codes]
+
+    return cleaned_df
+
+
+def get_cleaned_schema() -> dict:
+    '''
+    Imports the dtypes of the cleaned DataFrame from the `config.cleaned_schema`
+    module and returns them as a dictionary.
     '''
-    cleaned_df['is_trial'] = cleaned_df['keterangan'].apply(lambda x: 1 if 'trial' in x.lower() else 0)
+    from config.cleaned_schema import category_cols, fee_cols, fee_dtype, flag_dtype
+    from config.keterangan import keyword_flags
+    kwargs = {
+        'category_cols': category_cols,
+        'fee_cols': fee_cols,
+        'fee_dtype': fee_dtype,
+        'flag_cols': list(keyword_flags),
+        'flag_dtype': flag_dtype
+    }
+    return kwargs
 
-    cleaned_df['is_baru'] = cleaned_df['keterangan'].apply(lambda x: 1 if 'baru' in x.lower() else 0)
 
-    cleaned_df['is_keluar'] = cleaned_df['keterangan'].apply(lambda x: 1 if 'keluar' in x.lower() else 0)
+def find_invalid_cells(
+        cleaned_df: pd.DataFrame,
+        log: bool = True,
+        sheet_name: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+    '''
+    Returns the non-empty fee cells that are not numbers, as {column, row}
+    records (`row` is the 1-based position among the data rows of the month),
+    and logs them unless `log` is False (see `log_invalid_cells`).
+    '''
+    invalid_cells = []
+    for col in get_cleaned_schema()['fee_cols']:
+        values = cleaned_df[col]
+        invalid = values.notna() & pd.to_numeric(values, errors='coerce').isna()
+        for row in np.flatnonzero(invalid.to_numpy()) + 1:
+            invalid_cells.append({'column': col, 'row': int(row)})
+    if log:
+        log_invalid_cells(invalid_cells, sheet_name)
+    return invalid_cells
+
 
-    cleaned_df['is_cuti'] = cleaned_df['keterangan'].apply(lambda x: 1 if 'cuti' in x.lower() else 0)
+def log_invalid_cells(invalid_cells: List[Dict[str, Any]], sheet_name: Optional[str] = None) -> None:
+    '''
+    Logs one warning per column of the invalid cell records of
+    `find_invalid_cells`, with their count and rows only. Student names and
+    fees are never logged, since `status.log` is committed by the workflow.
+    '''
+    rows_by_col: Dict[str, List[int]] = {}
+    for cell in invalid_cells:
+        rows_by_col.setdefault(cell['column'], []).append(cell['row'])
 
-    cleaned_df['not_lunas'] = cleaned_df['keterangan'].apply(lambda x: 0 if 'lunas' in x.lower() else 1)
+    where = f" in {sheet_name}" if sheet_name else ''
+    for col, rows in rows_by_col.items():
+        logger.warning(
+            f"{len(rows)} invalid {col} cells{where} (data rows {', '.join(map(str, rows))}), counted as 0")
+
+
+def apply_cleaned_schema(cleaned_df: pd.DataFrame) -> pd.DataFrame:
+    '''
+    Converts the cleaned DataFrame to the compact schema declared in
+    `config.cleaned_schema`: categoricals for the repeated text columns,
+    fixed integer fees and narrow integer flags. Fee cells that are not
+    numbers (see `find_invalid_cells`) are counted as 0 instead of failing the run.
+    '''
+    schema = get_cleaned_schema()
 
-    return cleaned_df
\ No newline at end of file
+    for col in schema['fee_cols']:
+        fees = pd.to_numeric(cleaned_df[col], errors='coerce').fillna(0)
+        cleaned_df[col] = fees.round().astype(schema['fee_dtype'])
+
+    for col in schema['flag_cols']:
+        cleaned_df[col] = cleaned_df[col].astype(schema['flag_dtype'])
+
+    for col in schema['category_cols']:
+        cleaned_df[col] = cleaned_df[col].astype('category')
+
+    return cleaned_df
+
+
+def clean_raw_data(
+        df: pd.DataFrame,
+        log: bool = True,
+        sheet_name: Optional[str] = None
+    ) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+    '''
+    Performs the series of transformations that clean a raw month sheet
+    whose unnecessary rows have already been removed. Returns the cleaned
+    data and the invalid cells (see `find_invalid_cells`, `log` and
+    `sheet_name` are passed to it).
+    '''
+    cleaned_df = transform_raw_data(df)
+    cleaned_df = clean_transformed_data(cleaned_df)
+    cleaned_df = extract_keterangan_columns(cleaned_df)
+    invalid_cells = find_invalid_cells(cleaned_df, log, sheet_name)
+    return apply_cleaned_schema(cleaned_df), invalid_cells
@@ -0,0 +1,146 @@
+import pandas as pd
+
+import time
+import hashlib
+import logging
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def get_daemon_config() -> dict:
+    '''
+    Imports the polling settings from the `config.daemon` module
+    and returns them as a dictionary.
+    '''
+    from config.daemon import poll_seconds, debounce_seconds, max_wait_seconds
+    kwargs = {
+        'poll_seconds': poll_seconds,
+        'debounce_seconds': debounce_seconds,
+        'max_wait_seconds': max_wait_seconds
+    }
+    return kwargs
+
+
+def fingerprint_months(raw_dfs: Dict[str, pd.DataFrame]) -> Dict[str, str]:
+    '''
+    Fingerprints the raw sheet of every month, keyed by month.
+    '''
+    fingerprints = {}
+    for month, df in raw_dfs.items():
+        digest = hashlib.sha1(str(df.shape).encode())
+        digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+        fingerprints[month] = digest.hexdigest()
+    return fingerprints
+
+
+class ChangeWatcher:
+    '''
+    Polls a source backend (see `utils.backends`) for changes and calls
+    `on_change` with the raw sheets of the months that changed.
+
+    Every poll only asks the source for its version, which is cheap (one
+    Drive metadata request, or a `stat` of local files). A new version is not
+    processed right away: the months are read once no new version was seen
+    for `debounce_seconds`, or `max_wait_seconds` after the first unprocessed
+    one, so a burst of edits triggers a single run. The months are then
+    fingerprinted and only those that differ from the last processed ones are
+    passed to `on_change`. The first poll processes every month.
+
+    If reading or `on_change` fails, the error is logged and the change is
+    retried after another `debounce_seconds`. `clock` and `sleep` can be
+    replaced to drive the watcher in tests.
+    '''
+    def __init__(
+            self,
+            source,
+            on_change: Callable[[Dict[str, pd.DataFrame]], Any],
+            poll_seconds: float = 60,
+            debounce_seconds: float = 120,
+            max_wait_seconds: float = 900,
+            clock: Callable[[], float] = time.monotonic,
+            sleep: Callable[[float], None] = time.sleep
+        ):
+        self.source = source
+        self.on_change = on_change
+        self.poll_seconds = poll_seconds
+        self.debounce_seconds = debounce_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self.clock = clock
+        self.sleep = sleep
+
+        self.version: Optional[str] = None
+        self.fingerprints: Dict[str, str] = {}
+        # When the last new version was seen and when the first unprocessed one was
+        self.changed_at: Optional[float] = None
+        self.pending_since: Optional[float] = None
+        self.stats = Counter(polls=0, syncs=0, runs=0, errors=0)
+        self.stopped = False
+
+    def poll(self) -> List[str]:
+        '''
+        Polls the source once and processes the pending change if it is due.
+        Returns the months passed to `on_change`.
+        '''
+        now = self.clock()
+        self.stats['polls'] += 1
+        try:
+            version = self.source.get_version()
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.warning(f"Could not poll the source: {e}")
+            return []
+
+        first_poll = not self.stats['syncs'] and self.pending_since is None
+        if version != self.version:
+            self.version = version
+            self.changed_at = now
+            if self.pending_since is None:
+                self.pending_since = now
+
+        if self.pending_since is None:
+            return []
+        quiet = now - self.changed_at >= self.debounce_seconds
+        overdue = now - self.pending_since >= self.max_wait_seconds
+        if not (first_poll or quiet or overdue):
+            return []
+
+        try:
+            return self.sync()
+        except Exception as e:
+            self.stats['errors'] += 1
+            self.changed_at = now
+            logger.error(f"An error occurred while processing the changes: {e}", exc_info=True)
+            return []
+
+    def sync(self) -> List[str]:
+        '''
+        Reads every month, runs `on_change` with those whose fingerprint
+        changed and clears the pending change.
+        '''
+        self.stats['syncs'] += 1
+        raw_dfs = self.source.read_months(None)
+        fingerprints = fingerprint_months(raw_dfs)
+        changed = [month for month in raw_dfs if fingerprints[month] != self.fingerprints.get(month)]
+        if changed:
+            self.on_change({month: raw_dfs[month] for month in changed})
+            self.stats['runs'] += 1
+
+        self.fingerprints = fingerprints
+        self.changed_at = self.pending_since = None
+        return changed
+
+    def run(self, max_polls: Optional[int] = None) -> None:
+        '''
+        Polls every `poll_seconds` until `stop` is called (or `max_polls` polls).
+        '''
+        polls = 0
+        while not self.stopped and (max_polls is None or polls < max_polls):
+            self.poll()
+            polls += 1
+            if not self.stopped and (max_polls is None or polls < max_polls):
+                self.sleep(self.poll_seconds)
+
+    def stop(self) -> None:
+        self.stopped = True
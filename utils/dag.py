@@ -0,0 +1,116 @@
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, List, Tuple
+
+# Task name -> (function, names of the tasks it depends on). The function is
+# called with the results of its dependencies, in order.
+Tasks = Dict[str, Tuple[Callable[..., Any], List[str]]]
+
+
+class DagRun:
+    '''
+    Results and timings of the tasks of a `run_dag` call. Times are in
+    seconds since the start of the run.
+    '''
+    def __init__(self, tasks: Tasks):
+        self.tasks = tasks
+        self.results: Dict[str, Any] = {}
+        self.timings: Dict[str, Dict[str, float]] = {}
+        self.seconds = 0.0
+
+    def critical_path(self) -> List[str]:
+        '''
+        Returns the chain of tasks that determined the duration of the run:
+        starting from the last task to finish, each task is preceded by the
+        dependency that finished last.
+        '''
+        if not self.timings:
+            return []
+        path = [max(self.timings, key=lambda name: self.timings[name]['end'])]
+        while True:
+            deps = [dep for dep in self.tasks[path[-1]][1] if dep in self.timings]
+            if not deps:
+                break
+            path.append(max(deps, key=lambda name: self.timings[name]['end']))
+        return path[::-1]
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            'seconds': round(self.seconds, 4),
+            'tasks': {
+                name: {key: round(value, 4) for key, value in timing.items()}
+                for name, timing in sorted(self.timings.items(), key=lambda item: item[1]['start'])
+            },
+            'critical_path': self.critical_path(),
+        }
+
+
+def check_dag(tasks: Tasks) -> None:
+    '''
+    Raises a ValueError if a dependency is unknown or if the tasks form a cycle.
+    '''
+    for name, (_, deps) in tasks.items():
+        unknown = [dep for dep in deps if dep not in tasks]
+        if unknown:
+            raise ValueError(f"Task '{name}' depends on unknown tasks: {', '.join(unknown)}")
+
+    visited = set()
+    while len(visited) < len(tasks):
+        ready = [name for name, (_, deps) in tasks.items() if name not in visited and set(deps) <= visited]
+        if not ready:
+            raise ValueError(f"Tasks form a cycle: {', '.join(sorted(set(tasks) - visited))}")
+        visited.update(ready)
+
+
+def run_dag(tasks: Tasks, max_workers: int = 4) -> DagRun:
+    '''
+    Runs the tasks on a thread pool, each one as soon as all of its
+    dependencies are done, and records when every task started and ended.
+    Tasks run in a copy of the caller's context (so `utils.metrics.stage`
+    blocks inside them are recorded in the current run). If a task fails,
+    the tasks that have not started yet are cancelled and its exception is
+    raised once the running ones are done.
+    '''
+    check_dag(tasks)
+    run = DagRun(tasks)
+    start = time.perf_counter()
+
+    def timed(name: str, func: Callable[..., Any], args: list) -> Any:
+        task_start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            end = time.perf_counter()
+            run.timings[name] = {'start': task_start - start, 'end': end - start, 'seconds': end - task_start}
+
+    futures: Dict[Future, str] = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def submit_ready() -> set:
+            # Submit the tasks whose dependencies are all done
+            submitted = set(futures.values())
+            new_futures = set()
+            for name, (func, deps) in tasks.items():
+                if name not in submitted and all(dep in run.results for dep in deps):
+                    context = contextvars.copy_context()
+                    args = [run.results[dep] for dep in deps]
+                    future = executor.submit(context.run, timed, name, func, args)
+                    futures[future] = name
+                    new_futures.add(future)
+            return new_futures
+
+        pending = submit_ready()
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                exception = future.exception()
+                if exception is not None:
+                    for other in pending:
+                        other.cancel()
+                    raise exception
+                run.results[futures[future]] = future.result()
+
+            pending |= submit_ready()
+
+    run.seconds = time.perf_counter() - start
+    return run
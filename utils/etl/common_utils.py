@@ -1,24 +1,27 @@
 import pandas as pd
-from gspread import Worksheet
 
 import re
-from typing import Optional, Tuple, List
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple, List
 
-def get_spreadsheet_table(worksheet: Worksheet, **kwargs) -> pd.DataFrame:
+from .upsert import upsert
+
+# gspread is slow to import and only needed for type hints here
+if TYPE_CHECKING:
+    from gspread import Worksheet
+
+def get_spreadsheet_table(worksheet: 'Worksheet', **kwargs) -> pd.DataFrame:
     '''
     Extracts a specified range of cells from a Google Sheets worksheet
-    based on provided starting cell, ending column, and a range to check for null values.
+    based on provided starting cell and ending column, down to the last
+    non-empty row of the starting column.
     It converts the extracted data into a Pandas DataFrame.
     '''
     # Extract variable from kwargs
     start_cell: str = kwargs.get('start_cell')
     end_col: str = kwargs.get('end_col')
-    null_check_max_row: int = kwargs.get('null_check_max_row')
 
     # Get spreadsheet table range
-    start_col, start_row = split_letters_numbers(start_cell)
-    check_null_range = f'{start_cell}:{start_col}{null_check_max_row}'
-    end_row = detect_end_row(worksheet, check_range=check_null_range)
+    end_row = detect_end_row(worksheet, start_cell)
     tabel_range = f'{start_cell}:{end_col}{end_row}'
 
     # Get spreadsheet table
@@ -35,26 +38,147 @@ def get_spreadsheet_table(worksheet: Worksheet, **kwargs) -> pd.DataFrame:
     return df
 
 
+def get_spreadsheet_tables(worksheet: 'Worksheet', configs: List[dict]) -> List[pd.DataFrame]:
+    '''
+    Reads several tables of a worksheet with a single `batch_get` request.
+    Each table is read with an open-ended range (from its start cell down to
+    the bottom of its columns) and its end row is detected locally: the table
+    stops at the first row whose first cell is empty.
+    '''
+    ranges = [f"{config['start_cell']}:{config['end_col']}" for config in configs]
+    value_ranges = worksheet.batch_get(ranges)
+
+    dfs = []
+    for data in value_ranges:
+        # Table not created yet
+        if not data:
+            dfs.append(pd.DataFrame())
+            continue
+
+        # Rows until the first empty cell in the table's first column
+        end = next((i for i, row in enumerate(data) if not row or not row[0]), len(data))
+        data = [list(row) for row in data[:end]]
+
+        # The API trims trailing empty cells, pad them back
+        columns = data[0]
+        for row in data[1:]:
+            row.extend([''] * (len(columns) - len(row)))
+        dfs.append(pd.DataFrame(data[1:], columns=columns))
+
+    return dfs
+
+
 def update_to_spreadsheet_worksheet(
-        worksheet:Worksheet,
+        worksheet:'Worksheet',
         df: pd.DataFrame,
+        old_df: Optional[pd.DataFrame] = None,
         **kwargs
     ) -> None:
     '''
     Updates the specified worksheet with the data from a DataFrame,
-    starting from a specified cell.
+    starting from a specified cell. If the table currently in the worksheet
+    (`old_df`) is given, only the changed cells are written, in a single
+    `batch_update`.
     '''
-    # Extract variable from kwargs
-    start_cell: str = kwargs.get('start_cell')
+    update_tables_to_spreadsheet_worksheet(worksheet, [(df, old_df, kwargs)])
+
+
+def update_tables_to_spreadsheet_worksheet(
+        worksheet: 'Worksheet',
+        tables: List[Tuple[pd.DataFrame, Optional[pd.DataFrame], dict]]
+    ) -> None:
+    '''
+    Writes several tables, given as (df, old_df, config) tuples, with a single
+    `batch_update` request, which the Sheets API applies all-or-nothing.
+    Tables with an `old_df` only get their changed cells written.
+    '''
+    data = []
+    for df, old_df, config in tables:
+        # Extract variable from config
+        start_cell: str = config.get('start_cell')
+
+        if old_df is not None:
+            data.extend(diff_table_ranges(old_df, df, start_cell))
+        else:
+            data.append({
+                'range': start_cell,
+                'values': [list(df)] + [[_cell_value(v) for v in row] for row in df.values.tolist()]
+            })
 
-    # Start cell for table's values (rows under the column row)
-    values_start_col = split_letters_numbers(start_cell)[0]
-    values_start_row = split_letters_numbers(start_cell)[1] + 1
-    values_start_cell = f'{values_start_col}{values_start_row}'
+    if data:
+        worksheet.batch_update(data)
 
-    # Update table to the worksheet
-    worksheet.update([list(df)], start_cell)
-    worksheet.update(df.values.tolist(), values_start_cell)
+
+def diff_table_ranges(old_df: pd.DataFrame, new_df: pd.DataFrame, start_cell: str) -> List[Dict[str, Any]]:
+    '''
+    Compares two tables (header row included) as they are laid out from
+    `start_cell` and returns the minimal set of contiguous changed ranges,
+    in the format expected by `Worksheet.batch_update`. Cells of the old table
+    that fall outside the new one (rows or columns that disappeared) are cleared.
+    '''
+    from gspread.utils import a1_to_rowcol, rowcol_to_a1
+
+    start_row, start_col = a1_to_rowcol(start_cell)
+    old_rows = [list(old_df)] + old_df.values.tolist()
+    new_rows = [list(new_df)] + new_df.values.tolist()
+    width = max(len(old_rows[0]), len(new_rows[0]))
+
+    # Runs of changed cells in each row, stacked into blocks when the
+    # same columns change in consecutive rows
+    blocks: Dict[Tuple[int, int], dict] = {}
+    data = []
+    for i in range(max(len(old_rows), len(new_rows))):
+        old = old_rows[i] if i < len(old_rows) else []
+        new = new_rows[i] if i < len(new_rows) else []
+        old = [_cell_str(v) for v in old] + [''] * (width - len(old))
+        new_values = list(new) + [''] * (width - len(new))
+
+        j = 0
+        while j < width:
+            if old[j] == _cell_str(new_values[j]):
+                j += 1
+                continue
+            k = j
+            while k < width and old[k] != _cell_str(new_values[k]):
+                k += 1
+
+            block = blocks.get((j, k))
+            if block is not None and block['last_row'] == i - 1:
+                block['values'].append(new_values[j:k])
+                block['last_row'] = i
+            else:
+                block = {'first_row': i, 'last_row': i, 'first_col': j, 'last_col': k - 1, 'values': [new_values[j:k]]}
+                blocks[(j, k)] = block
+                data.append(block)
+            j = k
+
+    return [
+        {
+            'range': (
+                f"{rowcol_to_a1(start_row + b['first_row'], start_col + b['first_col'])}:"
+                f"{rowcol_to_a1(start_row + b['last_row'], start_col + b['last_col'])}"),
+            'values': [[_cell_value(v) for v in row] for row in b['values']]
+        }
+        for b in data
+    ]
+
+
+def _cell_str(value: Any) -> str:
+    '''
+    Normalizes a cell value for comparison (missing values are empty cells).
+    '''
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return ''
+    return str(value)
+
+
+def _cell_value(value: Any) -> Any:
+    '''
+    Converts a cell value to something the Sheets API accepts.
+    '''
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return ''
+    return value.item() if hasattr(value, 'item') else value
 
 
 def split_letters_numbers(input_str: str) -> Optional[Tuple[str, int]]:
@@ -71,16 +195,21 @@ def split_letters_numbers(input_str: str) -> Optional[Tuple[str, int]]:
         return None
 
 
-def detect_end_row(worksheet: Worksheet, check_range: str) -> Optional[int]:
+def detect_end_row(worksheet: 'Worksheet', start_cell: str) -> int:
     '''
-    Checks a range of cells in a worksheet and returns the row number
-    of the last non-empty cell.
+    Reads the column of the starting cell, from that cell down to the bottom
+    of the worksheet (an open-ended range, so there is no row limit), and
+    returns the row number of the last non-empty cell before the first empty one.
+    The API trims trailing empty cells, so the read only costs as much as the
+    column is tall.
     '''
-    range_to_check = worksheet.range(check_range)
-    for cell in range_to_check:
-        if not cell.value:
-            return cell.row - 1
-    return
+    start_col, start_row = split_letters_numbers(start_cell)
+    values = worksheet.get(f'{start_cell}:{start_col}')
+
+    for i, row in enumerate(values):
+        if not row or not row[0]:
+            return start_row + i - 1
+    return start_row + len(values) - 1
 
 
 def fix_int_columns_dtype(df: pd.DataFrame, **kwargs) -> pd.DataFrame:
@@ -120,12 +249,8 @@ def join_non_empty_strings(strings: List) -> str:
 
 def update_by_month(old_df: pd.DataFrame, updated_df: pd.DataFrame, month_num: int):
     '''
-    Drops rows corresponding to a specified month number from the old DataFrame
-    and appends the new updated DataFrame, then sorts the result by the month number.
+    Replaces the rows of the specified month number in the old DataFrame with
+    the new updated DataFrame, keeping the result sorted by month number
+    (and instrument). See `upsert` for the changed keys.
     '''
-    drop_index = old_df[old_df['month_num'] == month_num].index
-
-    return (
-        pd.concat([old_df.drop(drop_index), updated_df])
-        .sort_values('month_num', ignore_index=True)
-    )
\ No newline at end of file
+    return upsert(old_df, updated_df, [month_num])[0]
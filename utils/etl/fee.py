@@ -1,19 +1,12 @@
 import pandas as pd
-from .common_utils import add_month_columns
+from .recap_tables import get_recap_table_configs, calculate_recap_aggregates
 
 def get_fee_config() -> dict:
     '''
-    Imports configuration variables from the `config.etl_fee` module and 
-    initializes a dictionary with these variables.
+    Returns the ETL configuration settings of the fee Recap table
+    (see `config.recap_tables`).
     '''
-    from config.etl_fee import start_cell, end_col, null_check_max_row, int_cols
-    kwargs = {
-        'start_cell': start_cell,
-        'end_col': end_col,
-        'null_check_max_row': null_check_max_row,
-        'int_cols': int_cols
-    }
-    return kwargs
+    return get_recap_table_configs(['fee'])['fee']
 
 
 def calculate_fee_aggregate(
@@ -26,10 +19,4 @@ def calculate_fee_aggregate(
     DataFrame by 'instrument' and calculates the sum of 'biaya_spp' and 'biaya_regis'. 
     It then adds month and month number columns to the resulting DataFrame.
     '''
-    agg_biaya = {'biaya_spp': 'sum', 'biaya_regis': 'sum'}
-    res_biaya = cleaned_df \
-        .groupby('instrument', as_index=False) \
-        .agg(agg_biaya)
-
-    res_biaya = add_month_columns(res_biaya, month, month_num)
-    return res_biaya
\ No newline at end of file
+    return calculate_recap_aggregates(cleaned_df, month, month_num, {'fee': get_fee_config()})['fee']
@@ -0,0 +1,104 @@
+import pandas as pd
+
+import os
+import pickle
+import hashlib
+from typing import Callable, Dict, Optional, Set, Tuple
+
+
+def hash_teacher_blocks(cleaned_df: pd.DataFrame) -> Dict[Tuple[str, str], str]:
+    '''
+    Fingerprints every teacher block of the cleaned DataFrame, keyed by
+    (instrument, teacher). Row order inside a block is part of the hash,
+    since it drives the order of the joined student names.
+    '''
+    row_hashes = pd.util.hash_pandas_object(cleaned_df, index=False).to_numpy()
+
+    block_hashes = {}
+    for key, positions in cleaned_df.groupby(['instrument', 'teacher'], sort=False, observed=True).indices.items():
+        block_hashes[key] = hashlib.sha1(row_hashes[positions].tobytes()).hexdigest()
+    return block_hashes
+
+
+def get_changed_instruments(
+        old_hashes: Dict[Tuple[str, str], str],
+        new_hashes: Dict[Tuple[str, str], str]
+    ) -> Set[str]:
+    '''
+    Returns the instruments with at least one added, removed or edited teacher block.
+    '''
+    changed_keys = set(old_hashes.items()) ^ set(new_hashes.items())
+    return {instrument for (instrument, _), _ in changed_keys}
+
+
+def update_partial_aggregate(
+        cleaned_df: pd.DataFrame,
+        month: str,
+        month_num: int,
+        calculate_aggregate: Callable[[pd.DataFrame, str, int], pd.DataFrame],
+        old_partial: Optional[pd.DataFrame],
+        changed_instruments: Set[str]
+    ) -> pd.DataFrame:
+    '''
+    Recomputes the aggregate only for the changed instruments and merges it
+    with the unchanged rows of the previous aggregate. Instruments that no longer
+    exist are dropped. Without a previous aggregate, everything is recomputed.
+    '''
+    return update_partial_aggregates(
+        cleaned_df, month, month_num,
+        lambda *args: {'aggregate': calculate_aggregate(*args)},
+        {'aggregate': old_partial}, changed_instruments)['aggregate']
+
+
+def update_partial_aggregates(
+        cleaned_df: pd.DataFrame,
+        month: str,
+        month_num: int,
+        calculate_aggregates: Callable[[pd.DataFrame, str, int], Dict[str, pd.DataFrame]],
+        old_partials: Dict[str, Optional[pd.DataFrame]],
+        changed_instruments: Set[str]
+    ) -> Dict[str, pd.DataFrame]:
+    '''
+    Same as `update_partial_aggregate`, for several aggregates (keyed by name)
+    computed together: the changed instruments are aggregated in a single
+    call. Everything is recomputed if any previous aggregate is missing.
+    '''
+    if any(old_partial is None for old_partial in old_partials.values()):
+        return calculate_aggregates(cleaned_df, month, month_num)
+
+    instruments = set(cleaned_df['instrument'].dropna())
+    changed_rows = cleaned_df['instrument'].isin(changed_instruments)
+    new_partials = calculate_aggregates(cleaned_df[changed_rows], month, month_num) if changed_rows.any() else {}
+
+    aggregates = {}
+    for name, old_partial in old_partials.items():
+        keep = old_partial['instrument'].isin(instruments - changed_instruments)
+        parts = [old_partial[keep]]
+        if name in new_partials:
+            parts.append(new_partials[name])
+        aggregates[name] = pd.concat(parts).sort_values('instrument', ignore_index=True)
+    return aggregates
+
+
+def load_incremental_state(incremental_dir: str, sheet_id: str, month: str) -> dict:
+    '''
+    Reads the block hashes and partial aggregates persisted by the last
+    incremental run of a month. Returns an empty state if there is none.
+    '''
+    path = os.path.join(incremental_dir, sheet_id, f'{month}.pkl')
+    if not os.path.exists(path):
+        return {'block_hashes': {}, 'partials': {}}
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def save_incremental_state(incremental_dir: str, sheet_id: str, month: str, state: dict) -> None:
+    '''
+    Atomically persists the block hashes and partial aggregates of a month.
+    '''
+    sheet_dir = os.path.join(incremental_dir, sheet_id)
+    os.makedirs(sheet_dir, exist_ok=True)
+    path = os.path.join(sheet_dir, f'{month}.pkl')
+    with open(path + '.tmp', 'wb') as f:
+        pickle.dump(state, f)
+    os.replace(path + '.tmp', path)
@@ -0,0 +1,100 @@
+import pandas as pd
+
+from typing import Dict, List, Optional
+
+from config.recap_tables import recap_tables
+from .common_utils import add_month_columns, join_non_empty_strings
+
+AGGREGATION_FUNCTIONS = ('size', 'sum', 'names')
+
+
+def get_recap_table_configs(names: Optional[List[str]] = None) -> Dict[str, dict]:
+    '''
+    Returns the registered Recap tables (all of them, or the given `names`),
+    keyed by table name. See `config.recap_tables`.
+    '''
+    if names is None:
+        return dict(recap_tables)
+    unknown = [name for name in names if name not in recap_tables]
+    if unknown:
+        raise ValueError(f"Unknown Recap tables: {', '.join(unknown)}")
+    return {name: recap_tables[name] for name in names}
+
+
+def get_source_cols(tables: Optional[Dict[str, dict]] = None) -> List[str]:
+    '''
+    Returns the columns of the cleaned data needed to compute the tables.
+    '''
+    tables = get_recap_table_configs() if tables is None else tables
+    cols = ['instrument']
+    for table in tables.values():
+        for col, func in table['aggregations'].values():
+            cols.append(col)
+            if func == 'names':
+                cols.append('nama')
+    return list(dict.fromkeys(cols))
+
+
+def _agg_name(col: str, func: str) -> str:
+    return f'{func}__{col}'
+
+
+def calculate_recap_aggregates(
+        cleaned_df: pd.DataFrame,
+        month: str,
+        month_num: int,
+        tables: Optional[Dict[str, dict]] = None
+    ) -> Dict[str, pd.DataFrame]:
+    '''
+    Computes every Recap table (all the registered ones by default) from a
+    single grouping of the cleaned data by instrument: the aggregations of all
+    the tables are computed once each in the same pass, then every table takes
+    its columns and gets the month and month number columns.
+    '''
+    tables = get_recap_table_configs() if tables is None else tables
+
+    # Every distinct (column, function) pair of the tables, plus the counts
+    # that decide whether a list of names is blank
+    specs = list(dict.fromkeys(
+        spec for table in tables.values() for spec in table['aggregations'].values()))
+    unknown = [func for _, func in specs if func not in AGGREGATION_FUNCTIONS]
+    if unknown:
+        raise ValueError(f"Unknown aggregation functions: {', '.join(unknown)}")
+    specs = list(dict.fromkeys(
+        specs + [(col, 'sum') for col, func in specs if func == 'names']))
+
+    # Names of the students whose column is 1 ('' otherwise), joined per group
+    name_cols = {
+        _agg_name(col, func): cleaned_df['nama'].where(cleaned_df[col] == 1, '')
+        for col, func in specs if func == 'names'
+    }
+    sum_cols = list(dict.fromkeys(col for col, func in specs if func == 'sum'))
+    df = cleaned_df[['instrument', *sum_cols]].assign(**name_cols)
+
+    grouped = df \
+        .groupby('instrument', as_index=False, observed=True) \
+        .agg(**{
+            _agg_name(col, func): (
+                (_agg_name(col, func), join_non_empty_strings) if func == 'names'
+                else ('instrument', 'size') if func == 'size'
+                else (col, 'sum'))
+            for col, func in specs
+        })
+
+    # Recap tables hold plain text, not the categorical of `cleaned_df`
+    grouped['instrument'] = grouped['instrument'].astype(object)
+
+    # Categories without any student in them are left blank
+    for col, func in specs:
+        if func == 'names':
+            names = grouped[_agg_name(col, func)]
+            grouped[_agg_name(col, func)] = names.where(grouped[_agg_name(col, 'sum')] > 0, ' ')
+
+    res = {}
+    for name, table in tables.items():
+        res_table = pd.DataFrame({
+            'instrument': grouped['instrument'],
+            **{out_col: grouped[_agg_name(*spec)] for out_col, spec in table['aggregations'].items()}
+        })
+        res[name] = add_month_columns(res_table, month, month_num)
+    return res
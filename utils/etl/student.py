@@ -1,19 +1,12 @@
 import pandas as pd
-from .common_utils import add_month_columns, join_non_empty_strings
+from .recap_tables import get_recap_table_configs, calculate_recap_aggregates
 
 def get_student_config() -> dict:
     '''
-    Imports the ETL configuration settings for student data
-    from the `etl_student` configuration file and returns them as a dictionary.
+    Returns the ETL configuration settings of the student Recap table
+    (see `config.recap_tables`).
     '''
-    from config.etl_student import start_cell, end_col, null_check_max_row, int_cols
-    kwargs = {
-        'start_cell': start_cell,
-        'end_col': end_col,
-        'null_check_max_row': null_check_max_row,
-        'int_cols': int_cols
-    }
-    return kwargs
+    return get_recap_table_configs(['student'])['student']
 
 
 def calculate_student_aggregate(
@@ -26,41 +19,7 @@ def calculate_student_aggregate(
     compute totals and counts of specific categories (e.g., new students, dropouts,
     students on leave, and unpaid fees) grouped by instrument. It also records the
     names of students in each category and adds the month and month number columns
-    to the result.
+    to the result. Use `calculate_recap_aggregates` to compute every Recap table
+    in a single pass.
     '''
-    # Total murid
-    res_murid = cleaned_df \
-        .groupby('instrument', as_index=False) \
-        .size() \
-        .rename(columns={'size': 'total'})
-
-    # Perhitungan murid sesuai kriteria
-    res_murid = res_murid.merge(
-        cleaned_df
-            .groupby('instrument', as_index=False)
-            .agg({
-                'is_baru': 'sum',
-                'is_keluar': 'sum',
-                'is_cuti': 'sum',
-                'not_lunas': 'sum'
-            })
-        ,
-        how='left',
-        on='instrument'
-    )
-
-    # Pendataan nama murid
-    cols = ['is_baru', 'is_keluar', 'is_cuti', 'not_lunas']
-    for col in cols:
-        res_murid = res_murid.merge(
-            cleaned_df[cleaned_df[col] == 1]
-                .groupby('instrument', as_index=False)
-                .agg({'nama': join_non_empty_strings})
-                .rename(columns={'nama': f'nama_{col}'})
-            ,
-            how='left',
-            on='instrument'
-        )
-
-    res_murid = add_month_columns(res_murid, month, month_num)
-    return res_murid.fillna(' ')
\ No newline at end of file
+    return calculate_recap_aggregates(cleaned_df, month, month_num, {'student': get_student_config()})['student']
@@ -0,0 +1,142 @@
+import pandas as pd
+import numpy as np
+
+from typing import Dict, List, Optional, Tuple
+
+# Columns identifying a Recap row, in sort order ('year' once multi-year data exists)
+KEY_COLS = ['year', 'month_num', 'instrument']
+
+Changes = Dict[str, List[tuple]]
+
+
+def get_key_cols(old_df: pd.DataFrame, updated_df: pd.DataFrame) -> List[str]:
+    '''
+    Returns the key columns present in the updated table (and in the old one, if it exists).
+    '''
+    return [
+        col for col in KEY_COLS
+        if col in updated_df.columns and (old_df.columns.empty or col in old_df.columns)
+    ]
+
+
+def encode_keys(frames: List[pd.DataFrame], key_cols: List[str]) -> List[np.ndarray]:
+    '''
+    Encodes the keys of several frames as int64 codes that sort (and compare)
+    like the keys themselves, so sorting, lookups and merges of keys are
+    plain numpy operations.
+    '''
+    lengths = [len(df) for df in frames]
+    codes = np.zeros(sum(lengths), dtype=np.int64)
+    for col in key_cols:
+        values = pd.concat([df[col] for df in frames if len(df)] or [frames[0][col]], ignore_index=True)
+        col_codes, uniques = pd.factorize(values, sort=True, use_na_sentinel=False)
+        codes = codes * len(uniques) + col_codes
+    return np.split(codes, np.cumsum(lengths)[:-1])
+
+
+def _key_tuples(df: pd.DataFrame, key_cols: List[str], rows: np.ndarray) -> List[tuple]:
+    return list(df[key_cols].iloc[rows].itertuples(index=False, name=None))
+
+
+def compare_keyed_rows(
+        old_df: pd.DataFrame,
+        new_df: pd.DataFrame,
+        key_cols: List[str],
+        codes: Optional[Tuple[np.ndarray, np.ndarray]] = None
+    ) -> Changes:
+    '''
+    Compares two sets of rows by key and returns the keys that were
+    'inserted', 'updated' (any other column differs) and 'deleted'.
+    Values are compared as they are written to the sheet (as text).
+    Precomputed key `codes` (see `encode_keys`) can be passed.
+    '''
+    old_codes, new_codes = codes if codes is not None else encode_keys([old_df, new_df], key_cols)
+
+    # Row of the old rows matching each new key (-1 if none), the last one on duplicates
+    last_old = pd.Series(np.arange(len(old_codes))).groupby(old_codes).last()
+    matches = last_old.reindex(new_codes).fillna(-1).to_numpy(dtype=np.intp)
+    common = matches >= 0
+
+    value_cols = [col for col in new_df.columns if col not in key_cols]
+    old_values = old_df.reindex(columns=value_cols).iloc[matches[common]]
+    new_values = new_df[value_cols].iloc[np.flatnonzero(common)]
+    differs = (_as_text(old_values).to_numpy() != _as_text(new_values).to_numpy()).any(axis=1)
+
+    deleted = ~np.isin(old_codes, new_codes)
+    _, first_deleted = np.unique(old_codes[deleted], return_index=True)
+    return {
+        'inserted': _key_tuples(new_df, key_cols, np.flatnonzero(~common)),
+        'updated': _key_tuples(new_df, key_cols, np.flatnonzero(common)[differs]),
+        'deleted': _key_tuples(old_df, key_cols, np.flatnonzero(deleted)[np.sort(first_deleted)]),
+    }
+
+
+def _as_text(df: pd.DataFrame) -> pd.DataFrame:
+    return df.astype(object).where(df.notna(), '').astype(str)
+
+
+def upsert(
+        old_df: pd.DataFrame,
+        updated_df: pd.DataFrame,
+        month_nums: Optional[List[int]] = None,
+        key_cols: Optional[List[str]] = None
+    ) -> Tuple[pd.DataFrame, Changes]:
+    '''
+    Upserts the rows of `updated_df` into the Recap table `old_df`, keyed by
+    (year,) month_num and instrument. Old rows with the same key are replaced,
+    and the old rows of `month_nums` (the months of `updated_df` by default;
+    pass [] to only touch the given keys) that are not in `updated_df` are
+    deleted, e.g. instruments that disappeared from a month.
+
+    The table is kept sorted by key: the new rows (sorted once) are merged
+    into the remaining old rows at their sorted positions, so the history is
+    not re-sorted (an unsorted `old_df` is sorted once). Returns the updated
+    table and the changed keys (see `compare_keyed_rows`).
+    '''
+    key_cols = key_cols or get_key_cols(old_df, updated_df)
+
+    # Table not created yet
+    if old_df.columns.empty:
+        old_df = pd.DataFrame(columns=updated_df.columns)
+    old_codes, new_codes = encode_keys([old_df, updated_df], key_cols)
+
+    # Sort the (few) new rows
+    order = np.argsort(new_codes, kind='stable')
+    updated_df, new_codes = updated_df.iloc[order].reset_index(drop=True), new_codes[order]
+    duplicated = np.flatnonzero(new_codes[1:] == new_codes[:-1]) + 1
+    if len(duplicated):
+        raise ValueError(f"Duplicate keys in the updated rows: {_key_tuples(updated_df, key_cols, duplicated)}")
+
+    # The history is only sorted if it is not already
+    if np.any(old_codes[1:] < old_codes[:-1]):
+        order = np.argsort(old_codes, kind='stable')
+        old_df, old_codes = old_df.iloc[order], old_codes[order]
+    old_df = old_df.reset_index(drop=True)
+
+    if month_nums is None:
+        month_nums = updated_df['month_num'].unique().tolist()
+
+    # Old rows replaced by the new ones or deleted
+    replaced = old_df['month_num'].isin(month_nums).to_numpy() | np.isin(old_codes, new_codes)
+    changes = compare_keyed_rows(old_df[replaced], updated_df, key_cols, (old_codes[replaced], new_codes))
+    kept, kept_codes = old_df[~replaced], old_codes[~replaced]
+
+    # Merge the sorted new rows into the sorted kept rows: new row j lands
+    # after the kept rows with smaller keys and the j new rows before it
+    positions = np.searchsorted(kept_codes, new_codes) + np.arange(len(new_codes))
+    is_new = np.zeros(len(kept_codes) + len(new_codes), dtype=bool)
+    is_new[positions] = True
+    order = np.empty(len(is_new), dtype=np.intp)
+    order[is_new] = len(kept) + np.arange(len(new_codes))
+    order[~is_new] = np.arange(len(kept))
+
+    merged = pd.concat([kept, updated_df], ignore_index=True).take(order)
+    return merged.reset_index(drop=True), changes
+
+
+def count_changes(changes: Changes) -> Dict[str, int]:
+    return {kind: len(keys) for kind, keys in changes.items()}
+
+
+def has_changes(changes: Changes) -> bool:
+    return any(changes.values())
@@ -0,0 +1,134 @@
+import time
+import cProfile
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Metrics of the run in progress (None outside of a run, so stages are no-ops)
+_current_run: ContextVar[Optional['RunMetrics']] = ContextVar('current_run', default=None)
+
+
+def get_peak_rss_mib() -> Optional[float]:
+    '''
+    Returns the peak resident set size of the process so far, in MiB.
+    '''
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class RunMetrics:
+    '''
+    Collects the metrics of one run. Used as a context manager, it becomes the
+    current run so that `stage` blocks executed inside it are recorded. With
+    `trace_memory`, the peak traced (tracemalloc) memory of every stage is
+    recorded as well, at the cost of a slower run.
+    '''
+    def __init__(self, name: str, sheets_client=None, trace_memory: bool = False):
+        self.name = name
+        self.sheets_client = sheets_client
+        self.trace_memory = trace_memory
+        self.stages: List[Dict[str, Any]] = []
+        self.fields: Dict[str, Any] = {}
+        self.status = 'ok'
+        self.seconds = 0.0
+
+    def __enter__(self) -> 'RunMetrics':
+        self._token = _current_run.set(self)
+        if self.trace_memory:
+            tracemalloc.start()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.seconds = time.perf_counter() - self._start
+        if self.trace_memory:
+            tracemalloc.stop()
+        _current_run.reset(self._token)
+        if exc_type is not None:
+            self.status = 'error'
+
+    def api_requests(self) -> int:
+        if self.sheets_client is None:
+            return 0
+        return self.sheets_client.stats['requests']
+
+    def record(self) -> Dict[str, Any]:
+        '''
+        Returns the structured record of the run.
+        '''
+        record = {
+            'run': self.name,
+            'status': self.status,
+            'seconds': round(self.seconds, 4),
+            'peak_rss_mib': get_peak_rss_mib(),
+            **self.fields,
+            'stages': self.stages,
+        }
+        if self.sheets_client is not None:
+            record['sheets_api'] = dict(self.sheets_client.stats)
+        return record
+
+
+@contextmanager
+def stage(name: str, **fields) -> Iterator[Dict[str, Any]]:
+    '''
+    Records the wall time, Sheets API requests and peak memory of the block
+    in the current run. The yielded dictionary can be filled with more
+    metrics (e.g. `rows_out` or `bytes`). Does nothing outside of a run.
+    Stages are not meant to be nested.
+    '''
+    record: Dict[str, Any] = {'stage': name, **fields}
+    metrics = _current_run.get()
+    if metrics is None:
+        yield record
+        return
+
+    if metrics.trace_memory:
+        tracemalloc.reset_peak()
+    requests_before = metrics.api_requests()
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['seconds'] = round(time.perf_counter() - start, 4)
+        record['api_requests'] = metrics.api_requests() - requests_before
+        if metrics.trace_memory:
+            record['peak_traced_mib'] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+        record['peak_rss_mib'] = get_peak_rss_mib()
+        metrics.stages.append(record)
+
+
+def set_run_field(name: str, value: Any) -> None:
+    '''
+    Adds a top level field to the record of the current run, if any.
+    '''
+    metrics = _current_run.get()
+    if metrics is not None:
+        metrics.fields[name] = value
+
+
+@contextmanager
+def profiled(path: Optional[str]) -> Iterator[None]:
+    '''
+    Profiles the block with cProfile and dumps the stats to `path`
+    (readable with `python -m pstats`). Does nothing if `path` is None.
+    '''
+    if path is None:
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
@@ -0,0 +1,77 @@
+import pandas as pd
+from openpyxl import load_workbook
+
+import multiprocessing
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.create_clean_data import read_sheet_df, clean_raw_data, log_invalid_cells
+
+# Workbook opened once by every worker process (see `_init_worker`)
+_workbook = None
+
+
+def get_parallel_config() -> dict:
+    '''
+    Imports the parallel preparation settings from the `config.parallel`
+    module and returns them as a dictionary.
+    '''
+    from config.parallel import prepare_workers, start_method
+    kwargs = {
+        'prepare_workers': prepare_workers,
+        'start_method': start_method
+    }
+    return kwargs
+
+
+def _init_worker(content: bytes) -> None:
+    global _workbook
+    _workbook = load_workbook(BytesIO(content), read_only=True, data_only=True, keep_links=False)
+
+
+def _prepare_sheet(sheet_name: str) -> Optional[Tuple[pd.DataFrame, List[Dict[str, Any]]]]:
+    # Parse and clean one tab in the worker (None if the tab does not exist).
+    # The worker has no log handler, the parent logs the invalid cells
+    if sheet_name not in _workbook.sheetnames:
+        return None
+    return clean_raw_data(read_sheet_df(_workbook[sheet_name]), log=False)
+
+
+def prepare_sheets_parallel(
+        content: bytes,
+        sheet_names: List[str],
+        max_workers: int,
+        missing_ok: bool = False,
+        start_method: Optional[str] = None
+    ) -> Tuple[Dict[str, pd.DataFrame], int]:
+    '''
+    Parses and cleans the sheets of a workbook on a pool of `max_workers`
+    processes, one sheet per task. Every worker opens the workbook once. The
+    cleaned sheets already have the compact schema (categoricals and small
+    integers), so they are sent back as pickled column buffers, which is
+    faster than an Arrow round trip for them. Returns the cleaned
+    DataFrames keyed by sheet name (in the order of `sheet_names`) and the
+    total number of invalid cells, which are logged by the calling process.
+    With `missing_ok`, absent sheets are skipped.
+    '''
+    # Forking a process whose other threads may hold locks (e.g. the DAG
+    # of `run_etl_months`) is unsafe, so a fork server is preferred
+    if start_method is None and 'forkserver' in multiprocessing.get_all_start_methods():
+        start_method = 'forkserver'
+    context = multiprocessing.get_context(start_method)
+    with ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=context,
+            initializer=_init_worker, initargs=(content,)) as executor:
+        results = list(executor.map(_prepare_sheet, sheet_names))
+
+    cleaned_dfs, invalid_cells = {}, 0
+    for sheet_name, result in zip(sheet_names, results):
+        if result is None:
+            if missing_ok:
+                continue
+            raise RuntimeError(f"Failed to read the Google Sheets document: Worksheet named '{sheet_name}' not found")
+        cleaned_dfs[sheet_name], sheet_invalid_cells = result
+        log_invalid_cells(sheet_invalid_cells, sheet_name)
+        invalid_cells += len(sheet_invalid_cells)
+    return cleaned_dfs, invalid_cells
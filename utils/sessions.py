@@ -0,0 +1,105 @@
+import gspread
+import requests
+from google.auth.transport.requests import AuthorizedSession, Request
+from google.oauth2.service_account import Credentials
+from gspread import Spreadsheet, Worksheet
+
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Tuple
+
+
+def get_sessions_config() -> dict:
+    '''
+    Imports the session settings from the `config.sessions` module
+    and returns them as a dictionary.
+    '''
+    from config.sessions import scopes, refresh_margin_seconds, pool_maxsize
+    kwargs = {
+        'scopes': scopes,
+        'refresh_margin_seconds': refresh_margin_seconds,
+        'pool_maxsize': pool_maxsize
+    }
+    return kwargs
+
+
+class SheetsSession:
+    '''
+    Authorized session of one service account. A single keep-alive HTTP
+    connection pool is shared by the gspread client and the workbook exports,
+    the access token is refreshed before it is about to expire, and opened
+    spreadsheets and worksheets are memoized by key.
+    '''
+    def __init__(
+            self,
+            credentials: Credentials,
+            refresh_margin_seconds: int = 300,
+            pool_maxsize: int = 16
+        ):
+        self.credentials = credentials
+        self.refresh_margin = timedelta(seconds=refresh_margin_seconds)
+        self.lock = threading.Lock()
+
+        # One connection pool for every host we talk to
+        self.session = AuthorizedSession(credentials)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.client = gspread.Client(auth=credentials, session=self.session)
+        # Token refreshes go through a plain (unauthorized) session: refreshing
+        # through the authorized one would try to authorize the refresh itself
+        self.auth_request = Request(requests.Session())
+
+        self._spreadsheets: Dict[str, Spreadsheet] = {}
+        self._worksheets: Dict[Tuple[str, str], Worksheet] = {}
+
+    def ensure_fresh_token(self) -> None:
+        '''
+        Refreshes the access token if it is missing or expires within the margin.
+        '''
+        with self.lock:
+            expiry = self.credentials.expiry
+            if not self.credentials.token or expiry is None or expiry - self.refresh_margin <= datetime.now(timezone.utc).replace(tzinfo=None):
+                self.credentials.refresh(self.auth_request)
+
+    def open_by_key(self, sheet_id: str) -> Spreadsheet:
+        self.ensure_fresh_token()
+        with self.lock:
+            if sheet_id not in self._spreadsheets:
+                self._spreadsheets[sheet_id] = self.client.open_by_key(sheet_id)
+            return self._spreadsheets[sheet_id]
+
+    def worksheet(self, sheet_id: str, title: str) -> Worksheet:
+        spreadsheet = self.open_by_key(sheet_id)
+        with self.lock:
+            if (sheet_id, title) not in self._worksheets:
+                self._worksheets[(sheet_id, title)] = spreadsheet.worksheet(title)
+            return self._worksheets[(sheet_id, title)]
+
+
+_sessions: Dict[str, SheetsSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(service_account_path: str) -> SheetsSession:
+    '''
+    Returns the cached authorized session of a service account,
+    creating it on first use.
+    '''
+    with _sessions_lock:
+        if service_account_path not in _sessions:
+            config = get_sessions_config()
+            credentials = Credentials.from_service_account_file(service_account_path, scopes=config['scopes'])
+            _sessions[service_account_path] = SheetsSession(
+                credentials, config['refresh_margin_seconds'], config['pool_maxsize'])
+        return _sessions[service_account_path]
+
+
+def clear_sessions() -> None:
+    '''
+    Forgets every cached session (e.g. after rotating a service account key).
+    '''
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.session.close()
+            session.auth_request.session.close()
+        _sessions.clear()
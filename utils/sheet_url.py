@@ -0,0 +1,22 @@
+import re
+
+def get_sheet_id(sheet_url: str) -> str:
+    '''
+    Validates the provided Google Sheets URL and returns its sheet id.
+    '''
+    # Validate the input URL
+    # https://docs.google.com/spreadsheets/d/1kaci6AtLCpOENLcfJ2RvtgMOph1FcBumvJ2pkRBQhro/edit?usp=sharing
+    
+    pattern = r'^https:\/\/docs\.google\.com\/spreadsheets\/d\/[a-zA-Z0-9_-]+\/[a-z]+\?usp=sharing$'
+    if not re.match(pattern, sheet_url):
+        raise ValueError("The provided URL is not a valid Google Sheets URL.")
+
+    return sheet_url.split('/')[-2]
+
+
+def get_export_url(sheet_url: str) -> str:
+    '''
+    Converts a Google Sheets URL into its xlsx export URL.
+    '''
+    id = get_sheet_id(sheet_url)
+    return f"https://docs.google.com/spreadsheets/d/{id}/export?format=xlsx"
@@ -0,0 +1,164 @@
+import requests
+from gspread import Worksheet
+from gspread.exceptions import APIError
+
+import time
+import random
+import threading
+import logging
+from typing import Any, Callable, Dict, Optional
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Worksheet methods that make a request to the Sheets API
+API_METHODS = {
+    'get', 'batch_get', 'range', 'col_values', 'row_values', 'get_all_values',
+    'update', 'batch_update', 'batch_clear', 'clear',
+}
+
+
+class RequestBudgetExceeded(RuntimeError):
+    pass
+
+
+def get_sheets_client_config() -> dict:
+    '''
+    Imports the Sheets client settings from the `config.sheets_client` module
+    and returns them as a dictionary.
+    '''
+    from config.sheets_client import (
+        requests_per_minute, burst, max_retries, backoff_base_seconds,
+        backoff_max_seconds, request_budget)
+    kwargs = {
+        'requests_per_minute': requests_per_minute,
+        'burst': burst,
+        'max_retries': max_retries,
+        'backoff_base_seconds': backoff_base_seconds,
+        'backoff_max_seconds': backoff_max_seconds,
+        'request_budget': request_budget
+    }
+    return kwargs
+
+
+class SheetsClient:
+    '''
+    Makes Sheets API calls under a token bucket matched to the per-minute quota,
+    retries retryable errors (429 and 5xx, connection errors) with jittered
+    exponential backoff, and enforces a per-run request budget.
+    Counters are kept in `stats`. A client can be shared between threads.
+    '''
+    def __init__(
+            self,
+            requests_per_minute: int = 60,
+            burst: int = 10,
+            max_retries: int = 5,
+            backoff_base_seconds: float = 1.0,
+            backoff_max_seconds: float = 64.0,
+            request_budget: Optional[int] = None,
+            clock: Callable[[], float] = time.monotonic,
+            sleep: Callable[[float], None] = time.sleep,
+            rng: Optional[random.Random] = None
+        ):
+        self.rate = requests_per_minute / 60
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.request_budget = request_budget
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+
+        self.lock = threading.Lock()
+        self.tokens = float(burst)
+        self.last_refill = clock()
+        self.stats: Dict[str, float] = {}
+        self.begin_run()
+
+    def begin_run(self) -> None:
+        '''
+        Starts a new run of a long-lived client (e.g. the watch daemon):
+        resets the request budget and the counters. The token bucket is kept.
+        '''
+        with self.lock:
+            self.stats = {'requests': 0, 'retries': 0, 'errors': 0, 'throttled_seconds': 0.0}
+
+    def _acquire(self) -> None:
+        # Refill the bucket and take a token, waiting for it if the bucket is empty.
+        # Tokens may go negative, so concurrent callers queue up behind each other.
+        with self.lock:
+            if self.request_budget is not None and self.stats['requests'] >= self.request_budget:
+                raise RequestBudgetExceeded(f"Sheets API request budget of {self.request_budget} requests exceeded")
+            self.stats['requests'] += 1
+
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+            self.stats['throttled_seconds'] += wait
+
+        if wait:
+            self.sleep(wait)
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        # Honour Retry-After when the API sends it, otherwise full jitter
+        response = getattr(error, 'response', None)
+        retry_after = getattr(response, 'headers', {}).get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        cap = min(self.backoff_max_seconds, self.backoff_base_seconds * 2 ** attempt)
+        return self.rng.uniform(0, cap)
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        '''
+        Calls `func` as one API request, retrying retryable errors.
+        '''
+        for attempt in range(self.max_retries + 1):
+            self._acquire()
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                with self.lock:
+                    if not is_retryable(e) or attempt == self.max_retries:
+                        self.stats['errors'] += 1
+                        raise
+                    self.stats['retries'] += 1
+                    backoff = self._backoff(attempt, e)
+                self.sleep(backoff)
+
+    def wrap(self, worksheet: Worksheet) -> 'RateLimitedWorksheet':
+        return RateLimitedWorksheet(worksheet, self)
+
+    def log_stats(self, logger: logging.Logger) -> None:
+        logger.info(
+            "Sheets API: {requests} requests, {retries} retries, {errors} errors, "
+            "{throttled_seconds:.1f}s throttled".format(**self.stats))
+
+
+class RateLimitedWorksheet:
+    '''
+    Proxy of a `gspread.Worksheet` whose API calls go through a `SheetsClient`.
+    '''
+    def __init__(self, worksheet: Worksheet, client: SheetsClient):
+        self._worksheet = worksheet
+        self._client = client
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._worksheet, name)
+        if name in API_METHODS and callable(attr):
+            return lambda *args, **kwargs: self._client.call(attr, *args, **kwargs)
+        return attr
+
+
+def is_retryable(error: Exception) -> bool:
+    '''
+    Returns True for rate limit (429) and server (5xx) errors,
+    and for connection errors and timeouts.
+    '''
+    if isinstance(error, APIError):
+        return error.code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
@@ -0,0 +1,105 @@
+import pandas as pd
+
+import os
+from typing import Dict, List, Optional
+
+from config.months import months
+
+PARTITION_FILE = 'part-0.parquet'
+
+
+def get_warehouse_config() -> dict:
+    '''
+    Imports the warehouse settings from the `config.warehouse` module
+    and returns them as a dictionary.
+    '''
+    from config.warehouse import enabled, warehouse_dir
+    kwargs = {
+        'enabled': enabled,
+        'warehouse_dir': warehouse_dir
+    }
+    return kwargs
+
+
+def _sheet_dir(warehouse_dir: str, sheet_id: str) -> str:
+    return os.path.join(warehouse_dir, sheet_id)
+
+
+def get_partition_dir(warehouse_dir: str, sheet_id: str, year: int, month_num: int) -> str:
+    return os.path.join(_sheet_dir(warehouse_dir, sheet_id), f'year={year}', f'month_num={month_num}')
+
+
+def write_partition(
+        warehouse_dir: str,
+        sheet_id: str,
+        year: int,
+        month_num: int,
+        cleaned_df: pd.DataFrame
+    ) -> str:
+    '''
+    Writes the `cleaned_df` of a month as the Parquet partition of its year and
+    month, replacing the partition atomically if it already exists (re-runs).
+    Returns the path of the partition file.
+    '''
+    partition_dir = get_partition_dir(warehouse_dir, sheet_id, year, month_num)
+    os.makedirs(partition_dir, exist_ok=True)
+
+    # Hidden temporary file (ignored by readers), then an atomic rename
+    file_path = os.path.join(partition_dir, PARTITION_FILE)
+    tmp_path = os.path.join(partition_dir, f'.{PARTITION_FILE}.tmp')
+    cleaned_df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, file_path)
+    return file_path
+
+
+def read_warehouse(
+        warehouse_dir: str,
+        sheet_id: str,
+        year: Optional[int] = None,
+        month_nums: Optional[List[int]] = None,
+        columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+    '''
+    Reads the warehouse of a spreadsheet. Only the requested `columns` are
+    read (column projection) and partitions outside of `year`/`month_nums` are
+    skipped without being opened (predicate pushdown). The 'year' and
+    'month_num' partition columns are always returned.
+    '''
+    sheet_dir = _sheet_dir(warehouse_dir, sheet_id)
+    if not os.path.isdir(sheet_dir):
+        return pd.DataFrame(columns=['year', 'month_num', *(columns or [])])
+
+    filters = []
+    if year is not None:
+        filters.append(('year', '=', year))
+    if month_nums is not None:
+        filters.append(('month_num', 'in', month_nums))
+
+    if columns is not None:
+        columns = ['year', 'month_num', *columns]
+    df = pd.read_parquet(sheet_dir, engine='pyarrow', columns=columns, filters=filters or None)
+
+    # Partition columns are read as categoricals
+    return df.astype({'year': 'int64', 'month_num': 'int64'})
+
+
+def read_warehouse_months(
+        warehouse_dir: str,
+        sheet_id: str,
+        year: int,
+        selected_months: Optional[List[str]] = None,
+        columns: Optional[List[str]] = None
+    ) -> Dict[str, pd.DataFrame]:
+    '''
+    Reads the cleaned data of the selected months (every month if None) of a
+    year from the warehouse, keyed by month in calendar order.
+    '''
+    month_nums = None
+    if selected_months is not None:
+        month_nums = [months.index(month) + 1 for month in selected_months]
+
+    df = read_warehouse(warehouse_dir, sheet_id, year, month_nums, columns)
+    return {
+        months[month_num - 1]: month_df.drop(columns=['year', 'month_num']).reset_index(drop=True)
+        for month_num, month_df in df.groupby('month_num', sort=True)
+    }